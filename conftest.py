@@ -0,0 +1,24 @@
+import json
+
+from info_service.utils import nacos_utils as info_nacos_utils
+from recommend_service.utils import nacos_utils as recommend_nacos_utils
+from user_service.utils import nacos_utils as user_nacos_utils
+
+# 测试时代替 Nacos 下发的配置, 各服务的配置类在导入时读取
+TEST_CONFIG = {
+    "DB_HOST": "127.0.0.1",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_NAME": "github_rank_test",
+    "DB_POOL_SIZE": 4,
+    "DB_POOL_TIMEOUT": 1,
+    "tokens": ["test-token"],
+}
+
+
+def get_test_config(data_id, group="DEFAULT_GROUP"):
+    return json.dumps(TEST_CONFIG)
+
+
+for module in (info_nacos_utils, recommend_nacos_utils, user_nacos_utils):
+    module.get_config_from_nacos = get_test_config
@@ -29,10 +29,45 @@ CREATE TABLE IF NOT EXISTS Github (
     total JSON COMMENT '用户的总计信息，存储为JSON格式，包含用户的统计数据',
     evaluate JSON COMMENT '用户的评价信息，存储为JSON格式，记录用户的评价',
     summa TEXT COMMENT '用户的总结信息，存储为文本，包含用户的总结',
+    user_info_fetched_at DATETIME DEFAULT NULL COMMENT 'user_info的获取时间，用于判断该列缓存是否过期',
+    repos_info_fetched_at DATETIME DEFAULT NULL COMMENT 'repos_info的获取时间，用于判断该列缓存是否过期',
+    issues_info_fetched_at DATETIME DEFAULT NULL COMMENT 'issues_info的获取时间，用于判断该列缓存是否过期',
+    tech_stack_fetched_at DATETIME DEFAULT NULL COMMENT 'tech_stack的获取时间，用于判断该列缓存是否过期',
+    most_common_language_fetched_at DATETIME DEFAULT NULL COMMENT 'most_common_language的获取时间，用于判断该列缓存是否过期',
+    total_fetched_at DATETIME DEFAULT NULL COMMENT 'total的获取时间，用于判断该列缓存是否过期',
+    evaluate_fetched_at DATETIME DEFAULT NULL COMMENT 'evaluate的获取时间，用于判断该列缓存是否过期',
+    summa_fetched_at DATETIME DEFAULT NULL COMMENT 'summa的获取时间，用于判断该列缓存是否过期',
+    score DECIMAL(3,1) GENERATED ALWAYS AS (CAST(JSON_UNQUOTE(JSON_EXTRACT(evaluate, '$.score')) AS DECIMAL(3,1))) STORED COMMENT '用户评分，由evaluate中的score生成，用于排行榜排序',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间，默认为当前时间',
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新'
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新',
+    INDEX idx_score (score) -- 排行榜按 score DESC, id DESC 反向扫描该索引, 避免全表扫描与文件排序
 ) COMMENT='存储GitHub用户信息的表，包含用户的GitHub相关数据';
 
+-- 已有 Github 表的迁移: 添加各列的获取时间, 并以原 updated_at 作为已有数据的获取时间
+-- ALTER TABLE Github
+--     ADD COLUMN user_info_fetched_at DATETIME DEFAULT NULL AFTER summa,
+--     ADD COLUMN repos_info_fetched_at DATETIME DEFAULT NULL AFTER user_info_fetched_at,
+--     ADD COLUMN issues_info_fetched_at DATETIME DEFAULT NULL AFTER repos_info_fetched_at,
+--     ADD COLUMN tech_stack_fetched_at DATETIME DEFAULT NULL AFTER issues_info_fetched_at,
+--     ADD COLUMN most_common_language_fetched_at DATETIME DEFAULT NULL AFTER tech_stack_fetched_at,
+--     ADD COLUMN total_fetched_at DATETIME DEFAULT NULL AFTER most_common_language_fetched_at,
+--     ADD COLUMN evaluate_fetched_at DATETIME DEFAULT NULL AFTER total_fetched_at,
+--     ADD COLUMN summa_fetched_at DATETIME DEFAULT NULL AFTER evaluate_fetched_at;
+-- UPDATE Github SET
+--     user_info_fetched_at = IF(user_info IS NULL, NULL, updated_at),
+--     repos_info_fetched_at = IF(repos_info IS NULL, NULL, updated_at),
+--     issues_info_fetched_at = IF(issues_info IS NULL, NULL, updated_at),
+--     tech_stack_fetched_at = IF(tech_stack IS NULL, NULL, updated_at),
+--     most_common_language_fetched_at = IF(most_common_language IS NULL, NULL, updated_at),
+--     total_fetched_at = IF(total IS NULL, NULL, updated_at),
+--     evaluate_fetched_at = IF(evaluate IS NULL, NULL, updated_at),
+--     summa_fetched_at = IF(summa IS NULL, NULL, updated_at);
+
+-- 已有 Github 表的迁移: 添加由 evaluate 生成的评分列及其索引
+-- ALTER TABLE Github
+--     ADD COLUMN score DECIMAL(3,1) GENERATED ALWAYS AS (CAST(JSON_UNQUOTE(JSON_EXTRACT(evaluate, '$.score')) AS DECIMAL(3,1))) STORED AFTER summa_fetched_at,
+--     ADD INDEX idx_score (score);
+
 -- 创建 appraisal 表，并添加级联删除
 CREATE TABLE IF NOT EXISTS appraisal (
     id INT AUTO_INCREMENT PRIMARY KEY COMMENT '评价ID，唯一标识每条评价',
@@ -75,3 +110,106 @@ CREATE TABLE IF NOT EXISTS monthly_recommend (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间，默认为当前时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新'
 ) COMMENT='存储每月推荐数据的表，包含每月的推荐信息';
+
+-- 创建 github_response_cache 表
+CREATE TABLE IF NOT EXISTS github_response_cache (
+    cache_key CHAR(64) PRIMARY KEY COMMENT '缓存键，请求URL的SHA256摘要，所有Token共用',
+    url VARCHAR(2048) NOT NULL COMMENT '请求URL',
+    etag VARCHAR(255) DEFAULT NULL COMMENT 'ETag响应头，用于If-None-Match条件请求',
+    last_modified VARCHAR(64) DEFAULT NULL COMMENT 'Last-Modified响应头，用于If-Modified-Since条件请求',
+    headers JSON COMMENT '需要回放的响应头，如Link、Content-Type',
+    body LONGTEXT COMMENT '响应体',
+    token_hash CHAR(16) DEFAULT NULL COMMENT '获取响应的Token的摘要，条件请求优先使用该Token',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间，默认为当前时间',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='GitHub API条件请求缓存表，304响应不计入速率限制';
+
+-- 已有 github_response_cache 表的迁移: 缓存键改为只包含URL, 旧的按Token区分的记录不再命中, 直接清空
+-- ALTER TABLE github_response_cache ADD COLUMN token_hash CHAR(16) DEFAULT NULL AFTER body;
+-- TRUNCATE TABLE github_response_cache;
+
+-- 创建 github_negative_cache 表
+CREATE TABLE IF NOT EXISTS github_negative_cache (
+    github_id VARCHAR(255) PRIMARY KEY COMMENT 'GitHub用户ID，小写',
+    status_code SMALLINT NOT NULL COMMENT 'GitHub返回的状态码，404不存在或451因法律原因不可用',
+    expires_at DATETIME NOT NULL COMMENT '过期时间，过期后重新请求GitHub',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间，默认为当前时间',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新',
+    INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='GitHub用户负缓存表，记录不存在或不可用的用户';
+
+-- 创建 github_metric_sketches 表
+CREATE TABLE IF NOT EXISTS github_metric_sketches (
+    metric VARCHAR(64) PRIMARY KEY COMMENT '评分指标名称，如 commits、stars、score',
+    sketch JSON NOT NULL COMMENT '指标的 KLL 分位数草图，各服务进程定期合并写入',
+    sample_count BIGINT NOT NULL DEFAULT 0 COMMENT '草图汇总的样本数',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='评分指标分位数草图表，用于计算各指标的实际中位数与百分位';
+
+-- 创建 repositories 表
+CREATE TABLE IF NOT EXISTS repositories (
+    id BIGINT PRIMARY KEY COMMENT 'GitHub仓库ID，仓库改名或转移后不变',
+    full_name VARCHAR(255) NOT NULL COMMENT '仓库全名，格式为 owner/name',
+    metadata JSON NOT NULL COMMENT 'GitHub返回的仓库信息，所有关联用户共用一份',
+    repo_pushed_at VARCHAR(32) DEFAULT NULL COMMENT '仓库信息中的 pushed_at，原样保存GitHub返回的时间字符串',
+    repo_updated_at VARCHAR(32) DEFAULT NULL COMMENT '仓库信息中的 updated_at，原样保存GitHub返回的时间字符串',
+    metadata_fetched_at DATETIME NOT NULL COMMENT '仓库信息的获取时间',
+    languages JSON DEFAULT NULL COMMENT '仓库各语言的字节数',
+    languages_pushed_at VARCHAR(32) DEFAULT NULL COMMENT '获取语言时仓库的 pushed_at，推送后语言需要重新获取',
+    languages_fetched_at DATETIME DEFAULT NULL COMMENT '语言的获取时间',
+    commits INT DEFAULT NULL COMMENT '仓库的提交数',
+    prs INT DEFAULT NULL COMMENT '仓库的PR数（含已关闭）',
+    issues INT DEFAULT NULL COMMENT '仓库的Issue数（含已关闭，不含PR）',
+    counts_pushed_at VARCHAR(32) DEFAULT NULL COMMENT '统计计数时仓库的 pushed_at',
+    counts_updated_at VARCHAR(32) DEFAULT NULL COMMENT '统计计数时仓库的 updated_at',
+    counts_fetched_at DATETIME DEFAULT NULL COMMENT '计数的获取时间',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间，默认为当前时间',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间，默认为当前时间，并在更新时自动更新',
+    INDEX idx_full_name (full_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='仓库表，按GitHub仓库ID保存仓库信息、语言与计数，多个用户关联同一仓库时只保存和获取一次';
+
+-- 创建 user_repositories 表
+CREATE TABLE IF NOT EXISTS user_repositories (
+    github_id VARCHAR(255) NOT NULL COMMENT 'GitHub用户ID',
+    repo_id BIGINT NOT NULL COMMENT '仓库ID，对应 repositories.id',
+    position INT NOT NULL COMMENT '仓库在用户仓库列表中的顺序',
+    PRIMARY KEY (github_id, repo_id),
+    INDEX idx_repo_id (repo_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户与仓库的关联表，Github 表的 repos_info 列只保存仓库数';
+
+-- 已有数据的迁移: 将 Github 表 repos_info 中的仓库拆分到 repositories 与 user_repositories,
+-- 合并 github_repo_stats 中的计数快照 (快照时间与当前仓库信息一致时才保留), 最后将 repos_info 改为仓库数
+-- INSERT INTO repositories (id, full_name, metadata, repo_pushed_at, repo_updated_at, metadata_fetched_at)
+-- SELECT r.id, r.full_name, r.metadata, r.pushed_at, r.updated_at, COALESCE(g.repos_info_fetched_at, g.updated_at)
+-- FROM Github g,
+--     JSON_TABLE(g.repos_info, '$[*]' COLUMNS (
+--         id BIGINT PATH '$.id',
+--         full_name VARCHAR(255) PATH '$.full_name',
+--         pushed_at VARCHAR(32) PATH '$.pushed_at',
+--         updated_at VARCHAR(32) PATH '$.updated_at',
+--         metadata JSON PATH '$'
+--     )) r
+-- WHERE JSON_TYPE(g.repos_info) = 'ARRAY'
+-- ORDER BY COALESCE(g.repos_info_fetched_at, g.updated_at)
+-- ON DUPLICATE KEY UPDATE
+--     full_name = VALUES(full_name),
+--     metadata = VALUES(metadata),
+--     repo_pushed_at = VALUES(repo_pushed_at),
+--     repo_updated_at = VALUES(repo_updated_at),
+--     metadata_fetched_at = VALUES(metadata_fetched_at);
+-- INSERT IGNORE INTO user_repositories (github_id, repo_id, position)
+-- SELECT g.github_id, r.id, r.position - 1
+-- FROM Github g,
+--     JSON_TABLE(g.repos_info, '$[*]' COLUMNS (position FOR ORDINALITY, id BIGINT PATH '$.id')) r
+-- WHERE JSON_TYPE(g.repos_info) = 'ARRAY';
+-- UPDATE repositories r
+-- JOIN github_repo_stats s ON s.full_name = r.full_name
+--     AND s.repo_pushed_at <=> r.repo_pushed_at AND s.repo_updated_at <=> r.repo_updated_at
+-- SET r.commits = s.commits, r.prs = s.prs, r.issues = s.issues,
+--     r.counts_pushed_at = s.repo_pushed_at, r.counts_updated_at = s.repo_updated_at,
+--     r.counts_fetched_at = s.fetched_at;
+-- UPDATE Github SET repos_info = JSON_LENGTH(repos_info) WHERE JSON_TYPE(repos_info) = 'ARRAY';
+-- DROP TABLE github_repo_stats;
+
+-- 已有数据的迁移: 此前 REST 统计的 Issue 数包含 PR, 清空计数使各仓库在下次评估时按不含 PR 的口径重新统计
+-- UPDATE repositories SET commits = NULL, prs = NULL, issues = NULL, counts_fetched_at = NULL;
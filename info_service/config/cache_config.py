@@ -0,0 +1,164 @@
+# Github 表缓存配置
+# 缓存数据的有效期 (天), 超过后视为过期
+CACHE_TTL_DAYS = 7
+
+# 是否启用 stale-while-revalidate: 过期数据先直接返回, 同时在后台刷新
+STALE_WHILE_REVALIDATE = True
+
+# 过期数据最多可容忍的时长 (天), 超过后仍同步刷新
+MAX_STALENESS_DAYS = 30
+
+# 后台刷新线程数
+REFRESH_WORKERS = 4
+
+# 热门用户预热配置
+# 是否启用后台预热
+WARMUP_ENABLED = True
+
+# 预热调度周期 (秒)
+WARMUP_INTERVAL_SECONDS = 300
+
+# 在缓存过期前多少小时开始预热
+WARMUP_LEAD_HOURS = 12
+
+# 访问频率的衰减半衰期 (小时)
+ACCESS_HALF_LIFE_HOURS = 24
+
+# 最多跟踪的用户数, 超出时淘汰访问频率最低的用户
+ACCESS_TRACK_MAX = 10000
+
+# 每个周期参与预热的最热门用户数
+WARMUP_HOT_SIZE = 500
+
+# 排行榜与推荐列表用户的初始访问热度
+WARMUP_SEED_WEIGHT = 5.0
+
+# 重新加载排行榜与推荐列表的间隔 (秒)
+WARMUP_SEED_INTERVAL_SECONDS = 3600
+
+# 每个周期最多预热的用户数
+WARMUP_MAX_PER_CYCLE = 20
+
+# 相邻两次预热之间的间隔 (秒), 将预热请求分散到整个周期
+WARMUP_SPACING_SECONDS = 10
+
+# 预热一个用户预估消耗的 GitHub API 请求数
+WARMUP_COST_PER_USER = 100
+
+# 为交互请求保留的 GitHub API 剩余额度, 低于该值时暂停预热
+WARMUP_RATE_LIMIT_RESERVE = 1000
+
+# 进行中的交互请求超过该值时推迟预热
+WARMUP_MAX_INTERACTIVE_IN_FLIGHT = 4
+
+# 负缓存配置: 记录不存在 (404) 或因法律原因不可用 (451) 的用户, 避免重复请求 GitHub
+# 是否启用负缓存
+NEGATIVE_CACHE_ENABLED = True
+
+# 需要记录的 GitHub 响应状态码
+NEGATIVE_CACHE_STATUSES = (404, 451)
+
+# 负缓存有效期 (小时), 远短于正常缓存, 以便新注册或恢复的用户尽快可见
+NEGATIVE_CACHE_TTL_HOURS = 6
+
+# 内存中最多保存的负缓存条目数
+NEGATIVE_CACHE_MAX = 10000
+
+# 从数据库增量加载其他进程写入的负缓存记录的间隔 (秒)
+NEGATIVE_CACHE_RELOAD_SECONDS = 60
+
+# 各接口在用户不存在时至少会发出的 GitHub API 请求数, 用于统计负缓存节省的额度
+NEGATIVE_CACHE_SAVED_REQUESTS = {
+    'user_info': 1,
+    'repos_info': 1,
+    'issues_info': 1,
+    'evaluate': 2,
+    'total': 1,
+    'profile': 2,
+}
+
+# Github 表写缓冲配置: 合并同一用户的多列更新, 并将多个用户合并为一条 upsert
+# 缓冲写入的最长等待时间 (毫秒), 到时由后台线程统一写入
+WRITE_FLUSH_INTERVAL_MS = 200
+
+# 缓冲中的用户数达到该值时立即写入, 同时也是一条 upsert 语句包含的最大用户数
+WRITE_BATCH_MAX_USERS = 50
+
+# 是否在每个请求结束时写入缓冲, 关闭后仅由定时器与批量上限触发, 合并效果更好
+WRITE_FLUSH_ON_REQUEST_END = False
+
+# Github 表异步写入 (write-behind) 配置
+# 是否启用异步写入: 启用后接口计算完成即返回, 由后台线程写入; 关闭后在请求线程中同步写入
+WRITE_BEHIND_ENABLED = True
+
+# 写入队列最多容纳的待写入用户数, 队列满时请求线程先等待, 超时后在请求线程中同步写入
+WRITE_QUEUE_MAX_USERS = 1000
+
+# 队列满时请求线程最多等待的时长 (秒)
+WRITE_ENQUEUE_TIMEOUT_SECONDS = 2
+
+# 单个用户写入失败后的最大重试次数, 超过后转存到本地文件
+WRITE_MAX_RETRIES = 5
+
+# 写入失败后的最长退避时间 (秒)
+WRITE_RETRY_MAX_BACKOFF_SECONDS = 30
+
+# 关闭时未能写入数据库的数据转存文件, 下次启动时重新加入队列
+WRITE_SPILL_FILE = "spill/github_writes.jsonl"
+
+# Github 表进程内 LRU 缓存配置
+# 是否启用进程内缓存
+ROW_CACHE_ENABLED = True
+
+# 缓存条目的有效期 (秒), 其他进程的写入最多在该时长后可见, 多进程部署时由共享缓存承担主要读负载
+ROW_CACHE_TTL_SECONDS = 10
+
+# 最多缓存的用户数
+ROW_CACHE_MAX_ENTRIES = 5000
+
+# 缓存占用的估算内存上限 (字节)
+ROW_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 跨进程共享缓存配置: 缓存 Github 表数据、推荐列表与 GitHub API 响应
+# 共享存储类型: redis (多进程/多主机部署), local (进程内替代实现, 用于单进程与测试), none (不启用)
+SHARED_CACHE_BACKEND = "local"
+
+# 共享缓存的键前缀
+SHARED_CACHE_PREFIX = "github_rank"
+
+# 共享缓存数据的有效期 (秒)
+SHARED_CACHE_TTL_SECONDS = 600
+
+# 进程内缓存 (含版本号) 的有效期 (秒), 其他进程的失效最多在该时长后可见
+SHARED_CACHE_LOCAL_TTL_SECONDS = 5
+
+# 进程内缓存最多保存的键数
+SHARED_CACHE_LOCAL_MAX_ENTRIES = 10000
+
+# 版本号键的有效期 (秒), 不短于数据的有效期, 写入数据时续期
+SHARED_CACHE_VERSION_TTL_SECONDS = 86400
+
+# local 共享存储最多保存的键数, 超过时淘汰最久未使用的键
+SHARED_CACHE_LOCAL_BACKEND_MAX_ENTRIES = 100000
+
+# local 共享存储清理过期键的间隔 (秒)
+SHARED_CACHE_LOCAL_BACKEND_SWEEP_SECONDS = 60
+
+# 排行榜配置: 按 Github 表的 score 列分页读取, 每页结果写入共享缓存, 保存评分后失效
+# 默认每页用户数
+RANK_DEFAULT_PAGE_SIZE = 100
+
+# 每页用户数上限
+RANK_MAX_PAGE_SIZE = 100
+
+# 内存排行榜配置: 启动时从数据库加载全部评分, 保存评分后增量更新
+LEADERBOARD_ENABLED = True
+
+# 重新加载的间隔 (秒), 用于同步其他进程写入的评分
+LEADERBOARD_RELOAD_SECONDS = 600
+
+# 加载时每批读取的行数
+LEADERBOARD_LOAD_BATCH = 10000
+
+# 查询名次时前后最多返回的用户数
+LEADERBOARD_MAX_NEIGHBORS = 50
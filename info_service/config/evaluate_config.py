@@ -42,3 +42,37 @@ TOTAL_PROJECT_IMPORTANCE_MEDIAN = 80  # 假设项目的总重要性中位数
 
 # 开发者贡献度中位数 (根据实际情况设定)
 TOTAL_CONTRIBUTION_MEDIAN = 80  # 假设贡献度的中位数
+
+# 分位数草图配置: 每次评估的指标写入 KLL 草图, 样本足够后用实际中位数代替上面的默认中位数, 并给出各指标的百分位
+# 记录分位数的指标, 其中 score 为总评分
+QUANTILE_METRICS = ('commits', 'prs', 'issues', 'stars', 'followers', 'project_importance', 'contribution', 'score')
+
+# 草图精度参数, 元素数约为 3k, 分位数误差约为 1/k
+QUANTILE_SKETCH_K = 200
+
+# 指标样本数达到该值后才使用草图中的中位数
+QUANTILE_MIN_SAMPLES = 1000
+
+# 与数据库中的草图合并的间隔 (秒)
+QUANTILE_FLUSH_SECONDS = 60
+
+# 评估数据获取后端: "rest" 每个仓库发起多次 REST 请求, "graphql" 分页批量查询所有仓库统计
+EVALUATE_BACKEND = "rest"
+
+# REST 评估时保存每个仓库的提交/PR/Issue 计数快照, 仓库的 pushed_at 与 updated_at 未变化时不再重新统计
+REPO_SNAPSHOT_ENABLED = True
+
+# GraphQL 每页查询的仓库数量 (提交历史统计开销较大, 不宜过高)
+GRAPHQL_REPOS_PAGE_SIZE = 50
+
+# 评估时最多统计的仓库数 (按最近推送排序), REST 与 GraphQL 后端使用相同的仓库范围
+EVALUATE_MAX_REPOS = 500
+
+# 离线重新评分时每批读取的行数
+RESCORE_LOAD_BATCH = 20000
+
+# 仓库表中的语言在仓库未推送时最多复用的天数, 超过后重新获取
+REPO_LANGUAGES_MAX_AGE_DAYS = 30
+
+# 每条语句读写的仓库数
+REPO_STORE_BATCH = 500
@@ -2,6 +2,10 @@
 GITHUB_USER_URL = "https://api.github.com/users/{username}"
 # GitHub API 用户仓库 URL，按最近推送时间排序
 GITHUB_REPOS_URL = "https://api.github.com/users/{username}/repos?sort=pushed"
+# GitHub API 列表接口未指定 per_page 时的每页条目数
+GITHUB_DEFAULT_PAGE_SIZE = 30
+# GitHub API 列表接口 per_page 的上限
+GITHUB_MAX_PAGE_SIZE = 100
 # GitHub API 用户公开事件 URL
 GITHUB_EVENTS_URL = "https://api.github.com/users/{username}/events/public"
 # GitHub API 仓库贡献者 URL
@@ -12,3 +16,7 @@ GITHUB_COMMITS_URL = "https://api.github.com/repos/{username}/{repo}/commits"
 GITHUB_FOLLOWERS_URL = "https://api.github.com/users/{username}/followers"
 # GitHub API 用户关注 URL
 GITHUB_FOLLOWING_URL = "https://api.github.com/users/{username}/following"
+# GitHub 仓库 README 原始文件 URL
+GITHUB_README_URL = "https://raw.githubusercontent.com/{username}/{repo}/{branch}/README.md"
+# GitHub GraphQL API URL
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
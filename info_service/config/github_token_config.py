@@ -12,4 +12,7 @@ class Config:
 
     if config:
         token = config.get("token")
-        print("配置内容:", config)
+        # 多个 Token 组成凭证池, 兼容只配置单个 token 的情况
+        tokens = config.get("tokens") or ([token] if token else [])
+        # 不打印 Token 本身, 只输出数量
+        print(f"GitHub Token 配置已加载: {len(tokens)}个Token")
@@ -0,0 +1,37 @@
+# GitHub HTTP 客户端配置
+# 每个主机的 keep-alive 连接池大小 (同一主机最多保持的空闲连接数)
+GITHUB_POOL_SIZES = {
+    "api.github.com": 20,  # GitHub REST/GraphQL API
+    "raw.githubusercontent.com": 10,  # README 等原始文件
+}
+
+# 未单独配置的主机使用的默认连接池大小
+DEFAULT_POOL_SIZE = 10
+
+# 连接池耗尽时是否阻塞等待 (False 表示临时新建连接, 用完即关闭)
+POOL_BLOCK = False
+
+# 连接失败时的重试次数 (仅针对建立连接阶段)
+MAX_RETRIES = 2
+
+# 默认请求超时时间 (秒)
+REQUEST_TIMEOUT = 30
+
+# 需要携带 Token 认证的主机
+AUTH_HOSTS = {"api.github.com"}
+
+# 是否对 GitHub API 的 GET 请求启用 ETag 条件请求缓存 (304 响应不计入速率限制)
+ETAG_CACHE_ENABLED = True
+
+# 启用条件请求缓存的主机
+ETAG_CACHE_HOSTS = {"api.github.com"}
+
+# 所有 Token 的额度都耗尽时, 请求最多等待额度重置的时间 (秒), 超时后仍使用最早重置的 Token 发送
+TOKEN_POOL_MAX_WAIT = 300
+
+# 尚未收到速率限制响应头时, 假定每个 Token 在各类资源上的请求额度
+TOKEN_DEFAULT_LIMITS = {
+    "core": 5000,  # REST API, 每小时
+    "search": 30,  # 搜索 API, 每分钟
+    "graphql": 5000,  # GraphQL API, 每小时积分
+}
@@ -1,76 +1,118 @@
-import concurrent
 import re
-from collections import Counter
-from datetime import datetime
+from datetime import datetime, timedelta
 
-import langid
 import requests
 import json
 import urllib3
 from dateutil import parser
 
+from info_service.config.cache_config import (
+    CACHE_TTL_DAYS, STALE_WHILE_REVALIDATE, MAX_STALENESS_DAYS, LEADERBOARD_MAX_NEIGHBORS, RANK_MAX_PAGE_SIZE
+)
 from info_service.config.cohere_config import CohereConfig
-from info_service.config.github_token_config import Config
-from info_service.config.nation_config import Nation
 from info_service.utils.logger_utils import logger
-from info_service.services.info_service import (
-    save_user_data, save_user_reops_data,
-    save_user_tech_info_data, save_user_guess_nation_info_data, save_user_summary_info_data,
-    get_github_id, save_evaluate_info, save_user_issues_data
-)
-from info_service.utils.agent_utils import get_random_user_agent
-from info_service.config.github_config import (
-    GITHUB_USER_URL, GITHUB_REPOS_URL, GITHUB_EVENTS_URL, GITHUB_FOLLOWING_URL, GITHUB_FOLLOWERS_URL,
-)
-from info_service.utils.evaluate_utils import evaluate_github_user
-from info_service.utils.tech_utils import get_tech_type, get_tech_language_details
+from info_service.utils.etag_cache import etag_cache
+from info_service.utils.negative_cache import negative_cache, skip_missing
+from info_service.utils.read_stats import column_read_stats
+from info_service.utils.row_cache import row_cache
+from info_service.utils.shared_cache import shared_cache
+from info_service.services.info_service import pool, get_rank_data, get_repository_stats
+from info_service.utils.leaderboard import leaderboard
+from info_service.utils.quantile_sketch import metric_sketches
+from info_service.utils.rescore_utils import rescore_all
+from info_service.utils.query_stats import query_stats
+from info_service.utils.github_client import github_client, GithubNotFoundError
+from info_service.utils.singleflight import coalesce, single_flight
+from info_service.utils.token_pool import token_pool
+from info_service.config.github_config import GITHUB_USER_URL, GITHUB_REPOS_URL
+from info_service.utils.evaluate_utils import evaluate_github_user, get_repo_counts
+from info_service.utils.nation_utils import guess_user_nation
+from info_service.utils.pipeline_utils import Stage, run_pipeline
+from info_service.utils.refresh_utils import background_refresher
+from info_service.utils.warmup_utils import warmup_scheduler
+from info_service.utils.write_buffer import write_buffer
+from info_service.utils.summary_utils import build_summary_prompt, generate_summary
+from info_service.utils.tech_utils import build_tech_info
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
+def get_cache_age(updated_at):
+    """
+    计算缓存数据距今的时长
+    :param updated_at: 更新时间, datetime 或 ISO 格式字符串
+    :return: timedelta, 无更新时间时返回 None
+    """
+    if isinstance(updated_at, str):
+        updated_at = parser.isoparse(updated_at)
+    if not updated_at:
+        return None
+    return datetime.now() - updated_at
+
+
+def serve_from_cache(username, column, result, refresh, build=None):
+    """
+    根据缓存时长决定是否返回缓存数据
+    未过期时直接返回; 过期但未超过最大容忍时长时返回过期数据并提交后台刷新; 否则返回 None, 由调用方同步刷新
+    :param username: GitHub用户名
+    :param column: 缓存列名
+    :param result: write_buffer.read 的查询结果
+    :param refresh: 刷新函数, 以 (username, force_refresh=True) 调用
+    :param build: 由缓存列构造响应数据的函数, 默认直接返回列数据
+    :return: (数据, 状态码[, 响应头]) 或 None
+    """
+    value = result.get(column)
+    # 每列按自己的获取时间判断是否过期, 其他列的写入不会让该列显得新鲜
+    age = get_cache_age(result.get('fetched_at', {}).get(column))
+    if value is None or age is None:
+        return None
+
+    data = build(value) if build else value
+    if age <= timedelta(days=CACHE_TTL_DAYS):
+        logger.info(f"返回用户{username}的缓存{column}信息")
+        return data, 200
+
+    if STALE_WHILE_REVALIDATE and age <= timedelta(days=MAX_STALENESS_DAYS):
+        logger.info(f"返回用户{username}的过期{column}信息, 并在后台刷新")
+        background_refresher.submit((username.lower(), column), refresh, username, force_refresh=True)
+        return data, 200, {'X-Cache-Status': 'STALE', 'Age': str(int(age.total_seconds()))}
+    return None
+
+
 class InfoController:
     """info 控制器类,处理所有 info 相关的请求"""
 
     @staticmethod
-    def get_user_info(username):
+    @skip_missing('user_info')
+    @coalesce('user_info')
+    def get_user_info(username, force_refresh=False):
         """获取用户基本信息"""
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('user_info',))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get('user_info'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('user_info')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'user_info', result, InfoController.get_user_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的基本信息")
             user_url = GITHUB_USER_URL.format(username=username)
-            session = requests.Session()
-            headers = {
-                'User-Agent': get_random_user_agent(),
-                'Authorization': f'token {Config.token}'
-            } if Config.token else {'User-Agent': get_random_user_agent()}
-
-            user_response = session.get(user_url, headers=headers, verify=False, timeout=30)
+            user_response = github_client.get(user_url, verify=False)
             if user_response.status_code == 200:
                 user_data = user_response.json()
                 logger.info(f"成功获取用户{username}的基本信息")
                 logger.debug(f"用户{username}的详细信息: {user_data}")
-                if save_user_data(username, user_data):
-                    return user_data, 200
-                logger.error(f"保存用户{username}的基本信息失败")
-                return {'error': '保存用户信息失败'}, 500
-            elif user_response.status_code == 404:
-                logger.error(f"用户{username}不存在")
-                return {'error': '用户不存在'}, 404
+                write_buffer.add(username, {'user_info': user_data})
+                return user_data, 200
+            elif user_response.status_code in (404, 451):
+                logger.error(f"用户{username}不存在或不可用: 状态码 {user_response.status_code}")
+                negative_cache.record(username, user_response.status_code)
+                return {'error': '用户不存在'}, user_response.status_code
             else:
                 logger.error(f"获取用户{username}信息失败: 状态码 {user_response.status_code}")
                 return {'error': '获取用户信息失败'}, user_response.status_code
@@ -85,44 +127,35 @@ class InfoController:
             return {'error': '获取用户信息失败'}, 500
 
     @staticmethod
-    def get_user_repos_info(username):
+    @skip_missing('repos_info')
+    @coalesce('repos_info')
+    def get_user_repos_info(username, force_refresh=False):
         """获取用户仓库信息"""
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('repos_info',))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get('repos_info'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('repos_info')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'repos_info', result, InfoController.get_user_repos_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的仓库信息")
             user_url = GITHUB_REPOS_URL.format(username=username)
-            session = requests.Session()
-            headers = {
-                'User-Agent': get_random_user_agent(),
-                'Authorization': f'token {Config.token}'
-            } if Config.token else {'User-Agent': get_random_user_agent()}
-
-            user_response = session.get(user_url, headers=headers, verify=False, timeout=30)
+            user_response = github_client.get(user_url, verify=False)
             if user_response.status_code == 200:
                 user_data = user_response.json()
                 logger.info(f"成功获取用户{username}的仓库信息,共{len(user_data)}个仓库")
-                if save_user_reops_data(username, user_data):
-                    return user_data, 200
-                logger.error(f"保存用户{username}的仓库信息失败")
-                return {'error': '保存用户项目信息失败'}, 500
-            elif user_response.status_code == 404:
-                logger.error(f"用户{username}不存在")
-                return {'error': '用户不存在'}, 404
+                write_buffer.add(username, {'repos_info': user_data})
+                return user_data, 200
+            elif user_response.status_code in (404, 451):
+                logger.error(f"用户{username}不存在或不可用: 状态码 {user_response.status_code}")
+                negative_cache.record(username, user_response.status_code)
+                return {'error': '用户不存在'}, user_response.status_code
             else:
                 logger.error(f"获取用户{username}仓库信息失败: 状态码 {user_response.status_code}")
                 return {'error': '获取用户项目信息失败'}, user_response.status_code
@@ -138,7 +171,9 @@ class InfoController:
 
 
     @staticmethod
-    def get_user_issue_info(username):
+    @skip_missing('issues_info')
+    @coalesce('issues_info')
+    def get_user_issue_info(username, force_refresh=False):
         """
         获取用户的issue信息
         :param username: GitHub用户ID
@@ -149,32 +184,20 @@ class InfoController:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('issues_info',))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get('issues_info'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('issues_info')), 200
-
-            # 设置请求头
-            headers = {
-                'User-Agent': get_random_user_agent(),
-                'Authorization': f'token {Config.token}'
-            } if Config.token else {'User-Agent': get_random_user_agent()}
-
-            session = requests.Session()
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'issues_info', result, InfoController.get_user_issue_info)
+                    if cached:
+                        return cached
 
             # 存储所有issue信息
             all_issues = []
 
             # 获取用户的issue信息，添加is:issue查询参数
             issues_url = f"https://api.github.com/search/issues?q=user:{username}+is:issue&sort=updated&order=desc"
-            issues_response = session.get(issues_url, headers=headers, verify=False, timeout=30)
+            issues_response = github_client.get(issues_url, verify=False)
             issues_data = issues_response.json()
 
             # 处理返回的issue数据
@@ -198,8 +221,8 @@ class InfoController:
 
             logger.info(f"成功获取用户{username}的issue信息")
 
-            if save_user_issues_data(username, all_issues):
-                return all_issues, 200
+            write_buffer.add(username, {'issues_info': all_issues})
+            return all_issues, 200
 
         except requests.exceptions.Timeout:
             logger.error(f"获取用户{username}的issue信息超时")
@@ -212,251 +235,92 @@ class InfoController:
             return {'error': '获取issue信息失败'}, 500
 
     @staticmethod
-    def get_user_tech_info(username):
+    @skip_missing('tech_stack')
+    @coalesce('tech_stack')
+    def get_user_tech_info(username, force_refresh=False):
         """获取用户技术栈信息"""
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('tech_stack', 'repos_info'))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get('tech_stack'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('tech_stack')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'tech_stack', result, InfoController.get_user_tech_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的技术栈信息")
             if not result:
                 logger.error(f"获取用户{username}的GitHub ID失败")
                 return {'error': '获取GitHub ID失败'}, 404
 
-            repos = json.loads(result.get('repos_info', '[]'))
-            language_details = get_tech_language_details(repos)
-            # 判断技术型
-            tech_type = get_tech_type(language_details)
-            logger.info(f"用户{username}的技术栈类型为: {tech_type}")
-
-            tech_info = {
-                "languages": language_details,
-                "techs": tech_type
-            }
+            repos = result.get('repos_info') or []
+            tech_info = build_tech_info(repos)
+            logger.info(f"用户{username}的技术栈类型为: {tech_info['techs']}")
 
-            if save_user_tech_info_data(username, tech_info):
-                return tech_info, 200
-            logger.error(f"保存用户{username}的技术栈信息失败")
-            return {'error': '保存用户技术信息失败'}, 500
+            write_buffer.add(username, {'tech_stack': tech_info})
+            return tech_info, 200
 
         except Exception as e:
             logger.error(f"获取用户{username}技术栈信息失败: {e}", exc_info=True)
             return {'error': '获取用户技术信息失败'}, 500
 
     @staticmethod
-    def get_user_guess_nation_info(username):
+    @skip_missing('guess_nation')
+    @coalesce('guess_nation')
+    def get_user_guess_nation_info(username, force_refresh=False):
         """猜测用户国家信息"""
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('most_common_language', 'user_info', 'repos_info'))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get('most_common_language'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('most_common_language')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'most_common_language', result,
+                                              InfoController.get_user_guess_nation_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始猜测用户{username}的国家信息")
             if not result:
                 logger.error(f"获取用户{username}的GitHub ID失败")
                 return {'error': '获取GitHub ID失败'}, 404
 
-            user_data = json.loads(result.get('user_info', '{}'))
-            repos_data = json.loads(result.get('repos_info', '[]'))
-
-            # 1. 检查用户资料中的位置信息
-            location = user_data.get("location")
-            if location:
-                logger.info(f"从用户资料中获取到位置信息: {location}")
-                if save_user_guess_nation_info_data(username, {"guess_nation": location}):
-                    return {"guess_nation": location}, 200
-
-            # 2. 并行请求读取 README 文件并分析语言
-            def fetch_readme_language(repo):
-                for branch in ["main", "master"]:
-                    readme_url = f"https://raw.githubusercontent.com/{username}/{repo['name']}/{branch}/README.md"
-                    try:
-                        readme_response = requests.get(readme_url, timeout=30)
-                        readme_response.raise_for_status()
-                        readme_content = readme_response.text
-
-                        if not readme_content.strip():
-                            continue
-
-                        lang, confidence = langid.classify(readme_content)
-                        if confidence < 0.5:
-                            continue
-                        nation_mapping = Nation.nation_mapping
-                        if lang in nation_mapping:
-                            guess_nation = nation_mapping[lang]
-                            logger.info(f"用户{username}的README使用{lang}语言,推测来自{guess_nation}")
-                            if save_user_guess_nation_info_data(username, {"guess_nation": guess_nation}):
-                                return {"guess_nation": guess_nation}, 200
-                    except (requests.exceptions.RequestException, UnicodeDecodeError) as e:
-                        logger.debug(f"获取或解析README失败: {str(e)}")
-                        continue
-                return None
-
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = [executor.submit(fetch_readme_language, repo) for repo in repos_data]
-                for future in concurrent.futures.as_completed(futures):
-                    result = future.result()
-                    if result:
-                        return result
-
-            # 3. 从活动记录中获取位置信息
-            def fetch_event_location(event):
-                if event["type"] == "PushEvent":
-                    for commit in event["payload"].get("commits", []):
-                        try:
-                            commit_response = requests.get(
-                                commit["url"],
-                                headers={'User-Agent': get_random_user_agent()},
-                                timeout=30
-                            )
-                            commit_response.raise_for_status()
-                            commit_data = commit_response.json()
-
-                            location_keywords = ["country", "city", "location"]
-                            commit_message = commit_data.get("commit", {}).get("message", "").lower()
-                            author_name = commit_data.get("commit", {}).get("author", {}).get("name", "").lower()
-                            author_email = commit_data.get("commit", {}).get("author", {}).get("email", "").lower()
-
-                            for text in [commit_message, author_name, author_email]:
-                                if any(keyword in text for keyword in location_keywords):
-                                    logger.info(f"在用户{username}的提交信息中找到位置信息: {text}")
-                                    if save_user_guess_nation_info_data(username, {"guess_nation": text}):
-                                        return {"guess_nation": text}, 200
-                        except (requests.exceptions.RequestException, ValueError) as e:
-                            logger.debug(f"获取或解析提交信息失败: {str(e)}")
-                            continue
-                return None
+            user_data = result.get('user_info') or {}
+            repos_data = result.get('repos_info') or []
 
-            try:
-                events_response = requests.get(
-                    GITHUB_EVENTS_URL.format(username=username),
-                    headers={'User-Agent': get_random_user_agent()},
-                    timeout=30
-                )
-                events_response.raise_for_status()
-                events_data = events_response.json()
-
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    futures = [executor.submit(fetch_event_location, event) for event in events_data]
-                    for future in concurrent.futures.as_completed(futures):
-                        result = future.result()
-                        if result:
-                            return result
-            except (requests.exceptions.RequestException, ValueError) as e:
-                logger.warning(f"获取用户活动记录失败: {str(e)}")
-
-            # 4. 根据关系网络推测国家信息
-            def analyze_network_locations():
-                follower_locations = []
-                following_locations = []
-
-                try:
-                    # 获取关注者
-                    followers_response = requests.get(
-                        GITHUB_FOLLOWERS_URL.format(username=username),
-                        headers={'User-Agent': get_random_user_agent()},
-                        timeout=30
-                    )
-                    followers_response.raise_for_status()
-                    followers = followers_response.json()
-
-                    for follower in followers:
-                        follower_info = requests.get(
-                            GITHUB_USER_URL.format(username=follower['login']),
-                            headers={'User-Agent': get_random_user_agent()},
-                            timeout=30
-                        ).json()
-                        location = follower_info.get("location")
-                        if location:
-                            follower_locations.append(location)
-
-                    # 获取关注的用户
-                    following_response = requests.get(
-                        GITHUB_FOLLOWING_URL.format(username=username),
-                        headers={'User-Agent': get_random_user_agent()},
-                        timeout=30
-                    )
-                    following_response.raise_for_status()
-                    following = following_response.json()
-
-                    for follow in following:
-                        following_info = requests.get(
-                            GITHUB_USER_URL.format(follow['login']),
-                            headers={'User-Agent': get_random_user_agent()},
-                            timeout=30
-                        ).json()
-                        location = following_info.get("location")
-                        if location:
-                            following_locations.append(location)
-
-                    # 统计位置频率
-                    location_counts = Counter(follower_locations + following_locations)
-                    if location_counts:
-                        most_common_location, _ = location_counts.most_common(1)[0]
-                        logger.info(f"通过关系网络推测用户{username}的国家: {most_common_location}")
-                        if save_user_guess_nation_info_data(username, {"guess_nation": most_common_location}):
-                            return {"guess_nation": most_common_location}, 200
-                except (requests.exceptions.RequestException, ValueError) as e:
-                    logger.warning(f"获取关系网络信息失败: {str(e)}")
-                    return None
-
-            network_result = analyze_network_locations()
-            if network_result:
-                return network_result
-
-            logger.info(f"未能找到用户{username}的位置信息")
-            if save_user_guess_nation_info_data(username, {"guess_nation": "Unknown"}):
-                return {"guess_nation": "Unknown"}, 200
-            return {'error': '保存猜测信息失败'}, 500
+            guess_nation = guess_user_nation(username, user_data, repos_data)
+            write_buffer.add(username, {'most_common_language': {"guess_nation": guess_nation}})
+            return {"guess_nation": guess_nation}, 200
 
         except Exception as e:
             logger.error(f"猜测用户{username}国家信息失败: {e}", exc_info=True)
             return {'error': '猜测用户国家信息失败'}, 500
 
     @staticmethod
-    def get_user_summary_info(username):
+    @skip_missing('summary')
+    @coalesce('summary')
+    def get_user_summary_info(username, force_refresh=False):
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('summa', 'user_info', 'most_common_language', 'tech_stack'))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get(
-                        'summa'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return {"summary": json.loads(result.get('summa')), "updated_at": result.get('updated_at')}, 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'summa', result, InfoController.get_user_summary_info,
+                                              build=lambda value: {"summary": value,
+                                                                   "updated_at": result['fetched_at']['summa'].isoformat()})
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的总结信息")
 
@@ -464,30 +328,14 @@ class InfoController:
                 logger.error(f"获取用户{username}的GitHub ID失败")
                 return {'error': '获取GitHub ID失败'}, 404
 
-            user_info = json.loads(result.get('user_info', '{}'))
-            most_common_language = result.get('most_common_language', '未知语言')
-            tech_stack = json.loads(result.get('tech_stack', '[]') or '[]')
+            user_info = result.get('user_info') or {}
+            nation = result.get('most_common_language')
+            most_common_language = nation.get('guess_nation') if isinstance(nation, dict) else nation
+            tech_stack = result.get('tech_stack') or []
 
             # 生成提示信息
             logger.info(f"正在为用户{username}生成总结提示信息")
-            prompt_data = (
-                f"用户名: {user_info.get('login', '未知')}\n"
-                f"姓名: {user_info.get('name', '未知')}\n"
-                f"公司: {user_info.get('company', '未知')}\n"
-                f"博客: {user_info.get('blog', '无')}\n"
-                f"位置: {user_info.get('location', '未知')}\n"
-                f"邮箱: {user_info.get('email', '无')}\n"
-                f"是否可雇佣: {user_info.get('hireable', '未知')}\n"
-                f"简介: {user_info.get('bio', '无简介')}\n"
-                f"Twitter用户名: {user_info.get('twitter_username', '无')}\n"
-                f"公开仓库数: {user_info.get('public_repos', 0)}\n"
-                f"公开Gists数: {user_info.get('public_gists', 0)}\n"
-                f"粉丝数: {user_info.get('followers', 0)}\n"
-                f"关注数: {user_info.get('following', 0)}\n"
-                f"最常用的项目语言: {most_common_language}\n"
-                f"主要技术栈: {tech_stack}\n"
-                "以上信息是有关GitHub用户的个人信息，请以此生成一段用户介绍信息，要求300字英文！"
-            )
+            prompt_data = build_summary_prompt(user_info, most_common_language, tech_stack)
 
             # 调用Cohere API
             logger.info(f"开始调用Cohere API生成用户{username}的总结")
@@ -495,49 +343,16 @@ class InfoController:
                 logger.error("Cohere API密钥未配置")
                 return {'error': 'Cohere API密钥未配置'}, 500
 
-            headers = {
-                'Authorization': f'BEARER {CohereConfig.COHEREKEY}',
-                'Content-Type': 'application/json'
-            }
-
-            data = {
-                'model': 'command',
-                'prompt': prompt_data,
-                'max_tokens': 300,
-                'temperature': 0.7,
-                'k': 0,
-                'stop_sequences': [],
-                'return_likelihoods': 'NONE'
-            }
-
             try:
-                response = requests.post(
-                    'https://api.cohere.ai/v1/generate',
-                    headers=headers,
-                    json=data,
-                    verify=False,
-                    timeout=30
-                )
-                response.raise_for_status()
-
-                logger.info("成功从Cohere API获取响应")
-                response_data = response.json()
-                if not response_data.get('generations'):
-                    logger.error("Cohere API返回的生成结果为空")
-                    return {'error': 'AI生成失败'}, 500
-
-                summary_text = response_data['generations'][0]['text'].strip()
+                summary_text = generate_summary(prompt_data)
                 if not summary_text:
-                    logger.error("生成的总结内容为空")
-                    return {'error': '生成的总结内容为空'}, 500
+                    return {'error': 'AI生成失败'}, 500
 
                 logger.info(f"成功生成用户{username}的总结信息")
                 logger.debug(f"用户{username}的总结内容: {summary_text}")
 
-                if save_user_summary_info_data(username, summary_text):
-                    return {"summary": summary_text, "updated_at": result.get('updated_at')}, 200
-                logger.error(f"保存用户{username}的总结信息失败")
-                return {'error': '保存总结信息失败'}, 500
+                write_buffer.add(username, {'summa': summary_text})
+                return {"summary": summary_text, "updated_at": datetime.now().isoformat()}, 200
 
             except requests.exceptions.Timeout:
                 logger.error("Cohere API请求超时")
@@ -554,25 +369,22 @@ class InfoController:
             return {'error': '获取用户总结信息失败'}, 500
 
     @staticmethod
-    def get_evaluate_info(username):
+    @skip_missing('evaluate')
+    @coalesce('evaluate')
+    def get_evaluate_info(username, force_refresh=False):
         """获取用户GitHub统计评价信息"""
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('evaluate',))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get(
-                        'evaluate'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('evaluate')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'evaluate', result, InfoController.get_evaluate_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的GitHub统计评价信息")
             stats = evaluate_github_user(username)
@@ -580,10 +392,8 @@ class InfoController:
                 logger.error(f"获取用户{username}的评价数据为空")
                 return {'error': '评价数据为空'}, 404
 
-            if save_evaluate_info(username, stats):
-                return stats, 200
-            logger.error(f"保存用户{username}的评价信息失败")
-            return {'error': '保存用户评价信息失败'}, 500
+            write_buffer.add(username, {'evaluate': stats})
+            return stats, 200
 
         except requests.exceptions.Timeout:
             logger.error(f"获取用户{username}的GitHub统计数据超时")
@@ -596,72 +406,43 @@ class InfoController:
             return {'error': '获取评价信息失败'}, 500
 
     @staticmethod
-    def get_user_total_info(username):
+    @skip_missing('total')
+    @coalesce('total')
+    def get_user_total_info(username, force_refresh=False):
         try:
             if not username:
                 logger.error("用户ID不能为空")
                 return {'error': '用户ID不能为空'}, 400
 
-            result = get_github_id(username)
+            result = write_buffer.read(username, ('total',))
             if result:
-                result = json.loads(result)
                 # 检查是否有最近的缓存数据
-                updated_at = result.get('updated_at')
-                if isinstance(updated_at, str):
-                    updated_at = parser.isoparse(updated_at)
-
-                if updated_at and (datetime.now().date() - updated_at.date()).days <= 7 and result.get(
-                        'total'):
-                    logger.info(f"返回用户{username}的缓存总结信息")
-                    return json.loads(result.get('total')), 200
+                if not force_refresh:
+                    cached = serve_from_cache(username, 'total', result, InfoController.get_user_total_info)
+                    if cached:
+                        return cached
 
             logger.info(f"开始获取用户{username}的总信息")
-            session = requests.Session()
-            headers = {
-                'User-Agent': get_random_user_agent(),
-                'Authorization': f'token {Config.token}'
-            } if Config.token else {'User-Agent': get_random_user_agent()}
-
             # 获取用户的仓库信息
             repos_url = GITHUB_REPOS_URL.format(username=username)
-            repos_response = session.get(repos_url, headers=headers, verify=False, timeout=30)
+            repos_response = github_client.get(repos_url, verify=False)
+            if repos_response.status_code in (404, 451):
+                logger.error(f"用户{username}不存在或不可用: 状态码 {repos_response.status_code}")
+                negative_cache.record(username, repos_response.status_code)
+                return {'error': '用户不存在'}, repos_response.status_code
             repos_response.raise_for_status()
             repos_data = repos_response.json()
 
-            total_commits = 0
-            total_forks = 0
-            total_issues = 0
-            total_prs = 0
-            total_stars = 0
-
-            for repo in repos_data:
-                total_forks += repo.get('forks_count', 0)
-                total_stars += repo.get('stargazers_count', 0)
-
-                # 获取每个仓库的提交数
-                commits_url = f"https://api.github.com/repos/{username}/{repo['name']}/commits"
-                commits_response = session.get(commits_url, headers=headers, verify=False, timeout=30)
-                commits_response.raise_for_status()
-                total_commits += len(commits_response.json())
-
-                # 获取每个仓库的拉取请求数
-                prs_url = f"https://api.github.com/repos/{username}/{repo['name']}/pulls"
-                prs_response = session.get(prs_url, headers=headers, verify=False, timeout=30)
-                prs_response.raise_for_status()
-                total_prs += len(prs_response.json())
-
-                # 获取每个仓库的问题数
-                issues_url = f"https://api.github.com/repos/{username}/{repo['name']}/issues"
-                issues_response = session.get(issues_url, headers=headers, verify=False, timeout=30)
-                issues_response.raise_for_status()
-                total_issues += len(issues_response.json())
+            # 各仓库的提交、PR 与 Issue 数优先使用仓库表中未过期的计数
+            counts, _, report = get_repo_counts(repos_data)
+            logger.info(f"用户{username}的仓库计数: 跳过{report['skipped']}个, 重新统计{report['refetched']}个")
 
             user_total_info = {
-                "commits": total_commits,
-                "forks": total_forks,
-                "issues": total_issues,
-                "prs": total_prs,
-                "stars": total_stars,
+                "commits": sum(repo_counts['commits'] for repo_counts in counts.values()),
+                "forks": sum(repo.get('forks_count', 0) for repo in repos_data),
+                "issues": sum(repo_counts['issues'] for repo_counts in counts.values()),
+                "prs": sum(repo_counts['prs'] for repo_counts in counts.values()),
+                "stars": sum(repo.get('stargazers_count', 0) for repo in repos_data),
                 "username": username
             }
 
@@ -677,3 +458,157 @@ class InfoController:
         except Exception as e:
             logger.error(f"获取用户{username}的总信息失败: {str(e)}", exc_info=True)
             return {'error': '获取总信息失败'}, 500
+
+    @staticmethod
+    def get_rank(page, page_size):
+        """
+        分页获取排行榜
+        :param page: 页码, 从1开始
+        :param page_size: 每页用户数
+        """
+        rank_data = get_rank_data(page, page_size)
+        if rank_data is None:
+            return {'error': '获取排行榜失败'}, 500
+        return rank_data, 200
+
+    @staticmethod
+    def get_rank_position(username, neighbors=0):
+        """
+        获取用户在内存排行榜中的名次、百分位与前后的用户
+        :param username: GitHub用户名
+        :param neighbors: 前后各返回的用户数
+        """
+        if not leaderboard.loaded:
+            return {'error': '排行榜正在加载'}, 503
+        position = leaderboard.position(username, min(neighbors, LEADERBOARD_MAX_NEIGHBORS))
+        if position is None:
+            return {'error': '用户没有评分'}, 404
+        return position, 200
+
+    @staticmethod
+    def get_rank_window(offset, limit):
+        """
+        获取内存排行榜中任意名次区间的用户
+        :param offset: 起始名次 (从0开始)
+        :param limit: 用户数
+        """
+        if not leaderboard.loaded:
+            return {'error': '排行榜正在加载'}, 503
+        return leaderboard.window(offset, min(limit, RANK_MAX_PAGE_SIZE)), 200
+
+    @staticmethod
+    def rescore(dry_run=False):
+        """
+        用保存的原始指标离线重新计算所有用户的评分
+        :param dry_run: 只计算不写入
+        """
+        try:
+            report = rescore_all(dry_run=dry_run)
+        except ImportError:
+            logger.error("离线重新评分需要安装 numpy")
+            return {'error': '离线重新评分需要安装 numpy'}, 501
+        if report is None:
+            return {'error': '已有重新评分任务在执行'}, 409
+        return report, 200
+
+    @staticmethod
+    def get_admin_stats():
+        """获取服务内部运行统计信息"""
+        stats = {
+            "etag_cache": etag_cache.get_stats(),
+            "token_pool": token_pool.get_stats(),
+            "singleflight": single_flight.get_stats(),
+            "background_refresh": background_refresher.get_stats(),
+            "negative_cache": negative_cache.get_stats(),
+            "column_reads": column_read_stats.get_stats(),
+            "row_cache": row_cache.get_stats(),
+            "shared_cache": shared_cache.get_stats(),
+            "db_pool": pool.get_stats(),
+            "db_queries": query_stats.get_stats(),
+            "write_buffer": write_buffer.get_stats(),
+            "leaderboard": leaderboard.get_stats(),
+            "metric_sketches": metric_sketches.get_stats(),
+            "repositories": get_repository_stats(),
+            "warmup": warmup_scheduler.get_stats()
+        }
+        return stats, 200
+
+    @staticmethod
+    @skip_missing('profile')
+    @coalesce('profile')
+    def get_user_profile(username, reuse_summary=False):
+        """
+        一次构建用户的完整资料
+        用户信息与仓库只获取一次, 技术栈、国家、评估与总结按依赖关系并行计算, 所有列一次写入
+        :param reuse_summary: 沿用已缓存的总结, 不调用 Cohere 重新生成, 没有缓存时不生成总结; 预热时使用
+        """
+        try:
+            if not username:
+                logger.error("用户ID不能为空")
+                return {'error': '用户ID不能为空'}, 400
+
+            logger.info(f"开始构建用户{username}的完整资料")
+
+            def build_summary(inputs):
+                if not CohereConfig.COHEREKEY:
+                    raise ValueError('Cohere API密钥未配置')
+                prompt_data = build_summary_prompt(inputs['user'], inputs['nation'], inputs['tech'])
+                return generate_summary(prompt_data)
+
+            stages = [
+                Stage('user', lambda _: github_client.get_json(GITHUB_USER_URL.format(username=username),
+                                                               verify=False)),
+                Stage('repos', lambda _: github_client.get_json(GITHUB_REPOS_URL.format(username=username),
+                                                                verify=False)),
+                Stage('tech', lambda inputs: build_tech_info(inputs['repos']), deps=('repos',)),
+                Stage('nation', lambda inputs: guess_user_nation(username, inputs['user'], inputs['repos']),
+                      deps=('user', 'repos')),
+                Stage('evaluate', lambda inputs: evaluate_github_user(
+                    username, user_data=inputs['user'], repos_data=inputs['repos']), deps=('user', 'repos')),
+                Stage('summary', build_summary, deps=('user', 'tech', 'nation')),
+            ]
+            cached_summary = None
+            if reuse_summary:
+                stages = [stage for stage in stages if stage.name != 'summary']
+                cached = write_buffer.read(username, ('summa',))
+                cached_summary = cached.get('summa') if cached else None
+            results, errors, timings, path = run_pipeline(stages)
+            logger.info(f"用户{username}资料构建完成, 各阶段耗时: {timings}, 关键路径: {' -> '.join(path)}")
+
+            if isinstance(errors.get('user'), GithubNotFoundError):
+                status_code = errors['user'].status_code
+                logger.error(f"用户{username}不存在或不可用: 状态码 {status_code}")
+                negative_cache.record(username, status_code)
+                return {'error': '用户不存在'}, status_code
+            if 'user' in errors or 'repos' in errors:
+                logger.error(f"获取用户{username}的基本信息或仓库信息失败")
+                return {'error': '获取用户信息失败'}, 503
+
+            # 阶段结果与 Github 表列的对应关系
+            columns = {
+                'user_info': results.get('user'),
+                'repos_info': results.get('repos'),
+                'tech_stack': results.get('tech'),
+                'most_common_language': {"guess_nation": results['nation']} if 'nation' in results else None,
+                'evaluate': results.get('evaluate'),
+                'summa': results.get('summary'),
+            }
+            columns = {name: value for name, value in columns.items() if value is not None}
+            write_buffer.add(username, columns)
+
+            profile = {
+                "user_info": results.get('user'),
+                "repos_info": results.get('repos'),
+                "tech_stack": results.get('tech'),
+                "guess_nation": results.get('nation'),
+                "evaluate": results.get('evaluate'),
+                "summary": results.get('summary', cached_summary),
+                "errors": {name: str(error) for name, error in errors.items()},
+                "timings": timings,
+                "critical_path": path
+            }
+            return profile, 200
+
+        except Exception as e:
+            logger.error(f"构建用户{username}完整资料失败: {e}", exc_info=True)
+            return {'error': '构建用户资料失败'}, 500
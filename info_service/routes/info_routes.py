@@ -5,7 +5,17 @@ from flask import jsonify, request, Blueprint
 from info_service.utils.actor_utils import run_actor
 from info_service.utils.logger_utils import logger
 
+from info_service.config.cache_config import (
+    WARMUP_ENABLED, WRITE_FLUSH_ON_REQUEST_END, WRITE_BEHIND_ENABLED, RANK_DEFAULT_PAGE_SIZE, RANK_MAX_PAGE_SIZE,
+    LEADERBOARD_ENABLED, LEADERBOARD_MAX_NEIGHBORS
+)
 from info_service.controllers.info_controller import InfoController
+from info_service.services.info_service import pool, get_scores_after, get_metric_sketches, update_metric_sketches
+from info_service.utils.leaderboard import leaderboard
+from info_service.utils.quantile_sketch import metric_sketches
+from info_service.utils.warmup_utils import access_tracker, interactive_requests, warmup_scheduler
+from info_service.utils.write_buffer import write_buffer
+from info_service.utils.jwt_utils import admin_required
 
 # 定义蓝图
 info_bp = Blueprint('info', __name__)
@@ -15,6 +25,41 @@ info_bp = Blueprint('info', __name__)
 def register_info_blueprint(app):
     app.register_blueprint(info_bp, url_prefix='/info')
     Swagger(app)
+    pool.start_health_check()
+    if WRITE_BEHIND_ENABLED:
+        write_buffer.start()
+    if LEADERBOARD_ENABLED:
+        leaderboard.start(get_scores_after)
+    metric_sketches.start(get_metric_sketches, update_metric_sketches)
+    if WARMUP_ENABLED:
+        # 预热不调用 Cohere, 沿用已缓存的总结
+        warmup_scheduler.start(lambda username: InfoController.get_user_profile(username, reuse_summary=True))
+
+
+@info_bp.before_request
+def track_access():
+    """记录用户访问热度与进行中的交互请求数, 供预热调度选择热门用户并在繁忙时让路"""
+    interactive_requests.enter()
+    github_id = request.args.get('github_id')
+    if github_id:
+        access_tracker.record(github_id)
+
+
+@info_bp.teardown_request
+def flush_writes(exception=None):
+    """请求结束时写入缓冲中的数据"""
+    interactive_requests.exit()
+    if WRITE_FLUSH_ON_REQUEST_END:
+        write_buffer.flush()
+
+
+def make_json_response(response):
+    """
+    将控制器返回的 (数据, 状态码[, 响应头]) 转换为 Flask 响应
+    :param response: 控制器返回值
+    :return: Flask 响应元组
+    """
+    return (jsonify(response[0]),) + tuple(response[1:])
 
 
 @info_bp.route('/userInfo', methods=['GET'])
@@ -73,7 +118,7 @@ def user_info():
     logger.info(f"获取用户信息请求已收到，github_id: {github_id}")
     response = InfoController.get_user_info(github_id)
     logger.info(f"获取用户信息请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
 
 
 @info_bp.route('/reposInfo', methods=['GET'])
@@ -132,7 +177,7 @@ def repos_info():
     logger.info(f"获取用户信息请求已收到，github_id: {github_id}")
     response = InfoController.get_user_repos_info(github_id)
     logger.info(f"获取用户信息请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
 
 
 @info_bp.route('/issueInfo', methods=['GET'])
@@ -224,7 +269,7 @@ def issue_info():
         logger.info(f"获取用户issue信息请求已收到，github_id: {github_id}")
         response = InfoController.get_user_issue_info(github_id)
         logger.info(f"获取用户issue信息请求处理完毕，github_id: {github_id}")
-        return jsonify(response[0]), response[1]
+        return make_json_response(response)
     except Exception as e:
         logger.error(f"获取用户issue信息时发生错误，github_id: {github_id}，错误信息: {str(e)}")
         return jsonify({"detail": "服务器内部错误"}), 500
@@ -281,7 +326,7 @@ def tech_info():
     logger.info(f"获取用户技术栈信息请求已收到，github_id: {github_id}")
     response = InfoController.get_user_tech_info(github_id)
     logger.info(f"获取用户技术栈信息请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
 
 
 @info_bp.route('/guessNation', methods=['GET'])
@@ -335,7 +380,7 @@ def guess_nation():
     logger.info(f"获取用户国家信息猜测请求已收到，github_id: {github_id}")
     response = InfoController.get_user_guess_nation_info(github_id)
     logger.info(f"获取用户国家信息猜测请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
 
 
 @info_bp.route('/summary', methods=['GET'])
@@ -389,7 +434,7 @@ def summary():
     logger.info(f"获取用户评价信息请求已收到，github_id: {github_id}")
     response = InfoController.get_user_summary_info(github_id)
     logger.info(f"获取用户评价信息请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
 
 
 @info_bp.route('/evaluate', methods=['GET'])
@@ -413,6 +458,11 @@ def summary():
                     'score': {
                         'type': 'integer',
                         'example': 5
+                    },
+                    'percentiles': {
+                        'type': 'object',
+                        'description': '各指标与总评分 (score) 在所有已评估用户中的百分位 (0-100)',
+                        'example': {'commits': 72.4, 'stars': 88.1, 'score': 80.3}
                     }
                 }
             }
@@ -457,7 +507,7 @@ def get_evaluate():
         # 获取用户评分
         response_data = InfoController.get_evaluate_info(github_id)
         logger.info(f"获取用户评分请求处理完毕，user: {github_id}")
-        return jsonify(response_data[0]), response_data[1]
+        return make_json_response(response_data)
     except Exception as e:
         logger.error(f"获取用户评分时发生错误，user: {github_id}，错误信息: {str(e)}")
         return jsonify({"detail": "服务器内部错误"}), 500
@@ -519,7 +569,89 @@ def total_info():
     logger.info(f"获取用户项目信息请求已收到，github_id: {github_id}")
     response = InfoController.get_user_total_info(github_id)
     logger.info(f"获取用户项目信息请求处理完毕，github_id: {github_id}")
-    return jsonify(response[0]), response[1]
+    return make_json_response(response)
+
+
+@info_bp.route('/profile', methods=['GET'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'github_id',
+            'in': 'query',
+            'required': True,
+            'type': 'string',
+            'description': 'GitHub 用户ID'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '构建用户完整资料成功',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'user_info': {
+                        'type': 'object'
+                    },
+                    'tech_stack': {
+                        'type': 'object'
+                    },
+                    'guess_nation': {
+                        'type': 'string',
+                        'example': 'China'
+                    },
+                    'evaluate': {
+                        'type': 'object'
+                    },
+                    'summary': {
+                        'type': 'string',
+                        'example': 'This user is very active on GitHub.'
+                    },
+                    'timings': {
+                        'type': 'object',
+                        'description': '各阶段的开始时间与耗时(毫秒)'
+                    },
+                    'critical_path': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'string'
+                        },
+                        'example': ['repos', 'tech', 'summary']
+                    }
+                }
+            }
+        },
+        400: {
+            'description': '缺少github_id参数',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'detail': {
+                        'type': 'string',
+                        'example': '缺少github_id参数'
+                    }
+                }
+            }
+        },
+        404: {
+            'description': '用户不存在'
+        }
+    }
+})
+def profile():
+    """
+    一次构建单个github用户的完整资料
+    :return: 响应数据
+    """
+    github_id = request.args.get('github_id')
+    if not github_id:
+        logger.error(request.path)
+        return jsonify({"detail": "缺少github_id参数"}), 400
+
+    logger.info(f"构建用户完整资料请求已收到，github_id: {github_id}")
+    response = InfoController.get_user_profile(github_id)
+    logger.info(f"构建用户完整资料请求处理完毕，github_id: {github_id}")
+    return make_json_response(response)
 
 
 @info_bp.route('/search', methods=['POST'])
@@ -640,3 +772,357 @@ def search():
 
     print(response)
     return {"result": response}, 200
+
+
+@info_bp.route('/rank', methods=['GET'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'page',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'default': 1,
+            'description': '页码, 从1开始'
+        },
+        {
+            'name': 'page_size',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'default': RANK_DEFAULT_PAGE_SIZE,
+            'description': f'每页用户数, 最大 {RANK_MAX_PAGE_SIZE}'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '按评分从高到低排列的用户',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'top_users': {
+                        'type': 'array',
+                        'description': '当前页的用户, 包含名次、评分、用户信息与评估信息',
+                        'items': {'type': 'object'}
+                    },
+                    'page': {'type': 'integer', 'example': 1},
+                    'page_size': {'type': 'integer', 'example': 100},
+                    'total': {'type': 'integer', 'description': '有评分的用户总数'}
+                }
+            }
+        },
+        400: {
+            'description': '分页参数错误'
+        },
+        500: {
+            'description': '服务器内部错误'
+        }
+    }
+})
+def get_rank():
+    """
+    分页获取排行榜
+    :return: JSON响应数据
+    """
+    try:
+        page = int(request.args.get('page', 1))
+        page_size = int(request.args.get('page_size', RANK_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        logger.error(f"请求路径: {request.path} - 分页参数错误")
+        return jsonify({"detail": "分页参数必须为整数"}), 400
+    if page < 1 or page_size < 1:
+        return jsonify({"detail": "分页参数必须大于0"}), 400
+
+    try:
+        return make_json_response(InfoController.get_rank(page, page_size))
+    except Exception as e:
+        logger.error(f"获取排行榜时发生错误: {str(e)}")
+        return jsonify({"detail": "服务器内部错误"}), 500
+
+
+@info_bp.route('/rank/position', methods=['GET'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'github_id',
+            'in': 'query',
+            'required': True,
+            'type': 'string',
+            'description': 'GitHub 用户ID'
+        },
+        {
+            'name': 'neighbors',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'default': 0,
+            'description': f'前后各返回的用户数, 最大 {LEADERBOARD_MAX_NEIGHBORS}'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '用户的名次与百分位',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'github_id': {'type': 'string'},
+                    'score': {'type': 'number', 'example': 7.5},
+                    'rank': {'type': 'integer', 'description': '名次, 同分按入库先后排序, 后入库的在前, 与 /info/rank 分页一致'},
+                    'tie_rank': {'type': 'integer', 'description': '同分用户共享的名次'},
+                    'total': {'type': 'integer', 'description': '有评分的用户总数'},
+                    'percentile': {'type': 'number', 'description': '评分低于该用户的用户占比 (%)'},
+                    'above': {'type': 'array', 'items': {'type': 'object'}, 'description': '排在前面的用户'},
+                    'below': {'type': 'array', 'items': {'type': 'object'}, 'description': '排在后面的用户'}
+                }
+            }
+        },
+        404: {
+            'description': '用户没有评分'
+        },
+        503: {
+            'description': '排行榜正在加载'
+        }
+    }
+})
+def get_rank_position():
+    """
+    获取用户的名次
+    :return: JSON响应数据
+    """
+    github_id = request.args.get('github_id')
+    if not github_id:
+        logger.error(f"请求路径: {request.path} - 缺少github_id参数")
+        return jsonify({"detail": "缺少github_id参数"}), 400
+    try:
+        neighbors = int(request.args.get('neighbors', 0))
+    except ValueError:
+        return jsonify({"detail": "neighbors 必须为整数"}), 400
+
+    try:
+        return make_json_response(InfoController.get_rank_position(github_id, max(neighbors, 0)))
+    except Exception as e:
+        logger.error(f"获取用户名次时发生错误，user: {github_id}，错误信息: {str(e)}")
+        return jsonify({"detail": "服务器内部错误"}), 500
+
+
+@info_bp.route('/rank/window', methods=['GET'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'offset',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'default': 0,
+            'description': '起始名次, 从0开始'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'default': RANK_DEFAULT_PAGE_SIZE,
+            'description': f'用户数, 最大 {RANK_MAX_PAGE_SIZE}'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '名次区间内的用户',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'users': {
+                        'type': 'array',
+                        'description': '用户的名次、github_id 与评分',
+                        'items': {'type': 'object'}
+                    },
+                    'offset': {'type': 'integer'},
+                    'total': {'type': 'integer', 'description': '有评分的用户总数'}
+                }
+            }
+        },
+        503: {
+            'description': '排行榜正在加载'
+        }
+    }
+})
+def get_rank_window():
+    """
+    获取任意名次区间的用户
+    :return: JSON响应数据
+    """
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', RANK_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"detail": "offset 与 limit 必须为整数"}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({"detail": "offset 不能小于0, limit 必须大于0"}), 400
+
+    try:
+        return make_json_response(InfoController.get_rank_window(offset, limit))
+    except Exception as e:
+        logger.error(f"获取排行榜区间时发生错误: {str(e)}")
+        return jsonify({"detail": "服务器内部错误"}), 500
+
+
+@info_bp.route('/admin/rescore', methods=['POST'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'type': 'string',
+            'required': True,
+            'description': '管理员登录后获得的 JWT'
+        },
+        {
+            'name': 'dry_run',
+            'in': 'query',
+            'required': False,
+            'type': 'boolean',
+            'default': False,
+            'description': '只计算不写入'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '用保存的原始指标与当前权重重新计算所有用户的评分, 不请求 GitHub',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'users': {'type': 'integer', 'description': '参与重新评分的用户数'},
+                    'changed': {'type': 'integer', 'description': '评分或评分百分位有变化的用户数'},
+                    'updated': {'type': 'integer', 'description': '写入数据库的行数'},
+                    'sketch_rebuilt': {'type': 'boolean', 'description': '评分的分位数草图是否已按新的评分重新生成'},
+                    'dry_run': {'type': 'boolean'},
+                    'without_components': {'type': 'integer', 'description': '没有原始指标、需要重新评估的用户数'},
+                    'load_ms': {'type': 'number'},
+                    'score_ms': {'type': 'number'},
+                    'write_ms': {'type': 'number'}
+                }
+            }
+        },
+        403: {
+            'description': '缺少或无效的 Authorization token, 或不是管理员'
+        },
+        409: {
+            'description': '已有重新评分任务在执行'
+        },
+        501: {
+            'description': '未安装 numpy'
+        }
+    }
+})
+@admin_required
+def rescore():
+    """
+    离线重新评分
+    :return: JSON响应数据
+    """
+    dry_run = request.args.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        return make_json_response(InfoController.rescore(dry_run))
+    except Exception as e:
+        logger.error(f"离线重新评分时发生错误: {str(e)}", exc_info=True)
+        return jsonify({"detail": "服务器内部错误"}), 500
+
+
+@info_bp.route('/admin/stats', methods=['GET'])
+@swag_from({
+    'tags': ['信息服务'],
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'type': 'string',
+            'required': True,
+            'description': '管理员登录后获得的 JWT'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '获取服务运行统计成功',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'etag_cache': {
+                        'type': 'object',
+                        'description': 'ETag条件请求缓存的命中、未命中与304次数'
+                    },
+                    'token_pool': {
+                        'type': 'object',
+                        'description': 'GitHub Token凭证池各Token的剩余额度、重置时间与进行中的请求数'
+                    },
+                    'singleflight': {
+                        'type': 'object',
+                        'description': '并发请求合并的执行次数与被合并的请求数'
+                    },
+                    'background_refresh': {
+                        'type': 'object',
+                        'description': '过期缓存后台刷新的提交、去重、完成与失败次数'
+                    },
+                    'negative_cache': {
+                        'type': 'object',
+                        'description': '负缓存的条目数、命中次数与节省的GitHub API请求数'
+                    },
+                    'column_reads': {
+                        'type': 'object',
+                        'description': 'Github表按列读取的字节数与耗时'
+                    },
+                    'row_cache': {
+                        'type': 'object',
+                        'description': 'Github表进程内LRU缓存的命中率、淘汰/过期/失效次数、条目数与估算内存'
+                    },
+                    'shared_cache': {
+                        'type': 'object',
+                        'description': '共享缓存后端类型、各数据类型在进程内与共享存储的命中次数和命中率'
+                    },
+                    'db_pool': {
+                        'type': 'object',
+                        'description': '数据库连接池的连接数、空闲数、等待数、借出/等待/超时/重试/检查次数与借出等待时间直方图'
+                    },
+                    'db_queries': {
+                        'type': 'object',
+                        'description': '按语句指纹统计的调用次数、行数与耗时直方图, 参数已脱敏的慢查询日志与慢查询的 EXPLAIN 结果'
+                    },
+                    'write_buffer': {
+                        'type': 'object',
+                        'description': '写缓冲的模式、队列深度、合并列数、写入/重试/转存/恢复的行数、背压次数与写入耗时'
+                    },
+                    'leaderboard': {
+                        'type': 'object',
+                        'description': '内存排行榜的用户数、加载状态、加载次数与耗时、更新与查询次数'
+                    },
+                    'metric_sketches': {
+                        'type': 'object',
+                        'description': '各评分指标分位数草图的样本数、元素数与中位数, 以及与数据库的同步次数'
+                    },
+                    'repositories': {
+                        'type': 'object',
+                        'description': '仓库表的仓库数、用户关联数、有语言与计数的仓库数, 以及平均每个仓库被关联的次数'
+                    },
+                    'warmup': {
+                        'type': 'object',
+                        'description': '热门用户预热的轮次、预热成功与失败次数、因额度或交互请求跳过的次数'
+                    }
+                }
+            }
+        },
+        403: {
+            'description': '缺少或无效的 Authorization token, 或不是管理员'
+        }
+    }
+})
+@admin_required
+def admin_stats():
+    """
+    获取服务内部运行统计信息
+    :return: 响应数据
+    """
+    response = InfoController.get_admin_stats()
+    return make_json_response(response)
@@ -1,117 +1,265 @@
 from contextlib import contextmanager
 import json
+import time
 from datetime import datetime
 
+from info_service.config.cache_config import ROW_CACHE_ENABLED, RANK_DEFAULT_PAGE_SIZE, RANK_MAX_PAGE_SIZE
 from info_service.config.db_config import Config
+from info_service.config.evaluate_config import REPO_STORE_BATCH
+from info_service.utils.leaderboard import leaderboard
 from info_service.utils.logger_utils import logger
-from info_service.utils.mysql_utils import MySQLPool
+from info_service.utils.read_stats import column_read_stats
+from info_service.utils.row_cache import row_cache
+from info_service.utils.shared_cache import shared_cache
+from info_service.utils.mysql_utils import ConnectionPool
+from info_service.utils.query_stats import InstrumentedCursor, query_stats
 
-# 使用配置文件中的数据库连接信息
-pool = MySQLPool(
+# 使用配置文件中的数据库连接信息, 空闲连接由后台线程检查
+pool = ConnectionPool(
     host_name=Config.DB_HOST,
     user_name=Config.DB_USER,
     user_password=Config.DB_PASSWORD,
-    db_name=Config.DB_NAME
+    db_name=Config.DB_NAME,
+    pool_size=Config.DB_POOL_SIZE,
+    checkout_timeout=Config.DB_POOL_TIMEOUT,
+    validate_idle_seconds=Config.DB_POOL_VALIDATE_INTERVAL
 )
 
 
-def ensure_connection():
-    """
-    确保数据库连接是有效的，如果无效则重新连接。
-    """
-    global pool
-    try:
-        connection = pool.get_connection()
-        connection.ping(reconnect=True)
-        pool.release_connection(connection)
-    except Exception as e:
-        logger.error(f"数据库连接失败，尝试重新连接: {e}")
-        pool = MySQLPool(
-            host_name=Config.DB_HOST,
-            user_name=Config.DB_USER,
-            user_password=Config.DB_PASSWORD,
-            db_name=Config.DB_NAME
-        )
-
-
 @contextmanager
 def get_cursor(dictionary=False):
     """
-    获取数据库游标的上下文管理器
+    获取数据库游标的上下文管理器, 正常结束时提交, 出错时回滚
     :param dictionary: 是否返回字典格式的结果
     :return: 数据库游标
     """
-    ensure_connection()  # 确保连接有效
-    connection = pool.get_connection()
-    cursor = connection.cursor(dictionary=dictionary)
+    with pool.cursor(dictionary=dictionary) as cursor:
+        instrumented = InstrumentedCursor(cursor, query_stats)
+        try:
+            yield instrumented
+        except Exception:
+            instrumented.finish(explain=False)
+            raise
+        instrumented.finish()
+
+
+# Github 表中存储为 JSON 的信息列
+PROFILE_COLUMNS = ('user_info', 'repos_info', 'issues_info', 'tech_stack', 'most_common_language',
+                   'total', 'evaluate', 'summa')
+
+
+def fetched_at_column(name):
+    """
+    信息列对应的获取时间列
+    :param name: 信息列名
+    :return: 获取时间列名
+    """
+    return f"{name}_fetched_at"
+
+
+def _decode_column(value):
+    """解析 JSON 列, 非 JSON 内容原样返回"""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    if value is None:
+        return None
     try:
-        yield cursor
-        connection.commit()  # 添加提交操作
-    except Exception as e:
-        connection.rollback()  # 添加回滚操作
-        raise e
-    finally:
-        cursor.close()
-        pool.release_connection(connection)
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _column_size(value):
+    """计算列内容的字节数"""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(str(value).encode('utf-8'))
+
+
+def _invalidate_github(github_id):
+    """写入数据库后使用户在进程内缓存与共享缓存中的数据失效"""
+    row_cache.invalidate(github_id)
+    shared_cache.invalidate('github', github_id.lower())
+
 
+def _invalidate_all_github():
+    """批量写入数据库后使所有用户在进程内缓存与共享缓存中的数据失效"""
+    row_cache.invalidate_all()
+    shared_cache.invalidate_namespace('github')
 
-def get_github_id(github_id):
+
+def _shared_get_columns(github_id, columns):
+    """
+    从共享缓存读取用户的列
+    :return: (同 get_github_columns 的结果, 列名到 JSON 文本字节数的映射), 任一列未命中时返回 (None, None)
     """
-    根据github_id查询用户信息
+    cached = shared_cache.get_many('github', github_id.lower(), columns, local=False)
+    if cached is None:
+        return None, None
+
+    def parse(value):
+        return datetime.fromisoformat(value) if value else None
+
+    result = {name: cached[name]['value'] for name in columns}
+    result['fetched_at'] = {name: parse(cached[name]['fetched_at']) for name in columns}
+    updated_at = [parse(cached[name]['updated_at']) for name in columns if cached[name]['updated_at']]
+    result['updated_at'] = max(updated_at) if updated_at else None
+    return result, {name: cached[name]['size'] for name in columns}
+
+
+def _shared_set_columns(github_id, result, sizes, version):
+    """将从数据库读取的列写入共享缓存, 进程内缓存由调用方写入"""
+
+    def format_time(value):
+        return value.isoformat() if value else None
+
+    shared_cache.set_many('github', github_id.lower(), {
+        name: {
+            'value': result[name],
+            'fetched_at': format_time(result['fetched_at'][name]),
+            'updated_at': format_time(result['updated_at']),
+            'size': size,
+        }
+        for name, size in sizes.items()
+    }, version=version, local=False)
+
+
+def get_github_columns(github_id, columns):
+    """
+    按列查询用户信息, 只读取调用方需要的列, 依次从进程内缓存、共享缓存与数据库读取
     :param github_id: GitHub用户ID
-    :return: 查询结果,成功返回用户信息,失败返回False,未找到返回None
+    :param columns: 需要读取的列, 必须在 PROFILE_COLUMNS 中
+    :return: 列名到解析后数据的映射, 另含 updated_at (datetime) 与 fetched_at (列名到获取时间的映射);
+             未找到返回None, 失败返回False
     """
+    unknown = set(columns) - set(PROFILE_COLUMNS)
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(sorted(unknown))}")
+    columns = [name for name in PROFILE_COLUMNS if name in columns]
+
+    if ROW_CACHE_ENABLED:
+        cached = row_cache.get(github_id, columns)
+        if cached is not None:
+            return cached
+
     try:
-        query = "SELECT * FROM Github WHERE github_id = %s"
+        version = row_cache.version()
+        shared_version = shared_cache.version('github', github_id.lower())
+        cached, sizes = _shared_get_columns(github_id, columns)
+        if cached is not None:
+            if ROW_CACHE_ENABLED:
+                row_cache.put(github_id, cached, sizes, version)
+            return cached
+
+        start = time.perf_counter()
+        fetched_at_columns = [fetched_at_column(name) for name in columns]
+        query = f"""
+            SELECT {', '.join(columns)}, {', '.join(fetched_at_columns)}, updated_at
+            FROM github
+            WHERE github_id = %s
+        """
+        repos = None
         with get_cursor(dictionary=True) as cursor:
             cursor.execute(query, (github_id,))
-            result = cursor.fetchone()
-            if result:
-                # 遍历 result 字典，将 datetime 对象转为字符串
-                for key, value in result.items():
-                    if isinstance(value, datetime):
-                        result[key] = value.isoformat()  # 转为字符串格式
-                return json.dumps(result, ensure_ascii=False)
-            else:
-                return None
+            row = cursor.fetchone()
+            # repos_info 为仓库数时从仓库表还原仓库列表, 旧数据仍为完整的仓库列表
+            if row and 'repos_info' in columns and _is_repo_count(_decode_column(row['repos_info'])):
+                repos = _select_user_repositories(cursor, github_id)
+        if not row:
+            return None
+
+        sizes = {name: _column_size(row[name]) for name in columns}
+        result = {name: _decode_column(row[name]) for name in columns}
+        if repos is not None:
+            result['repos_info'] = repos
+            sizes['repos_info'] = _column_size(json.dumps(repos))
+        size = sum(sizes.values())
+        result['updated_at'] = row['updated_at']
+        result['fetched_at'] = {name: row[fetched_at_column(name)] for name in columns}
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        column_read_stats.record(columns, size, elapsed_ms)
+        if ROW_CACHE_ENABLED:
+            row_cache.put(github_id, result, sizes, version)
+        _shared_set_columns(github_id, result, sizes, shared_version)
+        return result
     except Exception as e:
-        logger.error(f"查询github_id失败: {e}")
+        logger.error(f"查询用户信息失败: {e}")
         return False
 
 
-def get_rank_data():
+def get_rank_data(page=1, page_size=RANK_DEFAULT_PAGE_SIZE):
     """
-    获取GitHub用户排名数据
+    分页获取GitHub用户排名数据, 按 score 列的索引读取, 每页结果写入共享缓存
+    :param page: 页码, 从1开始
+    :param page_size: 每页用户数, 不超过 RANK_MAX_PAGE_SIZE
     :return: 排名数据字典
     """
+    page = max(int(page), 1)
+    page_size = min(max(int(page_size), 1), RANK_MAX_PAGE_SIZE)
+    field = f"{page}:{page_size}"
+    version = shared_cache.version('rank', 'leaderboard')
+    cached = shared_cache.get_many('rank', 'leaderboard', (field,))
+    if cached:
+        return cached[field]
+
+    offset = (page - 1) * page_size
     try:
         query = """
-            SELECT github_id, user_info, evaluate 
-            FROM github 
-            WHERE evaluate IS NOT NULL
-            ORDER BY CAST(JSON_EXTRACT(evaluate, '$.rank') AS SIGNED) ASC
-            LIMIT 100
+            SELECT github_id, user_info, evaluate, score
+            FROM github
+            WHERE score IS NOT NULL
+            ORDER BY score DESC, id DESC
+            LIMIT %s OFFSET %s
         """
         with get_cursor(dictionary=True) as cursor:
-            cursor.execute(query)
+            cursor.execute(query, (page_size, offset))
             results = cursor.fetchall()
+            cursor.execute("SELECT COUNT(*) AS total FROM github WHERE score IS NOT NULL")
+            total = cursor.fetchone()['total']
 
         rank_data = {
             'top_users': [
                 {
+                    'rank': offset + index + 1,
                     'github_id': row['github_id'],
+                    'score': float(row['score']),
                     'user_info': json.loads(row['user_info']) if row['user_info'] else {},
                     'evaluate': json.loads(row['evaluate']) if row['evaluate'] else {}
                 }
-                for row in results
-            ]
+                for index, row in enumerate(results)
+            ],
+            'page': page,
+            'page_size': page_size,
+            'total': total
         }
+        shared_cache.set_many('rank', 'leaderboard', {field: rank_data}, version=version)
         return rank_data
     except Exception as e:
         logger.error(f"获取排名数据失败: {e}")
         return None
 
 
+def get_scores_after(last_id, limit):
+    """
+    按自增ID分批读取有评分的用户, 用于加载内存排行榜
+    :param last_id: 上一批最后一行的ID
+    :param limit: 每批行数
+    :return: [(ID, GitHub用户ID, 评分)] 按ID升序
+    """
+    query = """
+        SELECT id, github_id, score
+        FROM github
+        WHERE id > %s AND score IS NOT NULL
+        ORDER BY id
+        LIMIT %s
+    """
+    with get_cursor() as cursor:
+        cursor.execute(query, (last_id, limit))
+        return cursor.fetchall()
+
+
 def save_user_data(info_id, user_data):
     """
     保存用户基本信息
@@ -121,15 +269,17 @@ def save_user_data(info_id, user_data):
     """
     try:
         query = """
-            INSERT INTO github (github_id, user_info, updated_at)
-            VALUES (%s, %s, NOW())
+            INSERT INTO github (github_id, user_info, user_info_fetched_at, updated_at)
+            VALUES (%s, %s, NOW(), NOW())
             ON DUPLICATE KEY UPDATE 
                 user_info = %s,
+                user_info_fetched_at = NOW(),
                 updated_at = NOW()
         """
         user_data_json = json.dumps(user_data)
         with get_cursor(False) as cursor:
             cursor.execute(query, (info_id, user_data_json, user_data_json))
+        _invalidate_github(info_id)
         return True
     except Exception as e:
         logger.error(f"保存用户数据失败: {e}")
@@ -138,40 +288,28 @@ def save_user_data(info_id, user_data):
 
 def save_user_reops_data(info_id, user_repos_data):
     """
-    保存用户仓库信息
+    保存用户仓库信息, 仓库写入仓库表, Github 表只保存仓库数
     :param info_id: GitHub用户ID
     :param user_repos_data: 用户仓库数据
     :return: 保存成功返回True,失败返回False
     """
-    try:
-        query = """
-            INSERT INTO github (github_id, repos_info, updated_at)
-            VALUES (%s, %s, NOW())
-            ON DUPLICATE KEY UPDATE 
-                repos_info = %s,
-                updated_at = NOW()
-        """
-        repos_data_json = json.dumps(user_repos_data)
-        with get_cursor() as cursor:
-            cursor.execute(query, (info_id, repos_data_json, repos_data_json))
-        return True
-    except Exception as e:
-        logger.error(f"保存用户仓库数据失败: {e}")
-        return False
+    return save_github_profile(info_id, {'repos_info': user_repos_data})
 
 
 def save_user_issues_data(info_id, issues):
     try:
         query = """
-               INSERT INTO github (github_id, issues_info, updated_at)
-               VALUES (%s, %s, NOW())
+               INSERT INTO github (github_id, issues_info, issues_info_fetched_at, updated_at)
+               VALUES (%s, %s, NOW(), NOW())
                ON DUPLICATE KEY UPDATE 
                    issues_info = %s,
+                   issues_info_fetched_at = NOW(),
                    updated_at = NOW()
            """
         issues_data_json = json.dumps(issues)
         with get_cursor() as cursor:
             cursor.execute(query, (info_id, issues_data_json, issues_data_json))
+        _invalidate_github(info_id)
         return True
     except Exception as e:
         logger.error(f"保存用户仓库数据失败: {e}")
@@ -187,15 +325,17 @@ def save_user_tech_info_data(info_id, tech_stack):
     """
     try:
         query = """
-            INSERT INTO github (github_id, tech_stack, updated_at)
-            VALUES (%s, %s, NOW())
+            INSERT INTO github (github_id, tech_stack, tech_stack_fetched_at, updated_at)
+            VALUES (%s, %s, NOW(), NOW())
             ON DUPLICATE KEY UPDATE 
                 tech_stack = %s,
+                tech_stack_fetched_at = NOW(),
                 updated_at = NOW()
         """
         tech_stack_json = json.dumps(tech_stack)
         with get_cursor(False) as cursor:
             cursor.execute(query, (info_id, tech_stack_json, tech_stack_json))
+        _invalidate_github(info_id)
         return True
     except Exception as e:
         logger.error(f"保存用户技术栈数据失败: {e}")
@@ -211,21 +351,43 @@ def save_user_guess_nation_info_data(info_id, most_common_language):
     """
     try:
         query = """
-            INSERT INTO github (github_id, most_common_language, updated_at)
-            VALUES (%s, %s, NOW())
+            INSERT INTO github (github_id, most_common_language, most_common_language_fetched_at, updated_at)
+            VALUES (%s, %s, NOW(), NOW())
             ON DUPLICATE KEY UPDATE 
                 most_common_language = %s,
+                most_common_language_fetched_at = NOW(),
                 updated_at = NOW()
         """
         language_json = json.dumps(most_common_language)
         with get_cursor(False) as cursor:
             cursor.execute(query, (info_id, language_json, language_json))
+        _invalidate_github(info_id)
         return True
     except Exception as e:
         logger.error(f"保存用户语言数据失败: {e}")
         return False
 
 
+def _evaluate_score(evaluate):
+    """评估信息中的评分, 与 score 生成列一致, 没有评分时返回 None"""
+    score = evaluate.get('score') if isinstance(evaluate, dict) else None
+    return float(score) if isinstance(score, (int, float)) else None
+
+
+def _row_ids(cursor, github_ids):
+    """
+    查询用户在 Github 表中的行ID, 内存排行榜中同分用户按行ID降序排列
+    :param cursor: 数据库游标
+    :param github_ids: GitHub用户ID列表
+    :return: 小写的GitHub用户ID到行ID的映射
+    """
+    cursor.execute(
+        f"SELECT github_id, id FROM github WHERE github_id IN ({', '.join(['%s'] * len(github_ids))})",
+        tuple(github_ids)
+    )
+    return {github_id.lower(): row_id for github_id, row_id in cursor.fetchall()}
+
+
 def save_evaluate_info(info_id, evaluate):
     """
     保存用户评估信息
@@ -235,15 +397,20 @@ def save_evaluate_info(info_id, evaluate):
     """
     try:
         query = """
-            INSERT INTO github (github_id, evaluate, updated_at)
-            VALUES (%s, %s, NOW())
+            INSERT INTO github (github_id, evaluate, evaluate_fetched_at, updated_at)
+            VALUES (%s, %s, NOW(), NOW())
             ON DUPLICATE KEY UPDATE 
                 evaluate = %s,
+                evaluate_fetched_at = NOW(),
                 updated_at = NOW()
         """
         evaluate_json = json.dumps(evaluate)
         with get_cursor(False) as cursor:
             cursor.execute(query, (info_id, evaluate_json, evaluate_json))
+            row_ids = _row_ids(cursor, [info_id])
+        _invalidate_github(info_id)
+        shared_cache.invalidate('rank', 'leaderboard')
+        leaderboard.update(info_id, _evaluate_score(evaluate), row_ids.get(info_id.lower()))
         return True
     except Exception as e:
         logger.error(f"保存用户评价数据失败: {e}")
@@ -259,16 +426,521 @@ def save_user_summary_info_data(info_id, summa):
     """
     try:
         query = """
-            INSERT INTO github (github_id, summa, updated_at)
-            VALUES (%s, %s, NOW())
+            INSERT INTO github (github_id, summa, summa_fetched_at, updated_at)
+            VALUES (%s, %s, NOW(), NOW())
             ON DUPLICATE KEY UPDATE 
                 summa = %s,
+                summa_fetched_at = NOW(),
                 updated_at = NOW()
         """
         summa_json = json.dumps(summa)
         with get_cursor(False) as cursor:
             cursor.execute(query, (info_id, summa_json, summa_json))
+        _invalidate_github(info_id)
         return True
     except Exception as e:
         logger.error(f"保存用户总结数据失败: {e}")
         return False
+
+
+def get_response_cache(cache_key):
+    """
+    查询GitHub API响应缓存
+    :param cache_key: 缓存键
+    :return: 缓存记录字典,未找到或失败返回None
+    """
+    # 响应体可能较大, 只使用共享存储, 不占用进程内缓存
+    shared_version = shared_cache.version('response', cache_key)
+    cached = shared_cache.get('response', cache_key, local=False)
+    if cached is not None:
+        return cached
+
+    try:
+        query = """
+            SELECT etag, last_modified, headers, body, token_hash
+            FROM github_response_cache
+            WHERE cache_key = %s
+        """
+        with get_cursor(dictionary=True) as cursor:
+            cursor.execute(query, (cache_key,))
+            result = cursor.fetchone()
+        if result and result.get('headers'):
+            result['headers'] = json.loads(result['headers'])
+        if result:
+            shared_cache.set('response', cache_key, result, version=shared_version, local=False)
+        return result
+    except Exception as e:
+        logger.error(f"查询响应缓存失败: {e}")
+        return None
+
+
+def save_response_cache(cache_key, url, etag, last_modified, headers, body, token_hash=None):
+    """
+    保存GitHub API响应缓存
+    :param cache_key: 缓存键
+    :param url: 请求URL
+    :param etag: ETag响应头
+    :param last_modified: Last-Modified响应头
+    :param headers: 需要回放的响应头
+    :param body: 响应体
+    :param token_hash: 获取响应的Token摘要
+    :return: 保存成功返回True,失败返回False
+    """
+    try:
+        query = """
+            INSERT INTO github_response_cache (cache_key, url, etag, last_modified, headers, body, token_hash, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                etag = VALUES(etag),
+                last_modified = VALUES(last_modified),
+                headers = VALUES(headers),
+                body = VALUES(body),
+                token_hash = VALUES(token_hash),
+                updated_at = NOW()
+        """
+        headers_json = json.dumps(headers)
+        with get_cursor() as cursor:
+            cursor.execute(query, (cache_key, url, etag, last_modified, headers_json, body, token_hash))
+        shared_cache.invalidate('response', cache_key)
+        return True
+    except Exception as e:
+        logger.error(f"保存响应缓存失败: {e}")
+        return False
+
+
+def save_github_profile(info_id, columns):
+    """
+    一次写入用户的多个信息列
+    :param info_id: GitHub用户ID
+    :param columns: 列名到数据的映射, 列名必须在 PROFILE_COLUMNS 中
+    :return: 保存成功返回True,失败返回False
+    """
+    return save_github_profiles({info_id: columns})
+
+
+def save_github_profiles(profiles):
+    """
+    批量写入多个用户的信息列
+    写入列相同的用户合并为一条多行 upsert, 所有语句在同一事务中执行
+    :param profiles: GitHub用户ID到 {列名: 数据} 的映射, 列名必须在 PROFILE_COLUMNS 中
+    :return: 保存成功返回True,失败返回False
+    """
+    # 仓库列表写入仓库表与关联表, Github 表的 repos_info 只保存仓库数
+    repo_lists = {info_id: [repo for repo in columns['repos_info'] if isinstance(repo, dict) and repo.get('id')]
+                  for info_id, columns in profiles.items() if isinstance(columns.get('repos_info'), list)}
+    groups = {}
+    for info_id, columns in profiles.items():
+        names = tuple(name for name in PROFILE_COLUMNS if name in columns)
+        if info_id in repo_lists:
+            columns = dict(columns, repos_info=len(repo_lists[info_id]))
+        if names:
+            groups.setdefault(names, []).append((info_id, columns))
+    if not groups:
+        return True
+
+    try:
+        with get_cursor() as cursor:
+            # 多个用户的同一仓库只写入一次
+            _upsert_repositories(cursor, {repo['id']: repo for repos in repo_lists.values() for repo in repos}.values())
+            for info_id, repos in repo_lists.items():
+                _link_repositories(cursor, info_id, repos)
+            for names, rows in groups.items():
+                fetched_at_columns = [fetched_at_column(name) for name in names]
+                placeholder = f"(%s, {', '.join(['%s'] * len(names))}, {', '.join(['NOW()'] * len(names))}, NOW())"
+                query = f"""
+                    INSERT INTO github (github_id, {', '.join(names)}, {', '.join(fetched_at_columns)}, updated_at)
+                    VALUES {', '.join([placeholder] * len(rows))}
+                    ON DUPLICATE KEY UPDATE
+                        {', '.join(f'{name} = VALUES({name})' for name in names)},
+                        {', '.join(f'{name} = NOW()' for name in fetched_at_columns)},
+                        updated_at = NOW()
+                """
+                params = []
+                for info_id, columns in rows:
+                    params.append(info_id)
+                    params.extend(json.dumps(columns[name]) for name in names)
+                cursor.execute(query, tuple(params))
+            evaluated = {info_id: columns['evaluate'] for info_id, columns in profiles.items()
+                         if 'evaluate' in columns}
+            row_ids = _row_ids(cursor, list(evaluated)) if evaluated else {}
+        for info_id in profiles:
+            _invalidate_github(info_id)
+        if evaluated:
+            shared_cache.invalidate('rank', 'leaderboard')
+        for info_id, evaluate in evaluated.items():
+            leaderboard.update(info_id, _evaluate_score(evaluate), row_ids.get(info_id.lower()))
+        return True
+    except Exception as e:
+        logger.error(f"保存用户资料数据失败: {e}")
+        return False
+
+
+def get_github_fetched_at(github_ids, columns):
+    """
+    批量查询用户各信息列的获取时间
+    :param github_ids: GitHub用户ID列表
+    :param columns: 信息列, 必须在 PROFILE_COLUMNS 中
+    :return: GitHub用户ID到 {列名: 获取时间} 的映射, 从未获取的列不包含在内
+    """
+    unknown = set(columns) - set(PROFILE_COLUMNS)
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(sorted(unknown))}")
+    if not github_ids:
+        return {}
+    try:
+        query = f"""
+            SELECT github_id, {', '.join(fetched_at_column(name) for name in columns)}
+            FROM github
+            WHERE github_id IN ({', '.join(['%s'] * len(github_ids))})
+        """
+        with get_cursor(dictionary=True) as cursor:
+            cursor.execute(query, tuple(github_ids))
+            results = cursor.fetchall()
+        return {
+            row['github_id']: {name: row[fetched_at_column(name)] for name in columns if row[fetched_at_column(name)]}
+            for row in results
+        }
+    except Exception as e:
+        logger.error(f"批量查询获取时间失败: {e}")
+        return {}
+
+
+def get_recommended_github_ids():
+    """
+    获取最近一期日、周、月推荐列表中的用户
+    :return: GitHub用户ID列表
+    """
+    github_ids = []
+    try:
+        with get_cursor(dictionary=True) as cursor:
+            for table in ('daily_recommend', 'weekly_recommend', 'monthly_recommend'):
+                cursor.execute(f"SELECT recommendations FROM {table} ORDER BY created_at DESC LIMIT 1")
+                row = cursor.fetchone()
+                if row and row['recommendations']:
+                    github_ids.extend(
+                        item['username'] for item in json.loads(row['recommendations']) if item.get('username')
+                    )
+        return list(dict.fromkeys(github_ids))
+    except Exception as e:
+        logger.error(f"获取推荐用户失败: {e}")
+        return github_ids
+
+
+def get_negative_cache_entries(expires_after=None):
+    """
+    查询未过期的负缓存记录
+    :param expires_after: 只查询过期时间晚于该时间的记录, 用于增量加载最近写入的记录
+    :return: GitHub用户ID到 (状态码, 过期时间) 的映射, 查询失败时返回 None
+    """
+    try:
+        query = """
+            SELECT github_id, status_code, expires_at
+            FROM github_negative_cache
+            WHERE expires_at > GREATEST(NOW(), %s)
+        """
+        with get_cursor(dictionary=True) as cursor:
+            cursor.execute(query, (expires_after or datetime.now(),))
+            results = cursor.fetchall()
+        return {row['github_id']: (row['status_code'], row['expires_at']) for row in results}
+    except Exception as e:
+        logger.error(f"查询负缓存失败: {e}")
+        return None
+
+
+def save_negative_cache(github_id, status_code, expires_at):
+    """
+    保存负缓存记录
+    :param github_id: GitHub用户ID
+    :param status_code: GitHub返回的状态码
+    :param expires_at: 过期时间
+    :return: 保存成功返回True,失败返回False
+    """
+    try:
+        query = """
+            INSERT INTO github_negative_cache (github_id, status_code, expires_at)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                status_code = VALUES(status_code),
+                expires_at = VALUES(expires_at)
+        """
+        with get_cursor() as cursor:
+            cursor.execute(query, (github_id, status_code, expires_at))
+        return True
+    except Exception as e:
+        logger.error(f"保存负缓存失败: {e}")
+        return False
+
+
+def get_metric_sketches():
+    """
+    查询所有评分指标的分位数草图
+    :return: 指标名到草图字典的映射
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT metric, sketch FROM github_metric_sketches")
+        results = cursor.fetchall()
+    return {row['metric']: json.loads(row['sketch']) for row in results}
+
+
+def update_metric_sketches(merge):
+    """
+    在同一事务中锁定并合并评分指标的分位数草图, 多个进程同时合并时依次执行
+    :param merge: 合并函数, 参数为已保存的 {指标: 草图字典}, 返回合并后的 {指标: 草图字典}
+    :return: 合并后的 {指标: 草图字典}
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT metric, sketch FROM github_metric_sketches FOR UPDATE")
+        stored = {row['metric']: json.loads(row['sketch']) for row in cursor.fetchall()}
+        merged = merge(stored)
+        query = """
+            INSERT INTO github_metric_sketches (metric, sketch, sample_count)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                sketch = VALUES(sketch),
+                sample_count = VALUES(sample_count)
+        """
+        for metric, sketch in merged.items():
+            cursor.execute(query, (metric, json.dumps(sketch), sketch.get('count', 0)))
+    return merged
+
+
+def get_score_components_after(last_id, limit, components):
+    """
+    按自增ID分批读取已保存原始指标的评估结果, 用于离线重新评分
+    :param last_id: 上一批最后一行的ID
+    :param limit: 每批行数
+    :param components: 原始指标名
+    :return: [(ID, GitHub用户ID, 当前评分, 上一次评分, 当前评分百分位, 各指标...)] 按ID升序, 数值均为浮点数
+    """
+    columns = ', '.join(
+        f"COALESCE(JSON_EXTRACT(evaluate, '$.components.{name}'), 0) + 0" for name in components
+    )
+    query = f"""
+        SELECT id, github_id, score + 0, COALESCE(JSON_EXTRACT(evaluate, '$.previous_score'), 5) + 0,
+               JSON_EXTRACT(evaluate, '$.percentiles.score') + 0, {columns}
+        FROM github
+        WHERE id > %s AND JSON_CONTAINS_PATH(evaluate, 'one', '$.components')
+        ORDER BY id
+        LIMIT %s
+    """
+    with get_cursor() as cursor:
+        cursor.execute(query, (last_id, limit))
+        return cursor.fetchall()
+
+
+def count_evaluations_without_components():
+    """
+    统计没有保存原始指标的评估结果数, 这些用户需要重新评估后才能离线重新评分
+    :return: 用户数
+    """
+    query = """
+        SELECT COUNT(*)
+        FROM github
+        WHERE evaluate IS NOT NULL AND NOT JSON_CONTAINS_PATH(evaluate, 'one', '$.components')
+    """
+    with get_cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchone()[0]
+
+
+def save_rescored_scores(scores, batch_size=5000):
+    """
+    批量写入重新计算的评分: 先分批写入临时表, 再以一条 UPDATE ... JOIN 更新 evaluate 中的 score 与评分百分位
+    写入后整体失效用户缓存并重新加载排行榜, 不逐个用户处理
+    :param scores: [(ID, GitHub用户ID, 评分, 评分百分位)]
+    :param batch_size: 每条 INSERT 写入临时表的行数
+    :return: 更新的行数
+    """
+    if not scores:
+        return 0
+    with get_cursor() as cursor:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS github_rescore")
+        cursor.execute("CREATE TEMPORARY TABLE github_rescore "
+                       "(id INT PRIMARY KEY, score DOUBLE NOT NULL, score_percentile DOUBLE NOT NULL)")
+        for offset in range(0, len(scores), batch_size):
+            chunk = scores[offset:offset + batch_size]
+            cursor.execute(
+                f"INSERT INTO github_rescore (id, score, score_percentile) "
+                f"VALUES {', '.join(['(%s, %s, %s)'] * len(chunk))}",
+                tuple(value for row_id, _, score, percentile in chunk for value in (row_id, score, percentile))
+            )
+        cursor.execute("""
+            UPDATE github g
+            JOIN github_rescore r ON g.id = r.id
+            SET g.evaluate = JSON_SET(
+                g.evaluate,
+                '$.score', r.score,
+                '$.percentiles', JSON_MERGE_PATCH(COALESCE(JSON_EXTRACT(g.evaluate, '$.percentiles'), JSON_OBJECT()),
+                                                  JSON_OBJECT('score', r.score_percentile))
+            )
+        """)
+        updated = cursor.rowcount
+        cursor.execute("DROP TEMPORARY TABLE github_rescore")
+
+    _invalidate_all_github()
+    shared_cache.invalidate('rank', 'leaderboard')
+    if leaderboard.loaded:
+        leaderboard.reload()
+    return updated
+
+
+# 仓库表中由仓库信息写入的列
+REPO_COLUMNS = ('id', 'full_name', 'metadata', 'repo_pushed_at', 'repo_updated_at')
+
+# 仓库表中的计数列
+REPO_COUNT_COLUMNS = ('commits', 'prs', 'issues', 'counts_pushed_at', 'counts_updated_at')
+
+
+def _repo_values(repo):
+    """仓库信息对应的 REPO_COLUMNS 列值"""
+    return repo['id'], repo['full_name'], json.dumps(repo), repo.get('pushed_at'), repo.get('updated_at')
+
+
+def _is_repo_count(value):
+    """repos_info 列是否为仓库数, 仓库数表示仓库列表保存在仓库表中"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _save_repository_columns(cursor, rows, names, fetched_at_name):
+    """
+    批量写入仓库信息与额外的列, 仓库已存在时只更新额外的列; 按仓库ID排序写入, 避免并发事务互相死锁
+    :param cursor: 数据库游标
+    :param rows: [(仓库信息, 额外列的值)]
+    :param names: 额外的列名, 为空时更新仓库信息
+    :param fetched_at_name: 写入当前时间的获取时间列
+    """
+    rows = sorted(rows, key=lambda item: item[0]['id'])
+    updates = names or REPO_COLUMNS[1:]
+    placeholder = f"({', '.join(['%s'] * (len(REPO_COLUMNS) + len(names)))}, NOW())"
+    for offset in range(0, len(rows), REPO_STORE_BATCH):
+        chunk = rows[offset:offset + REPO_STORE_BATCH]
+        query = f"""
+            INSERT INTO repositories ({', '.join(REPO_COLUMNS + tuple(names))}, {fetched_at_name})
+            VALUES {', '.join([placeholder] * len(chunk))}
+            ON DUPLICATE KEY UPDATE
+                {', '.join(f'{name} = VALUES({name})' for name in updates)},
+                {fetched_at_name} = NOW()
+        """
+        params = []
+        for repo, values in chunk:
+            params.extend(_repo_values(repo))
+            params.extend(values)
+        cursor.execute(query, tuple(params))
+
+
+def _upsert_repositories(cursor, repos):
+    """写入仓库信息, 不改变已保存的语言与计数"""
+    _save_repository_columns(cursor, [(repo, ()) for repo in repos], (), 'metadata_fetched_at')
+
+
+def _link_repositories(cursor, info_id, repos):
+    """用新的仓库列表替换用户与仓库的关联"""
+    cursor.execute("DELETE FROM user_repositories WHERE github_id = %s", (info_id,))
+    for offset in range(0, len(repos), REPO_STORE_BATCH):
+        chunk = repos[offset:offset + REPO_STORE_BATCH]
+        cursor.execute(
+            f"INSERT IGNORE INTO user_repositories (github_id, repo_id, position) "
+            f"VALUES {', '.join(['(%s, %s, %s)'] * len(chunk))}",
+            tuple(value for position, repo in enumerate(chunk, offset) for value in (info_id, repo['id'], position))
+        )
+
+
+def _select_user_repositories(cursor, github_id):
+    """按保存时的顺序读取用户关联的仓库信息"""
+    cursor.execute("""
+        SELECT r.metadata
+        FROM user_repositories ur
+        JOIN repositories r ON r.id = ur.repo_id
+        WHERE ur.github_id = %s
+        ORDER BY ur.position
+    """, (github_id,))
+    return [_decode_column(row['metadata']) for row in cursor.fetchall()]
+
+
+def get_repositories(repo_ids):
+    """
+    查询仓库已保存的语言与计数
+    :param repo_ids: 仓库ID列表
+    :return: 仓库ID到保存状态的映射, 包含 languages/languages_pushed_at/languages_fetched_at、
+             commits/prs/issues/counts_pushed_at/counts_updated_at, 查询失败时返回空映射
+    """
+    repo_ids = list(dict.fromkeys(repo_ids))
+    repositories = {}
+    try:
+        with get_cursor(dictionary=True) as cursor:
+            for offset in range(0, len(repo_ids), REPO_STORE_BATCH):
+                chunk = repo_ids[offset:offset + REPO_STORE_BATCH]
+                cursor.execute(
+                    f"""
+                    SELECT id, languages, languages_pushed_at, languages_fetched_at,
+                           commits, prs, issues, counts_pushed_at, counts_updated_at
+                    FROM repositories
+                    WHERE id IN ({', '.join(['%s'] * len(chunk))})
+                    """,
+                    tuple(chunk)
+                )
+                for row in cursor.fetchall():
+                    row['languages'] = _decode_column(row['languages'])
+                    repositories[row['id']] = row
+        return repositories
+    except Exception as e:
+        logger.error(f"查询仓库信息失败: {e}")
+        return {}
+
+
+def save_repo_languages(entries):
+    """
+    批量保存仓库的语言字节数, 同时记录获取时仓库的 pushed_at
+    :param entries: [(仓库信息, {语言: 字节数})]
+    :return: 保存成功返回True,失败返回False
+    """
+    try:
+        rows = [(repo, (json.dumps(languages), repo.get('pushed_at'))) for repo, languages in entries]
+        with get_cursor() as cursor:
+            _save_repository_columns(cursor, rows, ('languages', 'languages_pushed_at'), 'languages_fetched_at')
+        return True
+    except Exception as e:
+        logger.error(f"保存仓库语言失败: {e}")
+        return False
+
+
+def save_repo_stats(snapshots):
+    """
+    批量保存仓库的计数, 同时记录统计时仓库的 pushed_at 与 updated_at
+    :param snapshots: 快照列表, 每项包含 repo (仓库信息) 与 commits/prs/issues
+    :return: 保存成功返回True,失败返回False
+    """
+    try:
+        rows = [(snapshot['repo'], (snapshot['commits'], snapshot['prs'], snapshot['issues'],
+                                    snapshot['repo'].get('pushed_at'), snapshot['repo'].get('updated_at')))
+                for snapshot in snapshots]
+        with get_cursor() as cursor:
+            _save_repository_columns(cursor, rows, REPO_COUNT_COLUMNS, 'counts_fetched_at')
+        return True
+    except Exception as e:
+        logger.error(f"保存仓库计数失败: {e}")
+        return False
+
+
+def get_repository_stats():
+    """
+    统计仓库表的规模与共享程度
+    :return: 仓库数、用户关联数、有语言与计数的仓库数, 以及平均每个仓库被关联的次数; 查询失败时返回None
+    """
+    try:
+        with get_cursor(dictionary=True) as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) AS repositories,
+                       COUNT(languages) AS with_languages,
+                       COUNT(counts_fetched_at) AS with_counts
+                FROM repositories
+            """)
+            stats = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) AS links, COUNT(DISTINCT github_id) AS users FROM user_repositories")
+            stats.update(cursor.fetchone())
+        repositories = stats['repositories']
+        stats['links_per_repository'] = round(stats['links'] / repositories, 2) if repositories else 0.0
+        return stats
+    except Exception as e:
+        logger.error(f"统计仓库信息失败: {e}")
+        return None
@@ -0,0 +1,238 @@
+import inspect
+import threading
+import time
+
+import mysql.connector
+import pytest
+
+from info_service.utils import mysql_utils, query_stats
+from info_service.utils.mysql_utils import ConnectionPool, PoolTimeoutError
+from recommend_service.utils import mysql_utils as recommend_mysql_utils, query_stats as recommend_query_stats
+from user_service.utils import mysql_utils as user_mysql_utils, query_stats as user_query_stats
+
+
+class FakeCursor:
+    rowcount = 0
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, operation, params=None):
+        if self.connection.lost:
+            raise mysql.connector.errors.OperationalError("连接已断开", errno=2006)
+        self.connection.executed.append(operation)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.lost = False
+        self.commits = 0
+        self.rollbacks = 0
+        self.executed = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, reconnect=True, attempts=1):
+        if self.lost:
+            raise mysql.connector.errors.OperationalError("连接已断开", errno=2006)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    """代替 mysql.connector.connect, 记录创建的连接"""
+
+    def __init__(self):
+        self.connections = []
+        self._lock = threading.Lock()
+
+    def __call__(self, **config):
+        with self._lock:
+            connection = FakeConnection(len(self.connections))
+            self.connections.append(connection)
+            return connection
+
+
+@pytest.fixture
+def connector(monkeypatch):
+    connector = FakeConnector()
+    monkeypatch.setattr(mysql_utils.mysql.connector, 'connect', connector)
+    return connector
+
+
+def _pool(pool_size=1, checkout_timeout=1, validate_idle_seconds=30):
+    return ConnectionPool('127.0.0.1', 'test', 'test', 'test', pool_size=pool_size,
+                          checkout_timeout=checkout_timeout, validate_idle_seconds=validate_idle_seconds)
+
+
+def _wait_for_waiter(pool):
+    deadline = time.monotonic() + 1
+    while pool.get_stats()['waiters'] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_many_threads_never_share_a_connection(connector):
+    pool = _pool(pool_size=4, checkout_timeout=5)
+    in_use = set()
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                connection = pool.get_connection()
+                with lock:
+                    assert connection.number not in in_use
+                    in_use.add(connection.number)
+                    assert len(in_use) <= 4
+                time.sleep(0.0005)
+                with lock:
+                    in_use.discard(connection.number)
+                pool.release_connection(connection)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.get_stats()
+    assert errors == []
+    assert len(connector.connections) == stats['created'] <= 4
+    assert stats['checkouts'] == 32 * 50
+    assert stats['idle'] == stats['size'] == stats['created']
+    assert stats['waiters'] == 0
+    assert stats['timeouts'] == 0
+    assert sum(stats['checkout_wait_ms']['histogram'].values()) == 32 * 50
+
+
+def test_release_hands_the_connection_to_the_oldest_waiter(connector):
+    pool = _pool()
+    held = pool.get_connection()
+    received = []
+
+    def waiter():
+        received.append(pool.get_connection())
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    _wait_for_waiter(pool)
+    pool.release_connection(held)
+    thread.join(1)
+
+    assert received == [held]
+    stats = pool.get_stats()
+    assert stats['created'] == 1
+    assert stats['waits'] == 1
+    assert stats['idle'] == 0
+
+
+def test_checkout_times_out_and_leaves_no_waiter_behind(connector):
+    pool = _pool()
+    held = pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection(timeout=0.05)
+
+    stats = pool.get_stats()
+    assert stats['timeouts'] == 1
+    assert stats['waiters'] == 0
+    # 超时的等待者不会再收到移交的连接
+    pool.release_connection(held)
+    assert pool.get_connection(timeout=0) is held
+
+
+def test_discarded_connection_frees_its_slot_for_a_waiter(connector):
+    pool = _pool()
+    lost = pool.get_connection()
+    received = []
+
+    thread = threading.Thread(target=lambda: received.append(pool.get_connection()))
+    thread.start()
+    _wait_for_waiter(pool)
+    pool.discard_connection(lost)
+    thread.join(1)
+
+    assert lost.closed
+    assert len(received) == 1 and received[0] is not lost
+    stats = pool.get_stats()
+    assert stats['discarded'] == 1
+    assert stats['size'] == 1
+
+
+def test_validate_idle_discards_stale_connection_that_fails_ping(connector):
+    pool = _pool(validate_idle_seconds=0)
+    connection = pool.get_connection()
+    pool.release_connection(connection)
+    connection.lost = True
+    time.sleep(0.001)
+
+    assert pool.validate_idle() == 1
+    assert connection.closed
+    stats = pool.get_stats()
+    assert stats['size'] == stats['idle'] == 0
+    assert stats['validation_failures'] == 1
+    assert pool.get_connection() is not connection
+
+
+def test_cursor_retries_first_statement_on_a_fresh_connection(connector):
+    pool = _pool(pool_size=2)
+    stale = pool.get_connection()
+    pool.release_connection(stale)
+    stale.lost = True
+
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+    assert stale.closed
+    assert connector.connections[1].executed == ["SELECT 1"]
+    assert connector.connections[1].commits == 1
+    stats = pool.get_stats()
+    assert stats['retries'] == 1
+    assert stats['idle'] == stats['size'] == 1
+
+
+def test_cursor_does_not_retry_after_a_statement_succeeded(connector):
+    pool = _pool()
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        with pool.cursor() as cursor:
+            cursor.execute("UPDATE a")
+            connector.connections[0].lost = True
+            cursor.execute("UPDATE b")
+
+    assert connector.connections[0].closed
+    stats = pool.get_stats()
+    assert stats['retries'] == 0
+    assert stats['discarded'] == 1
+    assert stats['size'] == 0
+
+
+@pytest.mark.parametrize('other', [user_mysql_utils, recommend_mysql_utils])
+def test_pool_copies_stay_in_sync(other):
+    # 各服务各自部署, 连接池代码按服务复制; 修改时三份需保持一致
+    for name in ('is_connection_lost', 'RetryingCursor', 'ConnectionPool'):
+        assert inspect.getsource(getattr(other, name)) == inspect.getsource(getattr(mysql_utils, name)), name
+
+
+@pytest.mark.parametrize('other', [user_query_stats, recommend_query_stats])
+def test_query_stats_copies_stay_in_sync(other):
+    for name in ('fingerprint', 'redact', 'QueryStats', 'InstrumentedCursor'):
+        assert inspect.getsource(getattr(other, name)) == inspect.getsource(getattr(query_stats, name)), name
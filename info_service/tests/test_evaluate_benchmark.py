@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+import requests
+
+from info_service.utils import evaluate_utils, github_client as github_client_module
+from info_service.utils.evaluate_utils import collect_rest_stats, collect_graphql_stats, calculate_score
+from info_service.utils.github_client import github_client
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'github_user_recording.json')
+
+# 回放每个请求时模拟的网络延迟 (秒)
+REPLAY_LATENCY = 0.002
+
+
+def _response(url, body, status_code=200, links=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = json.dumps(body).encode('utf-8')
+    if links:
+        response.headers['Link'] = ', '.join(f'<{link}>; rel="{rel}"' for rel, link in links.items())
+    return response
+
+
+class RecordingReplay:
+    """按录制数据回放 GitHub REST 与 GraphQL 响应, 统计请求次数"""
+
+    def __init__(self, fixture):
+        self.fixture = fixture
+        self.repos = {repo['full_name']: repo for repo in fixture['repos']}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, method, url, headers=None, json=None, **kwargs):
+        with self._lock:
+            self.requests += 1
+        time.sleep(REPLAY_LATENCY)
+        if method == 'POST':
+            return self._graphql(url, json['variables'])
+        return self._rest(url)
+
+    def _rest(self, url):
+        parts = urlsplit(url)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        segments = parts.path.strip('/').split('/')
+        if segments[0] == 'users' and len(segments) == 2:
+            return _response(url, self.fixture['user'])
+        if segments[0] == 'users' and segments[2] == 'repos':
+            return self._repos_page(url, int(query.get('per_page', 30)), int(query.get('page', 1)))
+
+        repo = self.repos[f"{segments[1]}/{segments[2]}"]
+        counts = repo['counts']
+        # REST 的 issues 列表包含 PR
+        total = {'commits': counts['commits'], 'pulls': counts['prs'],
+                 'issues': counts['issues'] + counts['prs']}[segments[3]]
+        if total <= 1:
+            return _response(url, [{}] * total)
+        return _response(url, [{}], links={'last': f"{url}&page={total}"})
+
+    def _repos_page(self, url, per_page, page):
+        repos = [{key: value for key, value in repo.items() if key != 'counts'} for repo in self.fixture['repos']]
+        items = repos[(page - 1) * per_page:page * per_page]
+        links = {}
+        if page * per_page < len(repos):
+            base = url.split('&page=')[0]
+            links['next'] = f"{base}&page={page + 1}"
+        return _response(url, items, links=links)
+
+    def _graphql(self, url, variables):
+        start = int(variables['cursor'] or 0)
+        nodes = []
+        for repo in self.fixture['repos'][start:start + variables['pageSize']]:
+            counts = repo['counts']
+            nodes.append({
+                'name': repo['name'],
+                'stargazerCount': repo['stargazers_count'],
+                'forkCount': repo['forks_count'],
+                'openIssues': {'totalCount': counts['open_issues']},
+                'openPullRequests': {'totalCount': counts['open_prs']},
+                'issues': {'totalCount': counts['issues']},
+                'pullRequests': {'totalCount': counts['prs']},
+                'defaultBranchRef': {'target': {'history': {'totalCount': counts['commits']}}},
+            })
+        end = start + len(nodes)
+        return _response(url, {'data': {'user': {
+            'followers': {'totalCount': self.fixture['user']['followers']},
+            'repositories': {
+                'pageInfo': {'hasNextPage': end < len(self.fixture['repos']), 'endCursor': str(end)},
+                'nodes': nodes,
+            },
+        }}})
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        recording = RecordingReplay(json.load(f))
+    monkeypatch.setattr(github_client.session, 'request', recording)
+    monkeypatch.setattr(github_client_module, 'ETAG_CACHE_ENABLED', False)
+    # 不读写仓库表, 每个仓库都重新统计
+    monkeypatch.setattr(evaluate_utils, 'get_repositories', lambda repo_ids: {})
+    monkeypatch.setattr(evaluate_utils, 'save_repo_stats', lambda snapshots: True)
+    return recording
+
+
+def _run(replay, collect):
+    replay.requests = 0
+    start = time.perf_counter()
+    stats, request_count, _ = collect()
+    return stats, request_count, replay.requests, time.perf_counter() - start
+
+
+def test_rest_and_graphql_backends_score_the_same_inputs(replay):
+    login = replay.fixture['login']
+    rest_stats, rest_reported, rest_requests, rest_seconds = _run(replay, lambda: collect_rest_stats(login))
+    graphql_stats, graphql_reported, graphql_requests, graphql_seconds = _run(
+        replay, lambda: collect_graphql_stats(login))
+
+    print(f"\nREST: {rest_requests}个请求, {rest_seconds * 1000:.0f}ms; "
+          f"GraphQL: {graphql_requests}个请求, {graphql_seconds * 1000:.0f}ms")
+
+    assert rest_stats == graphql_stats
+    assert calculate_score(rest_stats) == calculate_score(graphql_stats)
+    assert rest_reported == rest_requests
+    assert graphql_reported == graphql_requests
+    repos = len(replay.fixture['repos'])
+    assert rest_requests == 1 + 2 + 3 * repos
+    assert graphql_requests == 3
+    assert graphql_seconds < rest_seconds
+
+
+def test_rest_backend_refetches_a_possibly_truncated_repo_list(replay):
+    login = replay.fixture['login']
+    first_page = replay._repos_page('https://api.github.com/users/fixture-user/repos?sort=pushed', 30, 1).json()
+    full_stats, _, _, _ = _run(replay, lambda: collect_rest_stats(login))
+    stats, _, _, _ = _run(replay, lambda: collect_rest_stats(login, repos_data=first_page))
+    assert stats == full_stats
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from info_service.services.info_service import get_response_cache, save_response_cache
+from info_service.utils.logger_utils import logger
+from info_service.utils.token_pool import token_fingerprint
+
+# 命中缓存时需要回放给调用方的响应头
+REPLAY_HEADERS = ('Content-Type', 'Link')
+
+
+class ETagCache:
+    """
+    GitHub API 条件请求缓存
+    保存响应的 ETag/Last-Modified 与响应体, 刷新时发送条件请求, 收到 304 时返回缓存的响应体
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,  # 存在缓存记录, 发送了条件请求
+            'misses': 0,  # 没有缓存记录, 发送了普通请求
+            'not_modified': 0,  # 收到 304, 返回缓存的响应体
+            'stores': 0,  # 写入或更新缓存记录
+        }
+
+    def _incr(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def build_key(url):
+        """
+        根据 URL 生成缓存键, 缓存的都是公开资源, 不同 Token 获取的响应相同
+        :param url: 请求URL
+        :return: SHA256 摘要
+        """
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def lookup(self, cache_key):
+        """
+        查询缓存记录并生成条件请求头
+        :param cache_key: 缓存键
+        :return: (缓存记录, 条件请求头)
+        """
+        entry = get_response_cache(cache_key)
+        if not entry:
+            self._incr('misses')
+            return None, {}
+
+        self._incr('hits')
+        conditional_headers = {}
+        if entry.get('etag'):
+            conditional_headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            conditional_headers['If-Modified-Since'] = entry['last_modified']
+        return entry, conditional_headers
+
+    def resolve(self, cache_key, url, entry, response, token=None):
+        """
+        处理条件请求的响应: 304 时返回缓存的响应体, 200 时更新缓存
+        :param cache_key: 缓存键
+        :param url: 请求URL
+        :param entry: 缓存记录
+        :param response: 原始响应
+        :param token: 请求使用的Token, 记录其摘要供下次条件请求优先使用
+        :return: requests.Response
+        """
+        if response.status_code == 304 and entry:
+            self._incr('not_modified')
+            logger.debug(f"条件请求命中缓存: {url}")
+            return self._build_cached_response(entry, response)
+
+        if response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                headers = {name: response.headers[name] for name in REPLAY_HEADERS if name in response.headers}
+                if save_response_cache(cache_key, url, etag, last_modified, headers, response.text,
+                                       token_fingerprint(token)):
+                    self._incr('stores')
+        return response
+
+    @staticmethod
+    def _build_cached_response(entry, response):
+        """
+        使用缓存的响应体构造 200 响应
+        :param entry: 缓存记录
+        :param response: 304 响应
+        :return: requests.Response
+        """
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.url = response.url
+        cached.request = response.request
+        cached.encoding = 'utf-8'
+        cached.headers = CaseInsensitiveDict(response.headers)
+        cached.headers.update(entry.get('headers') or {})
+        cached._content = (entry.get('body') or '').encode('utf-8')
+        return cached
+
+    def get_stats(self):
+        """
+        获取缓存统计
+        :return: 统计字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0
+        return stats
+
+
+# 进程级共享实例
+etag_cache = ETagCache()
@@ -1,5 +1,7 @@
+import time
+
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from info_service.config.evaluate_config import (
@@ -7,18 +9,35 @@ from info_service.config.evaluate_config import (
     STARS_WEIGHT, FOLLOWERS_WEIGHT, TOTAL_WEIGHT_BASE,
     COMMITS_MEDIAN, PRS_MEDIAN, ISSUES_MEDIAN,
     STARS_MEDIAN, FOLLOWERS_MEDIAN, PROJECT_IMPORTANCE_WEIGHT, TOTAL_PROJECT_IMPORTANCE_MEDIAN,
-    TOTAL_CONTRIBUTION_MEDIAN, DEVELOPER_CONTRIBUTION_WEIGHT
+    TOTAL_CONTRIBUTION_MEDIAN, DEVELOPER_CONTRIBUTION_WEIGHT, EVALUATE_BACKEND, REPO_SNAPSHOT_ENABLED,
+    EVALUATE_MAX_REPOS
+)
+from info_service.config.github_config import (
+    GITHUB_REPOS_URL, GITHUB_USER_URL, GITHUB_DEFAULT_PAGE_SIZE, GITHUB_MAX_PAGE_SIZE
 )
-from info_service.config.github_config import GITHUB_REPOS_URL, GITHUB_USER_URL
 from info_service.config.github_token_config import Config
+from info_service.services.info_service import get_repositories, save_repo_stats
+from info_service.utils.github_client import github_client
+from info_service.utils.graphql_utils import fetch_user_repos_stats
 from info_service.utils.logger_utils import logger
-from info_service.utils.agent_utils import get_random_user_agent
+from info_service.utils.quantile_sketch import metric_sketches
+
+# 各指标的默认中位数, 分位数草图样本不足时使用
+DEFAULT_MEDIANS = {
+    'commits': COMMITS_MEDIAN,
+    'prs': PRS_MEDIAN,
+    'issues': ISSUES_MEDIAN,
+    'stars': STARS_MEDIAN,
+    'followers': FOLLOWERS_MEDIAN,
+    'project_importance': TOTAL_PROJECT_IMPORTANCE_MEDIAN,
+    'contribution': TOTAL_CONTRIBUTION_MEDIAN,
+}
 
 
-def fetch_data(session, url, headers):
+def fetch_data(url):
     """发送 HTTP 请求并获取数据"""
     try:
-        response = session.get(url, headers=headers, verify=False, timeout=30)
+        response = github_client.get(url, verify=False)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
@@ -26,90 +45,245 @@ def fetch_data(session, url, headers):
         return []  # 返回空列表，避免中断其他请求
 
 
-def evaluate_github_user(username: str, previous_score: float = 5.0) -> Dict[str, Any]:
+def fetch_count(url):
+    """
+    通过 Link 响应头统计列表条目总数
+    :return: 条目总数, 请求失败时返回 None, 由调用方按0计入且不保存快照
+    """
     try:
-        session = requests.Session()
-        headers = {
-            'User-Agent': get_random_user_agent(),
-            'Authorization': f'token {Config.token}'
-        } if Config.token else {'User-Agent': get_random_user_agent()}
+        return github_client.count_items(url, verify=False)
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Error counting {url}: {e}")
+        return None  # 不抛出异常，避免中断其他请求
+
+
+def summarize_repos(repos: List[Dict[str, Any]], followers: int) -> Dict[str, Any]:
+    """
+    汇总仓库统计, 得到评分所需的各项指标
+    :param repos: 仓库统计列表, 每个元素包含 commits/prs/issues/stargazers_count/forks_count/open_issues_count
+    :param followers: 粉丝数
+    :return: 指标字典
+    """
+    total_commits = sum(repo.get('commits', 0) for repo in repos)
+    total_prs = sum(repo.get('prs', 0) for repo in repos)
+    total_issues = sum(repo.get('issues', 0) for repo in repos)
+
+    # 计算项目重要性：可以使用星标数、提交数、活跃度等来计算项目的重要性
+    total_project_importance = sum(
+        repo.get('stargazers_count', 0) + repo.get('open_issues_count', 0) for repo in repos
+    )
+
+    return {
+        "commits": total_commits,
+        "prs": total_prs,
+        "issues": total_issues,
+        "forks": sum(repo.get('forks_count', 0) for repo in repos),
+        "stars": sum(repo.get('stargazers_count', 0) for repo in repos),
+        "followers": followers,
+        "project_importance": total_project_importance,
+        # 开发者贡献度沿用原有口径: 每个仓库累计一次用户的提交、PR与Issue总数
+        "contribution": len(repos) * (total_commits + total_prs + total_issues),
+    }
+
+
+# 每个仓库统计并保存快照的计数
+REPO_COUNT_KINDS = ('commits', 'prs', 'issues')
+
+# 评分计算中活跃度与上一次评分的平滑因子
+SMOOTH_FACTOR = 0.8
+
+# 评分依赖的原始指标, 随评估结果保存, 修改权重后可离线重新计算评分
+SCORE_COMPONENTS = ('commits', 'prs', 'issues', 'stars', 'followers', 'project_importance', 'contribution')
+
+
+def _activity_rank(ratio):
+    """
+    按权重汇总各指标与中位数之比, 得到活跃度排名
+    :param ratio: 指标名到 指标/中位数 的函数, 返回标量或 NumPy 数组
+    :return: 与 ratio 返回值同类型的活跃度排名
+    """
+    # 计算用户的活跃度排名，增加项目重要性和开发者贡献度的权重
+    return (
+                   COMMITS_WEIGHT * ratio('commits') +
+                   PRS_WEIGHT * ratio('prs') +
+                   ISSUES_WEIGHT * ratio('issues') +
+                   STARS_WEIGHT * ratio('stars') +
+                   FOLLOWERS_WEIGHT * ratio('followers') +
+                   PROJECT_IMPORTANCE_WEIGHT * ratio('project_importance') +
+                   DEVELOPER_CONTRIBUTION_WEIGHT * ratio('contribution')
+           ) / TOTAL_WEIGHT_BASE
+
+
+def _median(medians, metric):
+    median = (medians or {}).get(metric, DEFAULT_MEDIANS[metric])
+    return median if median > 0 else 1
+
+
+def calculate_score(stats: Dict[str, Any], previous_score: float = 5.0,
+                    medians: Dict[str, float] = None) -> float:
+    """
+    根据各指标的中位数和 evaluate_config 中的权重计算用户评分
+    :param stats: summarize_repos 返回的指标字典
+    :param previous_score: 上一次的评分, 用于平滑
+    :param medians: 分位数草图中的中位数, 缺少的指标使用 DEFAULT_MEDIANS
+    :return: 0 到 10 之间保留一位小数的评分
+    """
+    rank = _activity_rank(lambda metric: stats[metric] / _median(medians, metric))
+
+    # 平滑处理
+    percentile = (SMOOTH_FACTOR * (rank * 100) + (1 - SMOOTH_FACTOR) * previous_score) / 30
+
+    # 确保分数在0到10之间并保留一位小数
+    return round(max(0, min(percentile, 10)), 1)
+
 
-        # 获取用户的基本信息
+def calculate_scores(components, previous_scores, medians: Dict[str, float] = None):
+    """
+    calculate_score 的向量化版本, 一次计算所有用户的评分
+    :param components: 指标名到 NumPy 数组的映射, 数组下标对应用户
+    :param previous_scores: 各用户上一次评分的 NumPy 数组
+    :param medians: 分位数草图中的中位数, 缺少的指标使用 DEFAULT_MEDIANS
+    :return: 0 到 10 之间保留一位小数的评分数组
+    """
+    # numpy 为可选依赖, 只在离线重新评分时需要
+    import numpy as np
+
+    rank = _activity_rank(lambda metric: components[metric] / _median(medians, metric))
+    percentile = (SMOOTH_FACTOR * (rank * 100) + (1 - SMOOTH_FACTOR) * previous_scores) / 30
+    return np.round(np.clip(percentile, 0, 10), 1)
+
+
+def get_repo_counts(repos_data: List[Dict[str, Any]]):
+    """
+    获取各仓库的提交、PR 和 Issue 总数
+    仓库表中统计后 pushed_at 与 updated_at 都没有变化的仓库直接使用保存的计数, 多个用户关联同一仓库时只统计一次
+    :param repos_data: 仓库列表
+    :return: (仓库名到计数的映射, 请求次数, 跳过与重新统计的仓库数)
+    """
+    counts, stale = {}, []
+    stored = get_repositories([repo['id'] for repo in repos_data]) if REPO_SNAPSHOT_ENABLED else {}
+    for repo in repos_data:
+        state = stored.get(repo['id'])
+        if (state and state['commits'] is not None and state['counts_pushed_at'] == repo.get('pushed_at')
+                and state['counts_updated_at'] == repo.get('updated_at')):
+            counts[repo['name']] = {kind: state[kind] for kind in REPO_COUNT_KINDS}
+        else:
+            stale.append(repo)
+
+    # 使用 ThreadPoolExecutor 实现并行请求
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = {}
+        for repo in stale:
+            repo_name = repo['name']
+            repo_url = f"https://api.github.com/repos/{repo['full_name']}"
+
+            # 向每个仓库发起并行请求
+            futures[executor.submit(fetch_count, f"{repo_url}/commits")] = (repo_name, 'commits')
+            futures[executor.submit(fetch_count, f"{repo_url}/pulls?state=all")] = (repo_name, 'prs')
+            futures[executor.submit(fetch_count, f"{repo_url}/issues?state=all")] = (repo_name, 'issues')
+
+        # 获取请求结果
+        fetched = {}
+        for future in as_completed(futures):
+            repo_name, kind = futures[future]
+            fetched.setdefault(repo_name, {})[kind] = future.result()
+
+    # REST 的 issues 列表包含 PR, 扣除 PR 数后与 GraphQL 的 issues 口径一致; 缺少 PR 数时无法扣除, 按获取失败处理
+    for repo_counts in fetched.values():
+        issues, prs = repo_counts.get('issues'), repo_counts.get('prs')
+        repo_counts['issues'] = max(issues - prs, 0) if issues is not None and prs is not None else None
+
+    # 只保存三项计数都获取成功的仓库, 失败的计数按0计入
+    fresh = []
+    for repo in stale:
+        repo_counts = fetched.get(repo['name'], {})
+        if REPO_SNAPSHOT_ENABLED and all(repo_counts.get(kind) is not None for kind in REPO_COUNT_KINDS):
+            fresh.append(dict(repo_counts, repo=repo))
+        counts[repo['name']] = {kind: repo_counts.get(kind) or 0 for kind in REPO_COUNT_KINDS}
+    if fresh:
+        save_repo_stats(fresh)
+
+    return counts, len(futures), {'skipped': len(repos_data) - len(stale), 'refetched': len(stale)}
+
+
+def collect_rest_stats(username: str, user_data: Dict[str, Any] = None, repos_data: List[Dict[str, Any]] = None):
+    """
+    通过 REST API 获取评分指标, 每个仓库分别统计提交、PR 和 Issue 总数
+    :param username: GitHub用户名
+    :param user_data: 已获取的用户基本信息, 为空时重新请求
+    :param repos_data: 已获取的仓库列表, 为空时重新请求
+    :return: (指标字典, 请求次数, 跳过与重新统计的仓库数)
+    """
+    request_count = 0
+    # 获取用户的基本信息
+    if user_data is None:
         user_url = GITHUB_USER_URL.format(username=username)
-        user_data = fetch_data(session, user_url, headers)
+        user_data = fetch_data(user_url)
+        request_count += 1
 
-        # 获取用户的仓库信息
+    # 获取用户的仓库信息, 与 GraphQL 后端一样统计最近推送的 EVALUATE_MAX_REPOS 个仓库;
+    # 传入的仓库列表达到默认每页条目数时可能只是第一页, 需要重新分页获取
+    if repos_data is None or len(repos_data) >= GITHUB_DEFAULT_PAGE_SIZE:
         repos_url = GITHUB_REPOS_URL.format(username=username)
-        repos_data = fetch_data(session, repos_url, headers)
-
-        total_commits = 0
-        total_forks = 0
-        total_issues = 0
-        total_prs = 0
-        total_stars = 0
-        total_project_importance = 0  # 项目重要性
-        total_contribution = 0  # 开发者贡献度
-
-        # 使用 ThreadPoolExecutor 实现并行请求
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = []
-            for repo in repos_data:
-                repo_name = repo['name']
-                repo_url = f"https://api.github.com/repos/{username}/{repo_name}"
-
-                # 向每个仓库发起并行请求
-                futures.append(executor.submit(fetch_data, session, f"{repo_url}/commits", headers))
-                futures.append(executor.submit(fetch_data, session, f"{repo_url}/pulls?state=all", headers))
-                futures.append(executor.submit(fetch_data, session, f"{repo_url}/issues?state=all", headers))
-
-            # 获取请求结果
-            for future in as_completed(futures):
-                data = future.result()
-                if 'commits' in str(future):
-                    total_commits += len(data)
-                elif 'pulls' in str(future):
-                    total_prs += len(data)
-                elif 'issues' in str(future):
-                    total_issues += len(data)
-
-            # 计算其他数据
-            for repo in repos_data:
-                total_forks += repo.get('forks_count', 0)
-                total_stars += repo.get('stargazers_count', 0)
-
-                # 计算项目重要性：可以使用星标数、提交数、活跃度等来计算项目的重要性
-                project_importance = repo.get('stargazers_count', 0) + repo.get('open_issues_count', 0)
-                total_project_importance += project_importance
-
-                # 计算开发者在该项目中的贡献度（例如提交数、PR数等）
-                developer_contribution = (total_commits + total_prs + total_issues)
-                total_contribution += developer_contribution
-
-        # 计算用户的活跃度排名，增加项目重要性和开发者贡献度的权重
-        rank = (
-                       COMMITS_WEIGHT * (total_commits / (COMMITS_MEDIAN if COMMITS_MEDIAN > 0 else 1)) +
-                       PRS_WEIGHT * (total_prs / (PRS_MEDIAN if PRS_MEDIAN > 0 else 1)) +
-                       ISSUES_WEIGHT * (total_issues / (ISSUES_MEDIAN if ISSUES_MEDIAN > 0 else 1)) +
-                       STARS_WEIGHT * (total_stars / (STARS_MEDIAN if STARS_MEDIAN > 0 else 1)) +
-                       FOLLOWERS_WEIGHT * (
-                               user_data.get('followers', 0) / (FOLLOWERS_MEDIAN if FOLLOWERS_MEDIAN > 0 else 1)) +
-                       PROJECT_IMPORTANCE_WEIGHT * (total_project_importance / (
-                   TOTAL_PROJECT_IMPORTANCE_MEDIAN if TOTAL_PROJECT_IMPORTANCE_MEDIAN > 0 else 1)) +
-                       DEVELOPER_CONTRIBUTION_WEIGHT * (total_contribution / (
-                   TOTAL_CONTRIBUTION_MEDIAN if TOTAL_CONTRIBUTION_MEDIAN > 0 else 1))
-               ) / TOTAL_WEIGHT_BASE
-
-        # 平滑处理
-        smooth_factor = 0.8  # 平滑因子
-        percentile = (smooth_factor * (rank * 100) + (1 - smooth_factor) * previous_score) / 30
-
-        # 确保分数在0到10之间并保留一位小数
-        percentile = round(max(0, min(percentile, 10)), 1)
-
-        # 组织输出结果
+        repos_data = github_client.get_all(repos_url, EVALUATE_MAX_REPOS, GITHUB_MAX_PAGE_SIZE, verify=False)
+        request_count += max(-(-len(repos_data) // GITHUB_MAX_PAGE_SIZE), 1)
+
+    counts, repo_request_count, report = get_repo_counts(repos_data)
+
+    repos = [dict(repo, **counts.get(repo['name'], {})) for repo in repos_data]
+    return summarize_repos(repos, user_data.get('followers', 0)), request_count + repo_request_count, report
+
+
+def collect_graphql_stats(username: str):
+    """
+    通过 GraphQL API 分页批量获取评分指标
+    :param username: GitHub用户名
+    :return: (指标字典, 请求次数, 跳过与重新统计的仓库数)
+    """
+    followers, repos, request_count = fetch_user_repos_stats(username)
+    # GraphQL 按页批量获取所有仓库的统计, 不使用仓库快照
+    return summarize_repos(repos, followers), request_count, {'skipped': 0, 'refetched': len(repos)}
+
+
+def evaluate_github_user(username: str, previous_score: float = 5.0,
+                         user_data: Dict[str, Any] = None, repos_data: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    评估 GitHub 用户
+    :param username: GitHub用户名
+    :param previous_score: 上一次的评分, 用于平滑
+    :param user_data: 已获取的用户基本信息, REST 后端可复用, 避免重复请求
+    :param repos_data: 已获取的仓库列表, REST 后端可复用, 避免重复请求
+    :return: 评估结果
+    """
+    try:
+        backend = EVALUATE_BACKEND
+        if backend == "graphql" and not Config.tokens:
+            # GraphQL API 必须认证
+            logger.warning("GraphQL评估需要配置GitHub Token, 回退到REST评估")
+            backend = "rest"
+
+        start = time.perf_counter()
+        if backend == "graphql":
+            stats, request_count, repo_report = collect_graphql_stats(username)
+        else:
+            stats, request_count, repo_report = collect_rest_stats(username, user_data, repos_data)
+        elapsed = time.perf_counter() - start
+        logger.info(f"用户{username}评估完成: 后端={backend}, 请求数={request_count}, "
+                    f"跳过仓库={repo_report['skipped']}, 重新统计仓库={repo_report['refetched']}, 耗时={elapsed:.2f}秒")
+
+        # 组织输出结果, 百分位为该用户各指标与总评分在所有已评估用户中的位置
+        score = calculate_score(stats, previous_score, metric_sketches.medians())
+        values = dict(stats, score=score)
         result = {
-            "score": percentile
+            "score": score,
+            "percentiles": metric_sketches.percentiles(values),
+            # 原始指标与平滑用的上一次评分, 供修改权重后离线重新计算评分
+            "components": {metric: stats[metric] for metric in SCORE_COMPONENTS},
+            "previous_score": previous_score,
+            # 本次评估中未变化而跳过与重新统计的仓库数
+            "repos": repo_report
         }
+        metric_sketches.record(values)
 
         return result
 
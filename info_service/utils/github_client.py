@@ -0,0 +1,214 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from info_service.config.http_config import (
+    GITHUB_POOL_SIZES, DEFAULT_POOL_SIZE, POOL_BLOCK, MAX_RETRIES, REQUEST_TIMEOUT, AUTH_HOSTS,
+    ETAG_CACHE_ENABLED, ETAG_CACHE_HOSTS
+)
+from info_service.config.github_config import GITHUB_MAX_PAGE_SIZE
+from info_service.utils.agent_utils import get_random_user_agent
+from info_service.utils.etag_cache import etag_cache
+from info_service.utils.singleflight import single_flight
+from info_service.utils.token_pool import token_pool, TokenLease
+
+
+class GithubNotFoundError(Exception):
+    """GitHub 用户或资源不存在 (404) 或因法律原因不可用 (451)"""
+
+    def __init__(self, url, status_code=404):
+        super().__init__(url)
+        self.status_code = status_code
+
+
+def with_query(url, **params):
+    """
+    在 URL 上设置查询参数, 已存在的同名参数会被覆盖
+    :param url: 原始地址
+    :param params: 查询参数
+    :return: 新地址
+    """
+    parts = urlsplit(url)
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class GithubClient:
+    """
+    进程级共享的 GitHub HTTP 客户端
+    复用 keep-alive 连接, 按主机配置连接池大小, 统一处理认证和 User-Agent
+    """
+
+    def __init__(self, pool_sizes=None, default_pool_size=DEFAULT_POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        """
+        初始化客户端
+        :param pool_sizes: 主机到连接池大小的映射
+        :param default_pool_size: 未配置主机的默认连接池大小
+        :param timeout: 默认请求超时时间(秒)
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        # 未单独配置的主机使用默认连接池
+        self.session.mount("https://", self._build_adapter(default_pool_size))
+        self.session.mount("http://", self._build_adapter(default_pool_size))
+
+        # 为每个主机挂载独立的连接池, requests 按最长前缀匹配适配器
+        for host, pool_size in (pool_sizes or GITHUB_POOL_SIZES).items():
+            self.session.mount(f"https://{host}/", self._build_adapter(pool_size))
+
+    @staticmethod
+    def _build_adapter(pool_size):
+        """
+        创建带连接池的适配器
+        :param pool_size: 连接池大小
+        :return: HTTPAdapter
+        """
+        return HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=MAX_RETRIES,
+            pool_block=POOL_BLOCK
+        )
+
+    @staticmethod
+    def build_headers(headers=None, token=None):
+        """
+        构造请求头
+        :param headers: 额外的请求头
+        :param token: 认证使用的 Token, 为空时不携带认证
+        :return: 请求头字典
+        """
+        request_headers = {'User-Agent': get_random_user_agent()}
+        if token:
+            request_headers['Authorization'] = f'token {token}'
+        if headers:
+            request_headers.update(headers)
+        return request_headers
+
+    @contextmanager
+    def _lease(self, url, prefer=None):
+        """
+        GitHub API 主机的请求从凭证池占用 Token, 其他主机不携带认证
+        :param url: 请求地址
+        :param prefer: 优先使用的 Token 摘要
+        :return: TokenLease
+        """
+        if urlsplit(url).hostname in AUTH_HOSTS:
+            with token_pool.lease(url, prefer) as lease:
+                yield lease
+        else:
+            yield TokenLease(None, None)
+
+    def _send(self, method, url, lease, headers=None, **kwargs):
+        """
+        使用占用的 Token 发送请求, 并记录响应供凭证池更新额度
+        :return: requests.Response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, url, headers=self.build_headers(headers, lease.token), **kwargs)
+        lease.response = response
+        return response
+
+    def request(self, method, url, headers=None, **kwargs):
+        """
+        发送 HTTP 请求
+        :param method: 请求方法
+        :param url: 请求地址
+        :param headers: 额外的请求头
+        :return: requests.Response
+        """
+        with self._lease(url) as lease:
+            return self._send(method, url, lease, headers, **kwargs)
+
+    def get(self, url, headers=None, use_cache=True, **kwargs):
+        """
+        发送 GET 请求, GitHub API 请求默认走 ETag 条件请求缓存
+        :param url: 请求地址
+        :param headers: 额外的请求头
+        :param use_cache: 是否使用条件请求缓存
+        :return: requests.Response
+        """
+        if headers is None:
+            # 相同 URL 的并发 GET 只发送一次请求, 共享同一个响应
+            return single_flight.do((url, 'github_get'), self._get, url, headers, use_cache, **kwargs)
+        return self._get(url, headers, use_cache, **kwargs)
+
+    def _get(self, url, headers=None, use_cache=True, **kwargs):
+        """发送 GET 请求, 按需使用条件请求缓存"""
+        if not (use_cache and ETAG_CACHE_ENABLED and urlsplit(url).hostname in ETAG_CACHE_HOSTS):
+            return self.request('GET', url, headers=headers, **kwargs)
+
+        # 公开资源的缓存键只包含 URL, 所有 Token 共用一条缓存记录; 条件请求优先使用写入该记录的 Token,
+        # 该 Token 额度不足时使用其他 Token, ETag 不匹配时按普通请求返回 200 并更新缓存
+        cache_key = etag_cache.build_key(url)
+        entry, conditional_headers = etag_cache.lookup(cache_key)
+        with self._lease(url, (entry or {}).get('token_hash')) as lease:
+            response = self._send('GET', url, lease, {**(headers or {}), **conditional_headers}, **kwargs)
+        return etag_cache.resolve(cache_key, url, entry, response, lease.token)
+
+    def count_items(self, url, **kwargs):
+        """
+        统计分页列表接口的条目总数
+        以 per_page=1 请求, 从 Link 响应头 rel="last" 的页码得到总数, 每个列表只需一次请求
+        :param url: 列表接口地址
+        :return: 条目总数
+        """
+        response = self.get(with_query(url, per_page=1), **kwargs)
+        if response.status_code == 409:
+            # 空仓库的提交列表返回 409
+            return 0
+        response.raise_for_status()
+
+        last = response.links.get('last')
+        if last:
+            page = parse_qs(urlsplit(last['url']).query).get('page')
+            if page:
+                return int(page[0])
+        # 只有一页时没有 Link 响应头
+        return len(response.json())
+
+    def get_all(self, url, max_items, page_size=GITHUB_MAX_PAGE_SIZE, **kwargs):
+        """
+        按 Link 响应头 rel="next" 依次请求分页列表, 合并各页的条目
+        :param url: 列表接口地址
+        :param max_items: 最多返回的条目数
+        :param page_size: 每页条目数
+        :return: 条目列表
+        :raises GithubNotFoundError: 资源不存在 (404) 或不可用 (451)
+        """
+        items = []
+        next_url = with_query(url, per_page=page_size)
+        while next_url and len(items) < max_items:
+            response = self.get(next_url, **kwargs)
+            if response.status_code in (404, 451):
+                raise GithubNotFoundError(url, response.status_code)
+            response.raise_for_status()
+            items.extend(response.json())
+            next_url = (response.links.get('next') or {}).get('url')
+        return items[:max_items]
+
+    def get_json(self, url, **kwargs):
+        """
+        发送 GET 请求并解析 JSON 响应
+        :param url: 请求地址
+        :return: 响应数据
+        :raises GithubNotFoundError: 资源不存在 (404) 或不可用 (451)
+        :raises requests.HTTPError: 其他错误状态码
+        """
+        response = self.get(url, **kwargs)
+        if response.status_code in (404, 451):
+            raise GithubNotFoundError(url, response.status_code)
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, url, headers=None, **kwargs):
+        """发送 POST 请求"""
+        return self.request('POST', url, headers=headers, **kwargs)
+
+
+# 进程级共享实例
+github_client = GithubClient()
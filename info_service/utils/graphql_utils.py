@@ -0,0 +1,115 @@
+from info_service.config.evaluate_config import GRAPHQL_REPOS_PAGE_SIZE, EVALUATE_MAX_REPOS
+from info_service.config.github_config import GITHUB_GRAPHQL_URL
+from info_service.utils.github_client import github_client
+from info_service.utils.logger_utils import logger
+
+# 分页查询用户的粉丝数以及每个仓库的星标、Fork、开放问题和提交/PR/Issue总数
+USER_REPOS_STATS_QUERY = """
+query($login: String!, $pageSize: Int!, $cursor: String) {
+  user(login: $login) {
+    followers {
+      totalCount
+    }
+    repositories(first: $pageSize, after: $cursor, ownerAffiliations: OWNER,
+                 orderBy: {field: PUSHED_AT, direction: DESC}) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        name
+        stargazerCount
+        forkCount
+        openIssues: issues(states: OPEN) {
+          totalCount
+        }
+        openPullRequests: pullRequests(states: OPEN) {
+          totalCount
+        }
+        issues {
+          totalCount
+        }
+        pullRequests {
+          totalCount
+        }
+        defaultBranchRef {
+          target {
+            ... on Commit {
+              history {
+                totalCount
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLError(Exception):
+    """GraphQL 查询返回错误"""
+
+
+def run_query(query, variables):
+    """
+    执行 GraphQL 查询
+    :param query: 查询语句
+    :param variables: 查询变量
+    :return: data 字段
+    :raises GraphQLError: 查询返回错误时抛出
+    """
+    response = github_client.post(GITHUB_GRAPHQL_URL, json={'query': query, 'variables': variables}, verify=False)
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get('errors'):
+        raise GraphQLError(payload['errors'])
+    return payload.get('data') or {}
+
+
+def fetch_user_repos_stats(username):
+    """
+    分页获取用户的粉丝数与最近推送的 EVALUATE_MAX_REPOS 个仓库的统计信息
+    :param username: GitHub用户名
+    :return: (粉丝数, 仓库统计列表, 请求次数)
+    """
+    followers = 0
+    repos = []
+    cursor = None
+    request_count = 0
+
+    while len(repos) < EVALUATE_MAX_REPOS:
+        data = run_query(USER_REPOS_STATS_QUERY, {
+            'login': username,
+            'pageSize': min(GRAPHQL_REPOS_PAGE_SIZE, EVALUATE_MAX_REPOS - len(repos)),
+            'cursor': cursor
+        })
+        request_count += 1
+
+        user = data.get('user')
+        if not user:
+            logger.warning(f"GraphQL未找到用户{username}")
+            break
+
+        followers = user['followers']['totalCount']
+        repositories = user['repositories']
+        for node in repositories['nodes']:
+            target = (node.get('defaultBranchRef') or {}).get('target') or {}
+            repos.append({
+                'name': node['name'],
+                'stargazers_count': node['stargazerCount'],
+                'forks_count': node['forkCount'],
+                # 与 REST 的 open_issues_count 保持一致, 包含开放的 PR
+                'open_issues_count': node['openIssues']['totalCount'] + node['openPullRequests']['totalCount'],
+                'commits': (target.get('history') or {}).get('totalCount', 0),
+                'prs': node['pullRequests']['totalCount'],
+                # GraphQL 的 issues 不包含 PR, REST 后端统计时会扣除 PR 数
+                'issues': node['issues']['totalCount'],
+            })
+
+        if not repositories['pageInfo']['hasNextPage']:
+            break
+        cursor = repositories['pageInfo']['endCursor']
+
+    return followers, repos, request_count
@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
+from flask import request
+
+from info_service.config.db_config import Config
 
 
 class JWTManager:
@@ -39,10 +42,10 @@ class JWTManager:
             return decoded_payload, None
         except jwt.ExpiredSignatureError:
             # 处理过期的签名
-            return None, {'message': '令牌已过期!'}, 403  # 修改此行
+            return None, {'message': '令牌已过期!'}
         except jwt.InvalidTokenError:
             # 处理无效的令牌
-            return None, {'message': '无效的令牌!'}, 403  # 修改此行
+            return None, {'message': '无效的令牌!'}
 
 
 # 初始化JWT管理器
@@ -57,7 +60,7 @@ def token_required(f):
     """
 
     @wraps(f)
-    def decorated(request, *args, **kwargs):
+    def decorated(*args, **kwargs):
         # 从请求头中获取令牌
         token = request.headers.get('Authorization')
         if not token:
@@ -67,7 +70,30 @@ def token_required(f):
         decoded_payload, error_response = jwt_manager.verify_token(token)
         if error_response:
             # 如果解码失败，返回错误信息
-            return error_response
+            return error_response, 403
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def admin_required(f):
+    """
+    装饰器函数，用于保护管理接口，令牌中的用户名需在 ADMIN_USERNAMES 中
+    :param f: 被装饰的函数
+    :return: 装饰后的函数
+    """
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return {'message': '令牌缺失!'}, 403
+        decoded_payload, error_response = jwt_manager.verify_token(token)
+        if error_response:
+            return error_response, 403
+        if decoded_payload.get('username') not in Config.ADMIN_USERNAMES:
+            # 普通用户的令牌同样有效, 需要额外检查管理员身份
+            return {'message': '需要管理员权限!'}, 403
         return f(*args, **kwargs)
 
     return decorated
@@ -0,0 +1,401 @@
+import bisect
+import threading
+import time
+
+from info_service.config.cache_config import LEADERBOARD_LOAD_BATCH, LEADERBOARD_RELOAD_SECONDS
+from info_service.utils.logger_utils import logger
+
+# 评分范围 0 到 10, 保留一位小数, 每个分值一个桶
+SCORE_BUCKETS = 101
+
+
+def score_bucket(score):
+    """
+    评分对应的桶
+    :param score: 0 到 10 之间的评分
+    :return: 桶序号, 0 对应 0.0 分, 100 对应 10.0 分
+    """
+    return min(max(int(round(float(score) * 10)), 0), SCORE_BUCKETS - 1)
+
+
+class _Fenwick:
+    """树状数组, 维护各桶的用户数, 前缀和与按名次查找均为 O(log 桶数)"""
+
+    def __init__(self, size):
+        self._size = size
+        self._tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """下标小于 index 的桶的用户总数"""
+        total = 0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k):
+        """
+        查找第 k 个用户 (从0开始) 所在的桶
+        :return: (桶下标, 在桶内的序号)
+        """
+        pos = 0
+        step = 1 << (self._size.bit_length() - 1)
+        while step:
+            if pos + step <= self._size and self._tree[pos + step] <= k:
+                pos += step
+                k -= self._tree[pos]
+            step >>= 1
+        return pos, k
+
+
+class _SortedList:
+    """
+    分块的有序列表, 每块不超过 2 * load 个元素, 用树状数组维护各块长度
+    插入与删除只移动所在块的元素, 按值定位与按序号查找为 O(log n + load)
+    分块或合并后树状数组在下次按序号访问时重建
+    """
+
+    def __init__(self, values=(), load=512):
+        self._load = load
+        values = list(values)
+        self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+        self._maxes = [chunk[-1] for chunk in self._lists]
+        self._len = len(values)
+        self._index = None
+
+    def __len__(self):
+        return self._len
+
+    def _tree(self):
+        if self._index is None:
+            self._index = _Fenwick(len(self._lists))
+            for i, chunk in enumerate(self._lists):
+                self._index.add(i, len(chunk))
+        return self._index
+
+    def add(self, value):
+        self._len += 1
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._index = None
+            return
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(value)
+            self._maxes[pos] = value
+        else:
+            bisect.insort(self._lists[pos], value)
+        chunk = self._lists[pos]
+        if len(chunk) > 2 * self._load:
+            self._lists[pos:pos + 1] = [chunk[:self._load], chunk[self._load:]]
+            self._maxes[pos:pos + 1] = [chunk[self._load - 1], chunk[-1]]
+            self._index = None
+        elif self._index is not None:
+            self._index.add(pos, 1)
+
+    def remove(self, value):
+        """删除已存在的元素"""
+        pos = bisect.bisect_left(self._maxes, value)
+        chunk = self._lists[pos]
+        del chunk[bisect.bisect_left(chunk, value)]
+        self._len -= 1
+        if not chunk:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._index = None
+            return
+        self._maxes[pos] = chunk[-1]
+        if self._index is not None:
+            self._index.add(pos, -1)
+
+    def index(self, value):
+        """小于 value 的元素个数"""
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._tree().prefix(pos) + bisect.bisect_left(self._lists[pos], value)
+
+    def islice(self, start, stop):
+        """按序号返回 [start, stop) 区间的元素"""
+        if start >= min(stop, self._len):
+            return
+        pos, offset = self._tree().find(start)
+        remaining = min(stop, self._len) - start
+        while remaining > 0:
+            chunk = self._lists[pos][offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            pos += 1
+            offset = 0
+
+
+class _Board:
+    """
+    一份排行榜数据
+    桶按评分从高到低排列, 下标 0 对应 10.0 分; 桶内用户按行ID降序排列, 与排行榜 SQL 的 ORDER BY score DESC, id DESC 一致
+    桶内为分块有序列表, 大量用户同分时单次更新仍为 O(log n)
+    """
+
+    def __init__(self):
+        # github_id -> (桶序号, 行ID)
+        self.scores = {}
+        # 每个桶内为 (-行ID, github_id), 升序即行ID降序
+        self.buckets = [_SortedList() for _ in range(SCORE_BUCKETS)]
+        self.tree = _Fenwick(SCORE_BUCKETS)
+        # 批量加载期间未排序的各桶用户
+        self._pending = [[] for _ in range(SCORE_BUCKETS)]
+
+    def load(self, github_id, bucket, row_id):
+        """批量加载时追加用户, 加载完成后调用 build 排序并统计, 避免逐个有序插入"""
+        if github_id in self.scores:
+            return
+        self.scores[github_id] = (bucket, row_id)
+        self._pending[SCORE_BUCKETS - 1 - bucket].append((-row_id, github_id))
+
+    def build(self):
+        for index, members in enumerate(self._pending):
+            if members:
+                members.sort()
+                self.tree.add(index, len(members))
+                self.buckets[index] = _SortedList(members)
+        self._pending = None
+
+    def set(self, github_id, bucket, row_id):
+        old = self.scores.get(github_id)
+        if old == (bucket, row_id):
+            return
+        if old is not None:
+            self.remove(github_id)
+        index = SCORE_BUCKETS - 1 - bucket
+        self.buckets[index].add((-row_id, github_id))
+        self.tree.add(index, 1)
+        self.scores[github_id] = (bucket, row_id)
+
+    def remove(self, github_id):
+        old = self.scores.pop(github_id, None)
+        if old is None:
+            return
+        bucket, row_id = old
+        index = SCORE_BUCKETS - 1 - bucket
+        self.buckets[index].remove((-row_id, github_id))
+        self.tree.add(index, -1)
+
+    def offset(self, github_id):
+        """用户在排行榜中的位置 (从0开始), 用户不在排行榜中时返回 None"""
+        old = self.scores.get(github_id)
+        if old is None:
+            return None
+        bucket, row_id = old
+        index = SCORE_BUCKETS - 1 - bucket
+        return self.tree.prefix(index) + self.buckets[index].index((-row_id, github_id))
+
+
+class Leaderboard:
+    """
+    内存中的排行榜, 按 (评分降序, 行ID降序) 排序, 与数据库分页的顺序一致
+    评分只有 101 个取值, 用树状数组维护各分值的用户数, 同分桶内为分块有序列表, 定位名次、窗口起点与更新均为 O(log n)
+    启动时从数据库分批加载, 保存评分后增量更新; 定期在后台重新加载以同步其他进程的写入,
+    重新加载期间的增量更新会记录下来, 在切换到新数据前重放
+    """
+
+    def __init__(self, reload_seconds=LEADERBOARD_RELOAD_SECONDS, batch_size=LEADERBOARD_LOAD_BATCH):
+        self._reload_seconds = reload_seconds
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        # 后台线程与批量写入后的重新加载不能同时进行, 否则会清空对方的增量记录
+        self._reload_lock = threading.Lock()
+        self._board = _Board()
+        self._loaded = False
+        # 重新加载期间的增量更新, github_id -> (桶序号, 行ID) 或 None (删除)
+        self._journal = None
+        self._load_page = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'loads': 0, 'load_failures': 0, 'last_load_ms': 0.0, 'updates': 0, 'queries': 0}
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def start(self, load_page):
+        """
+        启动后台线程, 加载排行榜并定期重新加载
+        :param load_page: 分批读取评分的函数, 参数为 (上一批最后的ID, 批量大小), 返回 [(ID, github_id, 评分)]
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._load_page = load_page
+        self._thread = threading.Thread(target=self._loop, name='leaderboard', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.reload()
+            except Exception as e:
+                with self._lock:
+                    self._stats['load_failures'] += 1
+                logger.error(f"加载排行榜失败: {e}", exc_info=True)
+            if self._stop.wait(self._reload_seconds):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    def reload(self):
+        """从数据库重新加载全部评分, 完成后替换当前数据"""
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self):
+        start = time.perf_counter()
+        with self._lock:
+            self._journal = {}
+
+        board = _Board()
+        last_id = 0
+        try:
+            while True:
+                rows = self._load_page(last_id, self._batch_size)
+                if not rows:
+                    break
+                for row_id, github_id, score in rows:
+                    board.load(github_id.lower(), score_bucket(score), row_id)
+                last_id = rows[-1][0]
+            board.build()
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            for github_id, entry in self._journal.items():
+                if entry is None:
+                    board.remove(github_id)
+                else:
+                    board.set(github_id, *entry)
+            self._journal = None
+            self._board = board
+            self._loaded = True
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._stats['loads'] += 1
+            self._stats['last_load_ms'] = elapsed_ms
+        logger.info(f"排行榜加载完成: {len(board.scores)}个用户, 耗时{elapsed_ms:.0f}ms")
+
+    def update(self, github_id, score, row_id):
+        """
+        更新用户评分
+        :param github_id: GitHub用户ID
+        :param score: 评分, 为 None 时移除用户
+        :param row_id: Github 表的行ID, 同分用户按行ID降序排列; 为 None 时沿用已有的行ID,
+                       不在排行榜中的用户等到下次重新加载时加入
+        """
+        key = github_id.lower()
+        with self._lock:
+            if row_id is None and score is not None:
+                row_id = (self._board.scores.get(key) or (None, None))[1]
+                if row_id is None:
+                    return
+            entry = (score_bucket(score), row_id) if score is not None else None
+            if entry is None:
+                self._board.remove(key)
+            else:
+                self._board.set(key, *entry)
+            if self._journal is not None:
+                self._journal[key] = entry
+            self._stats['updates'] += 1
+
+    @staticmethod
+    def _entry(index, github_id, rank):
+        return {'rank': rank, 'github_id': github_id, 'score': (SCORE_BUCKETS - 1 - index) / 10}
+
+    def _window(self, board, offset, limit):
+        total = len(board.scores)
+        if offset >= total or limit <= 0:
+            return []
+        index, position = board.tree.find(offset)
+        users = []
+        rank = offset + 1
+        while index < SCORE_BUCKETS and len(users) < limit:
+            for _, github_id in board.buckets[index].islice(position, position + limit - len(users)):
+                users.append(self._entry(index, github_id, rank))
+                rank += 1
+            index += 1
+            position = 0
+        return users
+
+    def window(self, offset, limit):
+        """
+        获取任意名次区间的用户
+        :param offset: 起始名次 (从0开始)
+        :param limit: 用户数
+        :return: 用户列表与总数
+        """
+        with self._lock:
+            self._stats['queries'] += 1
+            return {
+                'users': self._window(self._board, offset, limit),
+                'offset': offset,
+                'total': len(self._board.scores),
+            }
+
+    def position(self, github_id, neighbors=0):
+        """
+        获取用户的名次、百分位与前后的用户
+        :param github_id: GitHub用户ID
+        :param neighbors: 前后各返回的用户数
+        :return: 名次信息, 用户不在排行榜中时返回 None
+        """
+        key = github_id.lower()
+        with self._lock:
+            self._stats['queries'] += 1
+            board = self._board
+            offset = board.offset(key)
+            if offset is None:
+                return None
+            bucket = board.scores[key][0]
+            index = SCORE_BUCKETS - 1 - bucket
+            higher = board.tree.prefix(index)
+            tied = len(board.buckets[index])
+            rank = offset + 1
+            total = len(board.scores)
+            result = {
+                'github_id': key,
+                'score': bucket / 10,
+                'rank': rank,
+                # 同分用户共享的名次
+                'tie_rank': higher + 1,
+                'total': total,
+                # 评分低于该用户的用户占比
+                'percentile': round(100 * (total - higher - tied) / total, 2),
+            }
+            if neighbors > 0:
+                start = max(rank - 1 - neighbors, 0)
+                window = self._window(board, start, rank - 1 - start + 1 + neighbors)
+                result['above'] = window[:rank - 1 - start]
+                result['below'] = window[rank - start:]
+            return result
+
+    def get_stats(self):
+        """
+        获取排行榜统计
+        :return: 用户数、是否已加载、加载次数与耗时、更新与查询次数
+        """
+        with self._lock:
+            stats = dict(self._stats, size=len(self._board.scores), loaded=self._loaded,
+                         reloading=self._journal is not None)
+        stats['last_load_ms'] = round(stats['last_load_ms'], 2)
+        return stats
+
+
+# 进程级共享实例
+leaderboard = Leaderboard()
@@ -0,0 +1,169 @@
+import concurrent.futures
+from collections import Counter
+
+import langid
+import requests
+
+from info_service.config.github_config import (
+    GITHUB_USER_URL, GITHUB_EVENTS_URL, GITHUB_FOLLOWING_URL, GITHUB_FOLLOWERS_URL, GITHUB_README_URL,
+)
+from info_service.config.nation_config import Nation
+from info_service.utils.github_client import github_client
+from info_service.utils.logger_utils import logger
+
+
+def guess_from_readme(username, repos_data):
+    """
+    并行读取仓库 README 文件并根据语言推测国家
+    :param username: GitHub用户名
+    :param repos_data: 仓库列表
+    :return: 推测的国家, 无法推测时返回 None
+    """
+
+    def fetch_readme_language(repo):
+        for branch in ["main", "master"]:
+            readme_url = GITHUB_README_URL.format(username=username, repo=repo['name'], branch=branch)
+            try:
+                readme_response = github_client.get(readme_url)
+                readme_response.raise_for_status()
+                readme_content = readme_response.text
+
+                if not readme_content.strip():
+                    continue
+
+                lang, confidence = langid.classify(readme_content)
+                if confidence < 0.5:
+                    continue
+                nation_mapping = Nation.nation_mapping
+                if lang in nation_mapping:
+                    guess_nation = nation_mapping[lang]
+                    logger.info(f"用户{username}的README使用{lang}语言,推测来自{guess_nation}")
+                    return guess_nation
+            except (requests.exceptions.RequestException, UnicodeDecodeError) as e:
+                logger.debug(f"获取或解析README失败: {str(e)}")
+                continue
+        return None
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [executor.submit(fetch_readme_language, repo) for repo in repos_data]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result:
+                return result
+    return None
+
+
+def guess_from_events(username):
+    """
+    从公开活动记录的提交信息中查找位置信息
+    :param username: GitHub用户名
+    :return: 找到的位置信息, 未找到时返回 None
+    """
+
+    def fetch_event_location(event):
+        if event["type"] == "PushEvent":
+            for commit in event["payload"].get("commits", []):
+                try:
+                    commit_response = github_client.get(commit["url"])
+                    commit_response.raise_for_status()
+                    commit_data = commit_response.json()
+
+                    location_keywords = ["country", "city", "location"]
+                    commit_message = commit_data.get("commit", {}).get("message", "").lower()
+                    author_name = commit_data.get("commit", {}).get("author", {}).get("name", "").lower()
+                    author_email = commit_data.get("commit", {}).get("author", {}).get("email", "").lower()
+
+                    for text in [commit_message, author_name, author_email]:
+                        if any(keyword in text for keyword in location_keywords):
+                            logger.info(f"在用户{username}的提交信息中找到位置信息: {text}")
+                            return text
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.debug(f"获取或解析提交信息失败: {str(e)}")
+                    continue
+        return None
+
+    try:
+        events_response = github_client.get(GITHUB_EVENTS_URL.format(username=username))
+        events_response.raise_for_status()
+        events_data = events_response.json()
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            futures = [executor.submit(fetch_event_location, event) for event in events_data]
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                if result:
+                    return result
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"获取用户活动记录失败: {str(e)}")
+    return None
+
+
+def guess_from_network(username):
+    """
+    根据关注者与关注的用户的位置推测国家
+    :param username: GitHub用户名
+    :return: 出现最多的位置, 无法推测时返回 None
+    """
+    follower_locations = []
+    following_locations = []
+
+    try:
+        # 获取关注者
+        followers_response = github_client.get(GITHUB_FOLLOWERS_URL.format(username=username))
+        followers_response.raise_for_status()
+        followers = followers_response.json()
+
+        for follower in followers:
+            follower_info = github_client.get(GITHUB_USER_URL.format(username=follower['login'])).json()
+            location = follower_info.get("location")
+            if location:
+                follower_locations.append(location)
+
+        # 获取关注的用户
+        following_response = github_client.get(GITHUB_FOLLOWING_URL.format(username=username))
+        following_response.raise_for_status()
+        following = following_response.json()
+
+        for follow in following:
+            following_info = github_client.get(GITHUB_USER_URL.format(username=follow['login'])).json()
+            location = following_info.get("location")
+            if location:
+                following_locations.append(location)
+
+        # 统计位置频率
+        location_counts = Counter(follower_locations + following_locations)
+        if location_counts:
+            most_common_location, _ = location_counts.most_common(1)[0]
+            logger.info(f"通过关系网络推测用户{username}的国家: {most_common_location}")
+            return most_common_location
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"获取关系网络信息失败: {str(e)}")
+    return None
+
+
+def guess_user_nation(username, user_data, repos_data):
+    """
+    依次根据用户资料、README 语言、活动记录和关系网络推测用户国家
+    :param username: GitHub用户名
+    :param user_data: 用户基本信息
+    :param repos_data: 仓库列表
+    :return: 推测的国家, 无法推测时返回 "Unknown"
+    """
+    # 1. 检查用户资料中的位置信息
+    location = user_data.get("location")
+    if location:
+        logger.info(f"从用户资料中获取到位置信息: {location}")
+        return location
+
+    # 2. 并行请求读取 README 文件并分析语言
+    # 3. 从活动记录中获取位置信息
+    # 4. 根据关系网络推测国家信息
+    for guess in (lambda: guess_from_readme(username, repos_data),
+                  lambda: guess_from_events(username),
+                  lambda: guess_from_network(username)):
+        nation = guess()
+        if nation:
+            return nation
+
+    logger.info(f"未能找到用户{username}的位置信息")
+    return "Unknown"
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import wraps
+
+from info_service.config.cache_config import (
+    NEGATIVE_CACHE_ENABLED, NEGATIVE_CACHE_STATUSES, NEGATIVE_CACHE_TTL_HOURS, NEGATIVE_CACHE_MAX,
+    NEGATIVE_CACHE_SAVED_REQUESTS, NEGATIVE_CACHE_RELOAD_SECONDS
+)
+from info_service.services.info_service import get_negative_cache_entries, save_negative_cache
+from info_service.utils.logger_utils import logger
+
+# 负缓存命中时返回的错误信息
+NEGATIVE_CACHE_ERRORS = {
+    404: '用户不存在',
+    451: '用户因法律原因不可用',
+}
+
+
+class NegativeCache:
+    """
+    不存在或不可用的 GitHub 用户缓存
+    内存中保存未过期的记录, 同时写入数据库; 首次查询时从数据库加载全部记录,
+    之后每隔 reload_seconds 增量加载其他进程写入的记录
+    """
+
+    def __init__(self, ttl_hours=NEGATIVE_CACHE_TTL_HOURS, max_size=NEGATIVE_CACHE_MAX,
+                 reload_seconds=NEGATIVE_CACHE_RELOAD_SECONDS):
+        self._ttl = timedelta(hours=ttl_hours)
+        self._max_size = max_size
+        self._reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        # github_id -> (状态码, 过期时间)
+        self._entries = {}
+        self._next_load = 0
+        self._loading = False
+        # 下次增量加载只查询过期时间晚于该时间的记录, 即上次加载之后写入的记录
+        self._expires_after = None
+        self._hits = Counter()
+        self._saved_requests = 0
+        self._records = 0
+
+    def _load(self):
+        """从数据库加载上次加载之后写入的记录, 同一时刻只有一个线程加载"""
+        with self._lock:
+            if self._loading or time.monotonic() < self._next_load:
+                return
+            self._loading = True
+            expires_after = self._expires_after
+        started = datetime.now()
+        entries = None
+        try:
+            entries = get_negative_cache_entries(expires_after)
+        finally:
+            with self._lock:
+                self._loading = False
+                self._next_load = time.monotonic() + self._reload_seconds
+                if entries is not None:
+                    # 写入时间不早于本次加载开始时间 (留出一个加载间隔容忍时钟偏差) 的记录留给下次加载
+                    self._expires_after = started + self._ttl - timedelta(seconds=self._reload_seconds)
+                    for github_id, entry in entries.items():
+                        self._entries[github_id.lower()] = entry
+                    if len(self._entries) > self._max_size:
+                        self._evict()
+        if entries:
+            logger.info(f"从数据库加载了{len(entries)}条负缓存记录")
+
+    def get(self, username, resource):
+        """
+        查询用户是否已知不存在
+        :param username: GitHub用户名
+        :param resource: 调用方的资源名称, 用于统计
+        :return: 状态码, 未命中时返回 None
+        """
+        if time.monotonic() >= self._next_load:
+            self._load()
+
+        key = username.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            status_code, expires_at = entry
+            if expires_at <= datetime.now():
+                del self._entries[key]
+                return None
+            self._hits[resource] += 1
+            self._saved_requests += NEGATIVE_CACHE_SAVED_REQUESTS.get(resource, 0)
+            return status_code
+
+    def record(self, username, status_code):
+        """
+        记录不存在或不可用的用户
+        :param username: GitHub用户名
+        :param status_code: GitHub返回的状态码, 仅记录 NEGATIVE_CACHE_STATUSES 中的状态码
+        """
+        if not NEGATIVE_CACHE_ENABLED or status_code not in NEGATIVE_CACHE_STATUSES:
+            return
+
+        key = username.lower()
+        expires_at = datetime.now() + self._ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (status_code, expires_at)
+            self._records += 1
+            if len(self._entries) > self._max_size:
+                self._evict()
+        logger.info(f"记录用户{username}的负缓存: 状态码 {status_code}")
+        save_negative_cache(key, status_code, expires_at)
+
+    def _evict(self):
+        """清理过期记录, 仍超出上限时淘汰最早写入的记录"""
+        now = datetime.now()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self._max_size:
+            del self._entries[next(iter(self._entries))]
+
+    def get_stats(self):
+        """
+        获取负缓存统计
+        :return: 条目数、各资源的命中次数与节省的 GitHub API 请求数
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'records': self._records,
+                'hits': sum(self._hits.values()),
+                'hits_by_resource': dict(self._hits),
+                'saved_requests': self._saved_requests,
+            }
+
+
+# 进程级共享实例
+negative_cache = NegativeCache()
+
+
+def skip_missing(resource):
+    """
+    装饰器: 用户已知不存在或不可用时直接返回错误, 不再请求 GitHub, 被装饰函数的第一个参数为用户名
+    :param resource: 资源名称
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(username, *args, **kwargs):
+            if not NEGATIVE_CACHE_ENABLED or not username:
+                return fn(username, *args, **kwargs)
+            status_code = negative_cache.get(str(username), resource)
+            if status_code is None:
+                return fn(username, *args, **kwargs)
+            logger.info(f"用户{username}命中负缓存, 跳过{resource}请求")
+            error = NEGATIVE_CACHE_ERRORS.get(status_code, '用户不存在')
+            return {'error': error}, status_code, {'X-Cache-Status': 'NEGATIVE'}
+
+        return wrapper
+
+    return decorator
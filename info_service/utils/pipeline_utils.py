@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from info_service.utils.logger_utils import logger
+
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name, fn, deps=()):
+        """
+        :param name: 阶段名称
+        :param fn: 阶段函数, 以依赖阶段的结果字典为参数
+        :param deps: 依赖的阶段名称
+        """
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+def run_pipeline(stages, max_workers=8):
+    """
+    按依赖关系并行执行各阶段, 依赖全部完成的阶段立即开始执行
+    某个阶段失败时, 依赖它的阶段会被跳过
+    :param stages: Stage 列表
+    :param max_workers: 最大并行数
+    :return: (结果字典, 错误字典(阶段名称到异常), 耗时字典, 关键路径)
+    """
+    stages = {stage.name: stage for stage in stages}
+    results, errors, timings = {}, {}, {}
+    pending = dict(stages)
+    running = {}
+    begin = time.perf_counter()
+
+    def execute(stage, inputs):
+        start = time.perf_counter()
+        try:
+            return stage.fn(inputs)
+        finally:
+            timings[stage.name] = {
+                'start_ms': round((start - begin) * 1000, 1),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                # 跳过的阶段可能导致后续阶段也被跳过, 直到没有变化为止
+                scheduled = False
+                for name, stage in list(pending.items()):
+                    if any(dep in errors for dep in stage.deps):
+                        errors[name] = RuntimeError('依赖阶段失败')
+                        del pending[name]
+                        scheduled = True
+                    elif all(dep in results for dep in stage.deps):
+                        inputs = {dep: results[dep] for dep in stage.deps}
+                        running[executor.submit(execute, stage, inputs)] = name
+                        del pending[name]
+
+            if not running:
+                # 剩余阶段的依赖无法满足
+                for name in pending:
+                    errors[name] = RuntimeError('依赖阶段不存在')
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"流水线阶段{name}执行失败: {e}", exc_info=True)
+                    errors[name] = e
+
+    return results, errors, timings, critical_path(stages, timings)
+
+
+def critical_path(stages, timings):
+    """
+    计算关键路径: 从最晚结束的阶段出发, 逐步回溯最晚结束的依赖阶段
+    :param stages: 阶段名称到 Stage 的映射
+    :param timings: 各阶段耗时
+    :return: 阶段名称列表, 按执行顺序排列
+    """
+
+    def finish(name):
+        timing = timings[name]
+        return timing['start_ms'] + timing['duration_ms']
+
+    finished = [name for name in stages if name in timings]
+    if not finished:
+        return []
+
+    path = [max(finished, key=finish)]
+    while True:
+        deps = [dep for dep in stages[path[-1]].deps if dep in timings]
+        if not deps:
+            break
+        path.append(max(deps, key=finish))
+    return list(reversed(path))
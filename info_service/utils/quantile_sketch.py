@@ -0,0 +1,316 @@
+import atexit
+import bisect
+import math
+import random
+import threading
+
+from info_service.config.evaluate_config import (
+    QUANTILE_SKETCH_K, QUANTILE_METRICS, QUANTILE_MIN_SAMPLES, QUANTILE_FLUSH_SECONDS
+)
+from info_service.utils.logger_utils import logger
+
+
+class KLLSketch:
+    """
+    KLL 流式分位数草图
+    第 h 层的每个元素代表 2^h 个原始数据, 某层写满后排序并随机保留奇数位或偶数位元素升入上一层;
+    元素总数约为 k / (1 - c), 与数据量无关, 分位数的误差约为 O(1/k)
+    相同 k 的草图可以合并, 合并结果与把两份数据喂给同一个草图等价
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, c=2 / 3):
+        self.k = k
+        self.c = c
+        self.compactors = [[]]
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._random = random.Random()
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(int(math.ceil(self.k * self.c ** depth)), 2)
+
+    def size(self):
+        return sum(len(items) for items in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value):
+        """
+        加入一个数据
+        :param value: 数值
+        """
+        value = float(value)
+        self.compactors[0].append(value)
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        """从低层开始压缩写满的层, 直到元素总数回到上限以内"""
+        for level in range(len(self.compactors)):
+            items = self.compactors[level]
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 >= len(self.compactors):
+                self.compactors.append([])
+            items.sort()
+            # 元素个数为奇数时最大的元素留在本层
+            leftover = [items.pop()] if len(items) % 2 else []
+            offset = self._random.randint(0, 1)
+            self.compactors[level + 1].extend(items[offset::2])
+            self.compactors[level] = leftover
+            if self.size() < self._max_size():
+                break
+
+    def merge(self, other):
+        """
+        合并另一个草图
+        :param other: KLLSketch
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        while self.size() >= self._max_size():
+            self._compress()
+
+    def weight_below(self, value):
+        """
+        估算小于 value 的数据个数, 等于 value 的数据计一半
+        :param value: 数值
+        :return: 估算的数据个数
+        """
+        weight = 0.0
+        for level, items in enumerate(self.compactors):
+            ordered = sorted(items)
+            below = bisect.bisect_left(ordered, value)
+            equal = bisect.bisect_right(ordered, value) - below
+            weight += (below + equal / 2) * (1 << level)
+        return weight
+
+    def total_weight(self):
+        return sum(len(items) * (1 << level) for level, items in enumerate(self.compactors))
+
+    def rank(self, value):
+        """
+        value 在数据中的百分位
+        :param value: 数值
+        :return: 0 到 1 之间的比例, 没有数据时返回 None
+        """
+        total = self.total_weight()
+        return self.weight_below(value) / total if total else None
+
+    def quantile(self, q):
+        """
+        估算分位数
+        :param q: 0 到 1 之间的比例
+        :return: 分位数, 没有数据时返回 None
+        """
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('k', QUANTILE_SKETCH_K))
+        sketch.compactors = [list(items) for items in data.get('compactors') or [[]]]
+        sketch.count = data.get('count', 0)
+        sketch.min = data.get('min')
+        sketch.max = data.get('max')
+        return sketch
+
+
+class MetricSketches:
+    """
+    各评分指标的分位数草图
+    每次评估的指标先写入本进程的增量草图, 定期在数据库事务中与已保存的草图合并, 多个进程的数据由此汇总;
+    百分位按已保存的草图与本进程增量共同计算, 中位数只取已保存的草图, 样本不足时返回空, 由调用方使用默认值
+    """
+
+    def __init__(self, metrics=QUANTILE_METRICS, flush_seconds=QUANTILE_FLUSH_SECONDS,
+                 min_samples=QUANTILE_MIN_SAMPLES):
+        self._metrics = metrics
+        self._flush_seconds = flush_seconds
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+        # 与数据库同步后的合并草图
+        self._merged = {metric: KLLSketch() for metric in metrics}
+        # 上次同步后本进程新增的数据
+        self._delta = {metric: KLLSketch() for metric in metrics}
+        self._medians = {}
+        self._load = None
+        self._update = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'records': 0, 'flushes': 0, 'flush_failures': 0}
+
+    def start(self, load, update):
+        """
+        从数据库加载草图并启动定期同步线程
+        :param load: 读取已保存草图的函数, 返回 {指标: 草图字典}
+        :param update: 在事务中合并草图的函数, 参数为合并函数 merge({指标: 已保存草图字典}) -> {指标: 合并后的草图字典}
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._load = load
+        self._update = update
+        try:
+            self._replace(load())
+        except Exception as e:
+            logger.error(f"加载分位数草图失败: {e}", exc_info=True)
+        self._thread = threading.Thread(target=self._loop, name='metric-sketches', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _loop(self):
+        while not self._stop.wait(self._flush_seconds):
+            self.flush()
+
+    def _replace(self, stored):
+        merged = {metric: KLLSketch.from_dict(stored[metric]) if metric in stored else KLLSketch()
+                  for metric in self._metrics}
+        medians = {metric: sketch.quantile(0.5) for metric, sketch in merged.items()
+                   if sketch.count >= self._min_samples}
+        with self._lock:
+            self._merged = merged
+            self._medians = medians
+
+    def record(self, values):
+        """
+        记录一次评估的指标
+        :param values: 指标名到数值的映射, 不在 QUANTILE_METRICS 中的指标被忽略
+        """
+        with self._lock:
+            for metric in self._metrics:
+                value = values.get(metric)
+                if isinstance(value, (int, float)):
+                    self._delta[metric].update(value)
+            self._stats['records'] += 1
+
+    def percentiles(self, values):
+        """
+        计算各指标在所有已评估用户中的百分位
+        :param values: 指标名到数值的映射
+        :return: 指标名到 0-100 百分位的映射, 没有数据的指标为 None
+        """
+        result = {}
+        with self._lock:
+            for metric in self._metrics:
+                value = values.get(metric)
+                if not isinstance(value, (int, float)):
+                    continue
+                merged, delta = self._merged[metric], self._delta[metric]
+                total = merged.total_weight() + delta.total_weight()
+                if not total:
+                    result[metric] = None
+                    continue
+                below = merged.weight_below(value) + delta.weight_below(value)
+                result[metric] = round(100 * below / total, 1)
+        return result
+
+    def medians(self):
+        """
+        获取样本数达到 QUANTILE_MIN_SAMPLES 的指标的中位数
+        :return: 指标名到中位数的映射
+        """
+        with self._lock:
+            return dict(self._medians)
+
+    def flush(self):
+        """将本进程的增量与数据库中的草图合并, 失败时增量保留到下次同步"""
+        if self._update is None:
+            return
+        with self._lock:
+            delta = self._delta
+            self._delta = {metric: KLLSketch() for metric in self._metrics}
+        if not any(sketch.count for sketch in delta.values()):
+            return
+
+        def merge(stored):
+            merged = {}
+            for metric, sketch in delta.items():
+                combined = KLLSketch.from_dict(stored[metric]) if metric in stored else KLLSketch()
+                combined.merge(sketch)
+                merged[metric] = combined.to_dict()
+            return dict(stored, **merged)
+
+        try:
+            self._replace(self._update(merge))
+            with self._lock:
+                self._stats['flushes'] += 1
+        except Exception as e:
+            logger.error(f"保存分位数草图失败: {e}", exc_info=True)
+            with self._lock:
+                self._stats['flush_failures'] += 1
+                for metric, sketch in delta.items():
+                    sketch.merge(self._delta[metric])
+                self._delta = delta
+
+    def rebuild(self, metric, values, update=None):
+        """
+        用全部样本重新生成一个指标的草图并覆盖已保存的草图, 用于离线重新评分后评分分布整体变化的情况
+        本进程该指标尚未同步的增量一并丢弃, 其他进程的增量仍会在其下次同步时合并进来
+        :param metric: 指标名
+        :param values: 该指标的全部样本
+        :param update: 在事务中合并草图的函数, 默认使用 start 时传入的函数
+        :return: 是否保存成功
+        """
+        update = update or self._update
+        if update is None:
+            return False
+        sketch = KLLSketch()
+        for value in values:
+            sketch.update(float(value))
+        with self._lock:
+            self._delta[metric] = KLLSketch()
+
+        try:
+            self._replace(update(lambda stored: dict(stored, **{metric: sketch.to_dict()})))
+            with self._lock:
+                self._stats['flushes'] += 1
+            return True
+        except Exception as e:
+            logger.error(f"重新生成分位数草图失败: {e}", exc_info=True)
+            with self._lock:
+                self._stats['flush_failures'] += 1
+            return False
+
+    def get_stats(self):
+        """
+        获取草图统计
+        :return: 各指标的样本数、草图元素数、中位数, 以及记录与同步次数
+        """
+        with self._lock:
+            metrics = {
+                metric: {
+                    'count': self._merged[metric].count + self._delta[metric].count,
+                    'pending': self._delta[metric].count,
+                    'items': self._merged[metric].size() + self._delta[metric].size(),
+                    'median': self._medians.get(metric),
+                }
+                for metric in self._metrics
+            }
+            return dict(self._stats, metrics=metrics)
+
+
+# 进程级共享实例
+metric_sketches = MetricSketches()
@@ -0,0 +1,275 @@
+import bisect
+import re
+import threading
+import time
+from collections import deque, OrderedDict
+from datetime import datetime
+
+from info_service.config.db_config import Config
+from info_service.utils.logger_utils import logger
+
+# 语句耗时直方图的桶上限 (毫秒), 超过最后一个桶的计入 inf
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# 保留的慢查询记录数
+SLOW_LOG_SIZE = 200
+
+# 最多统计的语句指纹数, 超过时淘汰最久未执行的指纹
+MAX_FINGERPRINTS = 1000
+
+# 同一指纹两次 EXPLAIN 的最短间隔 (秒)
+EXPLAIN_INTERVAL_SECONDS = 600
+
+# 支持 EXPLAIN 的语句
+EXPLAINABLE = ('select', 'update', 'delete')
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+# 一行 VALUES, 行内允许一层括号, 如 NOW()、CAST(? AS JSON)
+_VALUES_ROW = r"\((?:[^()]|\([^()]*\))*\)"
+_VALUES_LIST = re.compile(rf"(values\s*({_VALUES_ROW}))(?:\s*,\s*\2)+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    生成语句指纹: 去掉字面量与多余空白, 合并占位符列表, 使参数不同的同一语句归为一类
+    :param sql: SQL 语句
+    :return: 指纹
+    """
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _PLACEHOLDER_LIST.sub('(?)', text)
+    # 多行 VALUES 只保留第一行, 行数不同仍是同一语句, 行中含 NOW() 等函数调用的也合并
+    return _VALUES_LIST.sub(r"\1", text)
+
+
+def redact(params):
+    """
+    隐藏参数值, 只保留类型与长度
+    :param params: 语句参数
+    :return: 可安全写入日志的参数描述
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: redact(value) for name, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact(value) for value in params]
+    if isinstance(params, (str, bytes, bytearray)):
+        return f"<{type(params).__name__}:{len(params)}>"
+    return f"<{type(params).__name__}>"
+
+
+class QueryStats:
+    """
+    数据库语句统计
+    按指纹记录耗时直方图、调用次数与行数; 超过慢查询阈值的语句记入慢查询日志, 参数只保留类型与长度;
+    超过 EXPLAIN 阈值的语句自动执行 EXPLAIN, 同一指纹在间隔内只执行一次
+    """
+
+    def __init__(self, slow_ms=200, explain_ms=500):
+        self.slow_ms = slow_ms
+        self.explain_ms = explain_ms
+        self._lock = threading.Lock()
+        # 指纹 -> 统计, 按最近执行排序
+        self._queries = OrderedDict()
+        self._evicted = 0
+        self._slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        # 指纹 -> (EXPLAIN 时间, EXPLAIN 结果)
+        self._explains = {}
+
+    def record(self, sql, params, elapsed_ms, rows, error=None):
+        """
+        记录一条语句
+        :param sql: SQL 语句
+        :param params: 语句参数
+        :param elapsed_ms: 执行与读取结果的耗时 (毫秒)
+        :param rows: 返回或影响的行数
+        :param error: 执行出错时的异常
+        :return: 语句指纹
+        """
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                stats = self._queries[key] = {
+                    'calls': 0, 'errors': 0, 'rows': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                }
+                while len(self._queries) > MAX_FINGERPRINTS:
+                    evicted, _ = self._queries.popitem(last=False)
+                    self._explains.pop(evicted, None)
+                    self._evicted += 1
+            else:
+                self._queries.move_to_end(key)
+            stats['calls'] += 1
+            stats['rows'] += max(rows, 0)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if error is not None:
+                stats['errors'] += 1
+            if elapsed_ms >= self.slow_ms:
+                self._slow_log.append({
+                    'fingerprint': key,
+                    'params': redact(params),
+                    'elapsed_ms': round(elapsed_ms, 2),
+                    'rows': rows,
+                    'error': type(error).__name__ if error is not None else None,
+                    'at': datetime.now().isoformat(timespec='seconds'),
+                })
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(f"慢查询 {elapsed_ms:.1f}ms, {rows}行: {key} 参数: {redact(params)}")
+        return key
+
+    def should_explain(self, key, sql, elapsed_ms):
+        """
+        判断是否需要对语句执行 EXPLAIN
+        :param key: 语句指纹
+        :param sql: SQL 语句
+        :param elapsed_ms: 耗时 (毫秒)
+        :return: 是否执行
+        """
+        if elapsed_ms < self.explain_ms or not sql.lstrip().lower().startswith(EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            explained = self._explains.get(key)
+            if explained and now - explained[0] < EXPLAIN_INTERVAL_SECONDS:
+                return False
+            # 先占位, 避免并发的同一慢查询重复 EXPLAIN
+            self._explains[key] = (now, explained[1] if explained else None)
+        return True
+
+    def record_explain(self, key, plan):
+        """
+        保存 EXPLAIN 结果
+        :param key: 语句指纹
+        :param plan: EXPLAIN 返回的行
+        """
+        with self._lock:
+            self._explains[key] = (time.monotonic(), plan)
+        full_scans = [row.get('table') for row in plan if str(row.get('type', '')).upper() == 'ALL']
+        if full_scans:
+            logger.warning(f"慢查询存在全表扫描 {full_scans}: {key}")
+
+    def get_stats(self):
+        """
+        获取语句统计
+        :return: 各指纹的调用次数、错误次数、行数、平均/最大耗时与耗时直方图, 被淘汰的指纹数, 慢查询日志与 EXPLAIN 结果
+        """
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ['inf']
+        with self._lock:
+            queries = {
+                key: {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'rows': stats['rows'],
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                    'histogram': dict(zip(labels, stats['histogram'])),
+                }
+                for key, stats in self._queries.items()
+            }
+            evicted = self._evicted
+            slow_log = list(self._slow_log)
+            explains = {key: plan for key, (_, plan) in self._explains.items() if plan is not None}
+        return {
+            'slow_ms': self.slow_ms,
+            'explain_ms': self.explain_ms,
+            'queries': queries,
+            'evicted_fingerprints': evicted,
+            'slow_log': slow_log,
+            'explains': explains,
+        }
+
+
+class InstrumentedCursor:
+    """
+    记录耗时的游标包装
+    一条语句的耗时为 execute 与读取其结果的耗时之和, 在下一条语句开始或 finish 时记录;
+    行数取读取完结果后的 rowcount
+    """
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        # [SQL, 参数, 累计耗时 (毫秒)]
+        self._current = None
+
+    def _complete(self, explain, error=None):
+        if self._current is None:
+            return
+        sql, params, elapsed_ms = self._current
+        self._current = None
+        rows = self._cursor.rowcount if error is None else 0
+        key = self._stats.record(sql, params, elapsed_ms, rows if rows is not None else 0, error)
+        if explain and error is None and self._stats.should_explain(key, sql, elapsed_ms):
+            self._explain(key, sql, params)
+
+    def _explain(self, key, sql, params):
+        try:
+            self._cursor.execute(f"EXPLAIN {sql}", params)
+            rows = self._cursor.fetchall()
+            names = self._cursor.column_names
+            plan = [row if isinstance(row, dict) else dict(zip(names, row)) for row in rows]
+            self._stats.record_explain(key, plan)
+        except Exception as e:
+            logger.warning(f"获取慢查询执行计划失败: {e}")
+
+    def _run(self, method, operation, params):
+        self._complete(explain=True)
+        self._current = [operation, params, 0.0]
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(operation, params)
+        except Exception as e:
+            self._current[2] += (time.perf_counter() - start) * 1000
+            self._complete(explain=False, error=e)
+            raise
+        finally:
+            if self._current is not None:
+                self._current[2] += (time.perf_counter() - start) * 1000
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(*args)
+        finally:
+            if self._current is not None:
+                self._current[2] += (time.perf_counter() - start) * 1000
+
+    def execute(self, operation, params=None):
+        return self._run('execute', operation, params)
+
+    def executemany(self, operation, seq_params):
+        return self._run('executemany', operation, seq_params)
+
+    def fetchone(self):
+        return self._fetch('fetchone')
+
+    def fetchmany(self, size=1):
+        return self._fetch('fetchmany', size)
+
+    def fetchall(self):
+        return self._fetch('fetchall')
+
+    def finish(self, explain=True):
+        """
+        记录最后一条语句, 在提交前调用
+        :param explain: 是否允许执行 EXPLAIN, 出错回滚时传 False
+        """
+        self._complete(explain)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# 进程级共享实例
+query_stats = QueryStats(Config.DB_SLOW_QUERY_MS, Config.DB_EXPLAIN_QUERY_MS)
@@ -0,0 +1,91 @@
+import json
+import time
+from datetime import datetime
+
+from info_service.services.info_service import (
+    PROFILE_COLUMNS, fetched_at_column, get_cursor, _decode_column, _is_repo_count, _select_user_repositories
+)
+from info_service.utils.logger_utils import logger
+
+# 对比的列组合, 与各接口实际读取的列一致
+BENCHMARK_COLUMN_SETS = (
+    ('user_info',),
+    ('repos_info',),
+    ('tech_stack', 'repos_info'),
+    ('evaluate',),
+    PROFILE_COLUMNS,
+)
+
+
+def _row_size(row):
+    """行中 JSON 与文本列的字节数"""
+    return sum(len(value) if isinstance(value, (bytes, bytearray)) else len(str(value).encode('utf-8'))
+               for value in row.values() if value is not None and not isinstance(value, (datetime, int)))
+
+
+def _timed_read(query, github_id):
+    """
+    读取一行并按接口返回前的方式序列化再解析
+    与 get_github_columns 一致, repos_info 为仓库数时从关联表与仓库表还原仓库列表, 还原的耗时与字节数计入结果
+    :return: (字节数, 耗时毫秒), 未找到时返回 None
+    """
+    start = time.perf_counter()
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute(query, (github_id,))
+        row = cursor.fetchone()
+        if row and 'repos_info' in row and _is_repo_count(_decode_column(row['repos_info'])):
+            row['repos_info'] = json.dumps(_select_user_repositories(cursor, github_id), ensure_ascii=False)
+    if not row:
+        return None
+    json.loads(json.dumps(row, ensure_ascii=False, default=str))
+    return _row_size(row), (time.perf_counter() - start) * 1000
+
+
+def benchmark_column_reads(sample_size=200, column_sets=BENCHMARK_COLUMN_SETS):
+    """
+    离线对比按列读取与旧的 SELECT * 读取同一批用户的字节数与耗时, 两种读取都包含仓库列表的还原
+    直接查询数据库, 不经过进程内缓存与共享缓存, 不在请求路径上执行
+    :param sample_size: 抽取的用户数, 取最近写入的用户
+    :param column_sets: 对比的列组合
+    :return: 各列组合的平均字节数、平均耗时与节省量
+    """
+    with get_cursor() as cursor:
+        cursor.execute("SELECT github_id FROM github ORDER BY id DESC LIMIT %s", (sample_size,))
+        github_ids = [row[0] for row in cursor.fetchall()]
+
+    full_query = "SELECT * FROM github WHERE github_id = %s"
+    report = {}
+    for columns in column_sets:
+        projected_query = f"""
+            SELECT {', '.join(columns)}, {', '.join(fetched_at_column(name) for name in columns)}, updated_at
+            FROM github
+            WHERE github_id = %s
+        """
+        samples = []
+        for github_id in github_ids:
+            projected = _timed_read(projected_query, github_id)
+            full = _timed_read(full_query, github_id)
+            if projected and full:
+                samples.append((projected, full))
+        if not samples:
+            continue
+        count = len(samples)
+        projected_bytes = sum(projected[0] for projected, _ in samples) // count
+        full_bytes = sum(full[0] for _, full in samples) // count
+        projected_ms = sum(projected[1] for projected, _ in samples) / count
+        full_ms = sum(full[1] for _, full in samples) / count
+        report[','.join(columns)] = {
+            'samples': count,
+            'avg_projected_bytes': projected_bytes,
+            'avg_full_bytes': full_bytes,
+            'avg_bytes_saved': full_bytes - projected_bytes,
+            'avg_projected_ms': round(projected_ms, 2),
+            'avg_full_ms': round(full_ms, 2),
+            'avg_ms_saved': round(full_ms - projected_ms, 2),
+        }
+    logger.info(f"按列读取对比完成: {len(github_ids)}个用户")
+    return report
+
+
+if __name__ == '__main__':
+    print(json.dumps(benchmark_column_reads(), ensure_ascii=False, indent=2))
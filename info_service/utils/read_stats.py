@@ -0,0 +1,46 @@
+import threading
+from collections import defaultdict
+
+
+class ColumnReadStats:
+    """
+    按列读取 Github 表的统计
+    记录每组列的读取次数、字节数与耗时, 与 SELECT * 的对比由离线脚本 read_benchmark_utils 完成
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reads = defaultdict(lambda: {'calls': 0, 'bytes': 0, 'total_ms': 0.0})
+
+    def record(self, columns, size, elapsed_ms):
+        """
+        记录一次按列读取
+        :param columns: 读取的列
+        :param size: 读取的字节数
+        :param elapsed_ms: 查询与解析耗时 (毫秒)
+        """
+        with self._lock:
+            stats = self._reads[','.join(columns)]
+            stats['calls'] += 1
+            stats['bytes'] += size
+            stats['total_ms'] += elapsed_ms
+
+    def get_stats(self):
+        """
+        获取读取统计
+        :return: 各组列的平均字节数与耗时
+        """
+        with self._lock:
+            by_columns = {
+                columns: {
+                    'calls': stats['calls'],
+                    'avg_bytes': stats['bytes'] // stats['calls'],
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 2),
+                }
+                for columns, stats in self._reads.items()
+            }
+        return {'by_columns': by_columns}
+
+
+# 进程级共享实例
+column_read_stats = ColumnReadStats()
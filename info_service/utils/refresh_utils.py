@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from info_service.config.cache_config import REFRESH_WORKERS
+from info_service.utils.logger_utils import logger
+
+
+class BackgroundRefresher:
+    """
+    后台刷新任务队列
+    相同 key 的刷新任务在执行完成前只会提交一次
+    """
+
+    def __init__(self, max_workers=REFRESH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        提交刷新任务
+        :param key: 去重键, 形如 (username, resource)
+        :param fn: 刷新函数
+        :return: 是否提交了新任务
+        """
+        with self._lock:
+            if key in self._pending:
+                self._stats['deduplicated'] += 1
+                return False
+            self._pending.add(key)
+            self._stats['submitted'] += 1
+
+        self._executor.submit(self._run, key, fn, *args, **kwargs)
+        return True
+
+    def _run(self, key, fn, *args, **kwargs):
+        """执行刷新任务并记录结果, 抛出异常或返回错误状态码 (>= 400) 都计为失败"""
+        try:
+            result = fn(*args, **kwargs)
+            # 控制器以 (数据, 状态码) 返回 GitHub 与数据库错误, 不抛出异常
+            status = result[1] if isinstance(result, tuple) and len(result) == 2 else None
+            if isinstance(status, int) and status >= 400:
+                logger.warning(f"后台刷新{key}失败: 状态码{status}")
+                outcome = 'failed'
+            else:
+                outcome = 'completed'
+        except Exception as e:
+            logger.error(f"后台刷新{key}失败: {e}", exc_info=True)
+            outcome = 'failed'
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get_stats(self):
+        """
+        获取刷新统计
+        :return: 统计字典
+        """
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+
+# 进程级共享实例
+background_refresher = BackgroundRefresher()
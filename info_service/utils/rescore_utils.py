@@ -0,0 +1,87 @@
+import threading
+import time
+
+from info_service.config.evaluate_config import RESCORE_LOAD_BATCH
+from info_service.services.info_service import (
+    get_score_components_after, count_evaluations_without_components, save_rescored_scores, update_metric_sketches
+)
+from info_service.utils.evaluate_utils import SCORE_COMPONENTS, calculate_scores
+from info_service.utils.logger_utils import logger
+from info_service.utils.quantile_sketch import metric_sketches
+
+# 同一时刻只允许一个重新评分任务
+_rescore_lock = threading.Lock()
+
+
+def rescore_all(dry_run=False, batch_size=RESCORE_LOAD_BATCH):
+    """
+    用保存的原始指标与当前的权重、中位数重新计算所有用户的评分, 不请求 GitHub
+    数据分批读入 NumPy 数组后一次向量化计算, 只写回评分或评分百分位有变化的用户
+    评分百分位按重新评分后所有用户的评分重新计算, 各原始指标未变, 其百分位保持不变;
+    评分的分位数草图同样按新的评分重新生成, 之后的评估按新的分布计算评分百分位
+    :param dry_run: 只计算不写入
+    :param batch_size: 每批读取的行数
+    :return: 重新评分报告, 已有任务在执行时返回 None
+    """
+    # numpy 为可选依赖, 只在离线重新评分时需要
+    import numpy as np
+
+    if not _rescore_lock.acquire(blocking=False):
+        return None
+    try:
+        start = time.perf_counter()
+        batches = []
+        last_id = 0
+        while True:
+            rows = get_score_components_after(last_id, batch_size, SCORE_COMPONENTS)
+            if not rows:
+                break
+            batches.append(rows)
+            last_id = rows[-1][0]
+        rows = [row for batch in batches for row in batch]
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        github_ids = [row[1] for row in rows]
+        values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), 3 + len(SCORE_COMPONENTS))
+        old_scores, previous_scores, old_percentiles = values[:, 0], values[:, 1], values[:, 2]
+        components = {name: values[:, 3 + index] for index, name in enumerate(SCORE_COMPONENTS)}
+        new_scores = calculate_scores(components, previous_scores, metric_sketches.medians())
+        # 与评估时的定义一致: 评分低于该用户的用户占比
+        below = np.searchsorted(np.sort(new_scores), new_scores, side='left')
+        new_percentiles = np.round(100 * below / max(len(rows), 1), 1)
+        changed = np.flatnonzero(np.isnan(old_scores) | (np.abs(new_scores - old_scores) > 1e-6)
+                                 | np.isnan(old_percentiles) | (np.abs(new_percentiles - old_percentiles) > 1e-6))
+        score_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        updated = 0
+        sketch_rebuilt = False
+        if not dry_run and len(changed):
+            updated = save_rescored_scores(
+                [(int(ids[i]), github_ids[i], float(new_scores[i]), float(new_percentiles[i])) for i in changed]
+            )
+        if not dry_run and len(rows):
+            sketch_rebuilt = metric_sketches.rebuild('score', new_scores, update=update_metric_sketches)
+        write_ms = (time.perf_counter() - start) * 1000
+
+        report = {
+            'users': len(rows),
+            'changed': int(len(changed)),
+            'updated': updated,
+            'sketch_rebuilt': sketch_rebuilt,
+            'dry_run': dry_run,
+            'without_components': count_evaluations_without_components(),
+            'load_ms': round(load_ms, 2),
+            'score_ms': round(score_ms, 2),
+            'write_ms': round(write_ms, 2),
+        }
+        logger.info(f"离线重新评分完成: {report}")
+        return report
+    finally:
+        _rescore_lock.release()
+
+
+if __name__ == '__main__':
+    print(rescore_all())
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+
+from info_service.config.cache_config import ROW_CACHE_TTL_SECONDS, ROW_CACHE_MAX_ENTRIES, ROW_CACHE_MAX_BYTES
+
+# 每个缓存条目除列数据外的估算开销 (字节)
+ENTRY_OVERHEAD = 512
+
+# 解析后的 Python 对象占用的内存约为 JSON 文本的倍数
+DECODED_SIZE_FACTOR = 4
+
+# 保留的失效记录数, 超出后以最早记录的版本号作为下限
+INVALIDATION_HISTORY = 10000
+
+
+class _Entry:
+    """一个用户已缓存的列"""
+
+    __slots__ = ('values', 'fetched_at', 'sizes', 'updated_at', 'expires_at')
+
+    def __init__(self, expires_at):
+        self.values = {}
+        self.fetched_at = {}
+        self.sizes = {}
+        self.updated_at = None
+        self.expires_at = expires_at
+
+    @property
+    def size(self):
+        return ENTRY_OVERHEAD + sum(self.sizes.values())
+
+
+class RowCache:
+    """
+    Github 表解析后数据的进程内 LRU 缓存
+    按条目数与估算内存双重限制, 条目超过 TTL 后失效; 写入数据库后由 save_* 函数调用 invalidate 使其失效
+    读库期间发生的失效会通过版本号检测, 避免把旧数据重新放回缓存
+    """
+
+    def __init__(self, ttl_seconds=ROW_CACHE_TTL_SECONDS, max_entries=ROW_CACHE_MAX_ENTRIES,
+                 max_bytes=ROW_CACHE_MAX_BYTES):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        # github_id -> 最近一次失效时的版本号
+        self._invalidated = OrderedDict()
+        self._version_floor = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+                       'stale_puts': 0}
+
+    def version(self):
+        """
+        获取当前版本号, 读库前调用, 写回缓存时传给 put
+        :return: 版本号
+        """
+        with self._lock:
+            return self._version
+
+    def get(self, github_id, columns):
+        """
+        读取缓存的列
+        :param github_id: GitHub用户ID
+        :param columns: 需要的列
+        :return: 同 get_github_columns 的结果, 缺少任一列或已过期时返回 None
+        """
+        key = github_id.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if not entry or any(name not in entry.values for name in columns):
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            result = {name: entry.values[name] for name in columns}
+            result['updated_at'] = entry.updated_at
+            result['fetched_at'] = {name: entry.fetched_at[name] for name in columns}
+            return result
+
+    def put(self, github_id, result, sizes, version):
+        """
+        写入从数据库读取的列, 与已缓存的列合并
+        :param github_id: GitHub用户ID
+        :param result: get_github_columns 的结果
+        :param sizes: 列名到 JSON 文本字节数的映射
+        :param version: 读库前获取的版本号
+        """
+        key = github_id.lower()
+        with self._lock:
+            if version < self._version_floor or self._invalidated.get(key, -1) > version:
+                # 读库期间数据已被修改
+                self._stats['stale_puts'] += 1
+                return
+
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(time.monotonic() + self._ttl)
+                self._entries[key] = entry
+            else:
+                self._bytes -= entry.size
+                self._entries.move_to_end(key)
+
+            for name, size in sizes.items():
+                entry.values[name] = result[name]
+                entry.fetched_at[name] = result['fetched_at'][name]
+                entry.sizes[name] = size * DECODED_SIZE_FACTOR
+            entry.updated_at = result['updated_at']
+            self._bytes += entry.size
+            self._evict()
+
+    def invalidate(self, github_id):
+        """
+        使用户的缓存失效
+        :param github_id: GitHub用户ID
+        """
+        key = github_id.lower()
+        with self._lock:
+            self._version += 1
+            self._invalidated.pop(key, None)
+            self._invalidated[key] = self._version
+            if len(self._invalidated) > INVALIDATION_HISTORY:
+                _, self._version_floor = self._invalidated.popitem(last=False)
+            if key in self._entries:
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def invalidate_all(self):
+        """使所有缓存失效, 读库期间开始的写回全部作废"""
+        with self._lock:
+            self._version += 1
+            self._version_floor = self._version
+            self._invalidated.clear()
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        """淘汰最久未使用的条目, 直到满足条目数与内存限制"""
+        while self._entries and (len(self._entries) > self._max_entries or self._bytes > self._max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._stats['evictions'] += 1
+
+    def get_stats(self):
+        """
+        获取缓存统计
+        :return: 命中率、淘汰、过期与失效次数、条目数与估算内存
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self._max_bytes)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 进程级共享实例
+row_cache = RowCache()
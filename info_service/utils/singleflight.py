@@ -0,0 +1,102 @@
+import inspect
+import threading
+from collections import Counter
+from functools import wraps
+
+
+class _Call:
+    """一次进行中的调用, 等待者共享其结果或异常"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    进程内的请求合并
+    相同 key 的并发调用只执行一次, 其余调用方等待并共享同一个结果
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executions = Counter()
+        self._coalesced = Counter()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        执行调用, 已有相同 key 的调用进行中时等待其结果
+        :param key: 合并键, 最后一项为资源名称, 形如 (username, force_refresh, resource)
+        :param fn: 实际执行的函数
+        :return: 函数返回值
+        """
+        resource = key[-1] if isinstance(key, tuple) else key
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions[resource] += 1
+            else:
+                self._coalesced[resource] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def get_stats(self):
+        """
+        获取合并统计
+        :return: 实际执行次数与被合并的请求数
+        """
+        with self._lock:
+            return {
+                'executions': sum(self._executions.values()),
+                'coalesced': sum(self._coalesced.values()),
+                'in_flight': len(self._calls),
+                'coalesced_by_resource': dict(self._coalesced),
+            }
+
+
+# 进程级共享实例
+single_flight = SingleFlight()
+
+
+def coalesce(resource):
+    """
+    装饰器: 按 (用户名, 是否强制刷新, 资源) 合并并发调用, 被装饰函数的第一个参数为用户名
+    强制刷新的调用不会并入读取缓存的调用, 否则后台刷新会拿到进行中调用返回的缓存数据而不刷新
+    :param resource: 资源名称
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(username, *args, **kwargs):
+            if not username:
+                return fn(username, *args, **kwargs)
+            bound = signature.bind(username, *args, **kwargs)
+            bound.apply_defaults()
+            force_refresh = bool(bound.arguments.get('force_refresh', False))
+            return single_flight.do((str(username).lower(), force_refresh, resource), fn, username, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
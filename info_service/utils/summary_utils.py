@@ -0,0 +1,79 @@
+import requests
+
+from info_service.config.cohere_config import CohereConfig
+from info_service.utils.logger_utils import logger
+
+# Cohere 文本生成接口
+COHERE_GENERATE_URL = 'https://api.cohere.ai/v1/generate'
+
+
+def build_summary_prompt(user_info, most_common_language, tech_stack):
+    """
+    生成用户总结的提示信息
+    :param user_info: 用户基本信息
+    :param most_common_language: 最常用的语言/推测国家
+    :param tech_stack: 技术栈信息
+    :return: 提示信息
+    """
+    return (
+        f"用户名: {user_info.get('login', '未知')}\n"
+        f"姓名: {user_info.get('name', '未知')}\n"
+        f"公司: {user_info.get('company', '未知')}\n"
+        f"博客: {user_info.get('blog', '无')}\n"
+        f"位置: {user_info.get('location', '未知')}\n"
+        f"邮箱: {user_info.get('email', '无')}\n"
+        f"是否可雇佣: {user_info.get('hireable', '未知')}\n"
+        f"简介: {user_info.get('bio', '无简介')}\n"
+        f"Twitter用户名: {user_info.get('twitter_username', '无')}\n"
+        f"公开仓库数: {user_info.get('public_repos', 0)}\n"
+        f"公开Gists数: {user_info.get('public_gists', 0)}\n"
+        f"粉丝数: {user_info.get('followers', 0)}\n"
+        f"关注数: {user_info.get('following', 0)}\n"
+        f"最常用的项目语言: {most_common_language}\n"
+        f"主要技术栈: {tech_stack}\n"
+        "以上信息是有关GitHub用户的个人信息，请以此生成一段用户介绍信息，要求300字英文！"
+    )
+
+
+def generate_summary(prompt_data):
+    """
+    调用 Cohere API 生成总结
+    :param prompt_data: 提示信息
+    :return: 总结文本, 生成结果为空时返回 None
+    :raises requests.exceptions.RequestException: 请求失败或超时
+    """
+    headers = {
+        'Authorization': f'BEARER {CohereConfig.COHEREKEY}',
+        'Content-Type': 'application/json'
+    }
+
+    data = {
+        'model': 'command',
+        'prompt': prompt_data,
+        'max_tokens': 300,
+        'temperature': 0.7,
+        'k': 0,
+        'stop_sequences': [],
+        'return_likelihoods': 'NONE'
+    }
+
+    response = requests.post(
+        COHERE_GENERATE_URL,
+        headers=headers,
+        json=data,
+        verify=False,
+        timeout=30
+    )
+    response.raise_for_status()
+
+    logger.info("成功从Cohere API获取响应")
+    response_data = response.json()
+    if not response_data.get('generations'):
+        logger.error("Cohere API返回的生成结果为空")
+        return None
+
+    summary_text = response_data['generations'][0]['text'].strip()
+    if not summary_text:
+        logger.error("生成的总结内容为空")
+        return None
+    return summary_text
@@ -1,37 +1,62 @@
+from datetime import datetime, timedelta
+
 import requests
 
-from info_service.config.github_token_config import Config
-from info_service.utils.agent_utils import get_random_user_agent
+from info_service.config.evaluate_config import REPO_LANGUAGES_MAX_AGE_DAYS
+from info_service.services.info_service import get_repositories, save_repo_languages
+from info_service.utils.github_client import github_client
 from info_service.utils.logger_utils import logger
 
 
-def get_tech_language_details(repos):
-    language_stats = {}
-
-    headers = {
-        'User-Agent': get_random_user_agent(),
-        'Authorization': f'token {Config.token}'
-    } if Config.token else {'User-Agent': get_random_user_agent()}
-
+def get_repo_languages(repos):
+    """
+    获取各仓库的语言字节数
+    仓库表中的语言在仓库推送后或超过 REPO_LANGUAGES_MAX_AGE_DAYS 后过期, 只请求过期与未保存的仓库,
+    多个用户关联同一仓库时语言只获取一次
+    :param repos: 仓库列表
+    :return: 各仓库的 {语言: 字节数} 列表, 获取失败的仓库不包含在内
+    """
+    stored = get_repositories([repo['id'] for repo in repos if repo.get('id')])
+    expires_at = datetime.now() - timedelta(days=REPO_LANGUAGES_MAX_AGE_DAYS)
+    results, fetched = [], []
     for repo in repos:
         languages_url = repo.get("languages_url")
         if not languages_url:
             continue
 
+        state = stored.get(repo.get('id'))
+        if (state and state['languages'] is not None and state['languages_pushed_at'] == repo.get('pushed_at')
+                and state['languages_fetched_at'] and state['languages_fetched_at'] >= expires_at):
+            results.append(state['languages'])
+            continue
+
         logger.debug(f"正在获取仓库{repo.get('name')}的语言信息")
         try:
-            response = requests.get(languages_url, headers=headers, timeout=30)
+            response = github_client.get(languages_url)
             response.raise_for_status()
             languages = response.json()
-
-            for lang, bytes_count in languages.items():
-                if lang not in language_stats:
-                    language_stats[lang] = {"bytes": 0, "count": 0}
-                language_stats[lang]["bytes"] += bytes_count
-                language_stats[lang]["count"] += 1
         except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"获取仓库{repo.get('name')}的语言信息失败: {str(e)}")
             continue
+        results.append(languages)
+        if repo.get('id'):
+            fetched.append((repo, languages))
+
+    if fetched:
+        save_repo_languages(fetched)
+    logger.info(f"仓库语言获取完成: 复用{len(results) - len(fetched)}个, 重新获取{len(fetched)}个")
+    return results
+
+
+def get_tech_language_details(repos):
+    language_stats = {}
+
+    for languages in get_repo_languages(repos):
+        for lang, bytes_count in languages.items():
+            if lang not in language_stats:
+                language_stats[lang] = {"bytes": 0, "count": 0}
+            language_stats[lang]["bytes"] += bytes_count
+            language_stats[lang]["count"] += 1
 
     if not language_stats:
         logger.warning(f"未找到用户的任何语言信息")
@@ -53,6 +78,24 @@ def get_tech_language_details(repos):
     return language_details
 
 
+def build_tech_info(repos):
+    """
+    根据仓库列表生成技术栈信息
+    :param repos: 仓库列表
+    :return: 包含语言详情和技术栈类型的字典
+    """
+    language_details = get_tech_language_details(repos)
+    if isinstance(language_details, tuple):
+        # 未找到语言信息时返回的是错误响应
+        language_details = []
+    # 判断技术型
+    tech_type = get_tech_type(language_details)
+    return {
+        "languages": language_details,
+        "techs": tech_type
+    }
+
+
 def get_tech_type(language_details):
     """
     根据语言详情判断技术栈类型
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from info_service.config.github_token_config import Config
+from info_service.config.http_config import TOKEN_POOL_MAX_WAIT, TOKEN_DEFAULT_LIMITS
+from info_service.utils.logger_utils import logger
+
+
+def resource_for(url):
+    """
+    根据请求地址判断 GitHub 速率限制所属的资源类型
+    :param url: 请求地址
+    :return: core / search / graphql
+    """
+    path = urlsplit(url).path
+    if path.startswith('/search/'):
+        return 'search'
+    if path.startswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+def token_fingerprint(token):
+    """Token 的摘要, 用于记录响应由哪个 Token 获取, 不保存 Token 原文"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16] if token else None
+
+
+def mask_token(token):
+    """隐藏 Token 中间部分, 用于日志与统计输出"""
+    return f"{token[:4]}...{token[-4:]}" if len(token) > 8 else '***'
+
+
+class TokenLease:
+    """一次请求对 Token 的占用, 请求结束后由 TokenPool 根据响应更新额度"""
+
+    def __init__(self, token, resource):
+        self.token = token
+        self.resource = resource
+        self.response = None
+
+
+class TokenPool:
+    """
+    GitHub 多 Token 凭证池
+    根据响应头中的 X-RateLimit-Remaining/Reset 跟踪每个 Token 的剩余额度,
+    每次请求选择剩余额度最多的 Token, 所有 Token 耗尽时挂起请求直到额度重置
+    """
+
+    def __init__(self, tokens, max_wait=TOKEN_POOL_MAX_WAIT):
+        """
+        初始化凭证池
+        :param tokens: Token 列表
+        :param max_wait: 所有 Token 耗尽时最长等待时间(秒)
+        """
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = 0
+        # (token, resource) -> 额度状态
+        self._states = {}
+        self._tokens = list(dict.fromkeys(token for token in tokens if token))
+        self._fingerprints = {token_fingerprint(token): token for token in self._tokens}
+
+    def _state(self, token, resource):
+        """获取 Token 在某类资源上的额度状态, 不存在时按默认额度初始化"""
+        key = (token, resource)
+        if key not in self._states:
+            limit = TOKEN_DEFAULT_LIMITS.get(resource, TOKEN_DEFAULT_LIMITS['core'])
+            self._states[key] = {'limit': limit, 'remaining': limit, 'reset_at': 0, 'in_flight': 0}
+        return self._states[key]
+
+    def _headroom(self, state, now):
+        """计算 Token 当前可用的额度, 额度已重置时恢复为上限"""
+        if state['reset_at'] and state['reset_at'] <= now:
+            state['remaining'] = state['limit']
+            state['reset_at'] = 0
+        return state['remaining'] - state['in_flight']
+
+    def acquire(self, resource='core', prefer=None):
+        """
+        选择剩余额度最多的 Token 并占用
+        :param resource: 速率限制资源类型
+        :param prefer: 优先使用的 Token 摘要, 该 Token 仍有额度时选择它
+        :return: Token, 未配置 Token 时返回 None
+        """
+        if not self._tokens:
+            return None
+
+        deadline = time.time() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.time()
+                token = max(self._tokens, key=lambda t: self._headroom(self._state(t, resource), now))
+                preferred = self._fingerprints.get(prefer)
+                if preferred and self._headroom(self._state(preferred, resource), now) > 0:
+                    token = preferred
+                state = self._state(token, resource)
+                if self._headroom(state, now) > 0 or now >= deadline:
+                    if now >= deadline:
+                        logger.warning(f"所有Token的{resource}额度均已耗尽, 等待超时后继续使用{mask_token(token)}")
+                    state['in_flight'] += 1
+                    return token
+
+                # 所有 Token 都已耗尽, 等待最早的额度重置或其他请求归还
+                next_reset = min(
+                    (self._state(t, resource)['reset_at'] for t in self._tokens if self._state(t, resource)['reset_at']),
+                    default=deadline
+                )
+                wait_seconds = max(0.1, min(next_reset, deadline) - now)
+                logger.info(f"所有Token的{resource}额度均已耗尽, 请求挂起{wait_seconds:.1f}秒")
+                self._waiting += 1
+                try:
+                    self._cond.wait(wait_seconds)
+                finally:
+                    self._waiting -= 1
+
+    def release(self, token, resource='core', response=None):
+        """
+        归还 Token, 并根据响应头更新剩余额度
+        :param token: Token
+        :param resource: 速率限制资源类型
+        :param response: 请求的响应, 请求失败时为 None
+        """
+        if token is None:
+            return
+
+        with self._cond:
+            state = self._state(token, resource)
+            state['in_flight'] = max(0, state['in_flight'] - 1)
+            if response is not None:
+                self._update_from_response(state, response)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _update_from_response(state, response):
+        """根据响应头更新额度状态"""
+        headers = response.headers
+        try:
+            if 'X-RateLimit-Limit' in headers:
+                state['limit'] = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Remaining' in headers:
+                state['remaining'] = int(headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Reset' in headers:
+                state['reset_at'] = int(headers['X-RateLimit-Reset'])
+            # 触发二级速率限制时按 Retry-After 暂停该 Token
+            if response.status_code in (403, 429) and 'Retry-After' in headers:
+                state['remaining'] = 0
+                state['reset_at'] = int(time.time()) + int(headers['Retry-After'])
+        except ValueError as e:
+            logger.warning(f"解析速率限制响应头失败: {e}")
+
+    @contextmanager
+    def lease(self, url, prefer=None):
+        """
+        在请求期间占用一个 Token 的上下文管理器
+        :param url: 请求地址
+        :param prefer: 优先使用的 Token 摘要
+        :return: TokenLease, 调用方需将响应写入 lease.response
+        """
+        resource = resource_for(url)
+        lease = TokenLease(self.acquire(resource, prefer), resource)
+        try:
+            yield lease
+        finally:
+            self.release(lease.token, resource, lease.response)
+
+    def get_stats(self):
+        """
+        获取凭证池状态
+        :return: 每个 Token 在各类资源上的剩余额度、重置时间与进行中的请求数
+        """
+        with self._cond:
+            now = time.time()
+            tokens = []
+            for token in self._tokens:
+                resources = {}
+                for (state_token, resource), state in self._states.items():
+                    if state_token != token:
+                        continue
+                    self._headroom(state, now)
+                    resources[resource] = {
+                        'limit': state['limit'],
+                        'remaining': state['remaining'],
+                        'reset_at': datetime.fromtimestamp(state['reset_at']).isoformat() if state['reset_at'] else None,
+                        'in_flight': state['in_flight'],
+                    }
+                tokens.append({'token': mask_token(token), 'resources': resources})
+            return {'size': len(self._tokens), 'waiting': self._waiting, 'tokens': tokens}
+
+    def total_remaining(self, resource='core'):
+        """
+        获取所有 Token 在某类资源上的剩余额度之和
+        :param resource: 速率限制资源类型
+        :return: 剩余额度
+        """
+        with self._cond:
+            now = time.time()
+            return sum(max(0, self._headroom(self._state(t, resource), now)) for t in self._tokens)
+
+
+# 进程级共享实例
+token_pool = TokenPool(getattr(Config, 'tokens', []))
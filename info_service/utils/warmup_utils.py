@@ -0,0 +1,226 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from info_service.config.cache_config import (
+    CACHE_TTL_DAYS, MAX_STALENESS_DAYS, WARMUP_INTERVAL_SECONDS, WARMUP_LEAD_HOURS, ACCESS_HALF_LIFE_HOURS,
+    ACCESS_TRACK_MAX, WARMUP_HOT_SIZE, WARMUP_SEED_WEIGHT, WARMUP_SEED_INTERVAL_SECONDS, WARMUP_MAX_PER_CYCLE,
+    WARMUP_SPACING_SECONDS, WARMUP_COST_PER_USER, WARMUP_RATE_LIMIT_RESERVE, WARMUP_MAX_INTERACTIVE_IN_FLIGHT
+)
+from info_service.services.info_service import get_rank_data, get_recommended_github_ids, get_github_fetched_at
+from info_service.utils.logger_utils import logger
+from info_service.utils.token_pool import token_pool
+
+# 预热刷新 (get_user_profile) 重新获取的列, 按其中最早的获取时间判断是否即将过期
+# 预热沿用已缓存的总结, 不重新调用 Cohere, 因此不包含 summa
+WARMUP_COLUMNS = ('user_info', 'repos_info', 'tech_stack', 'most_common_language', 'evaluate')
+
+
+class InFlightCounter:
+    """
+    进行中的交互请求数
+    只统计 HTTP 请求, 不包含后台刷新、预热与 GitHub 请求合并, 预热据此判断是否让路
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def enter(self):
+        with self._lock:
+            self._value += 1
+
+    def exit(self):
+        with self._lock:
+            self._value -= 1
+
+    @property
+    def value(self):
+        with self._lock:
+            return self._value
+
+
+class AccessTracker:
+    """
+    按用户统计访问热度, 热度随时间指数衰减
+    """
+
+    def __init__(self, half_life_hours=ACCESS_HALF_LIFE_HOURS, max_size=ACCESS_TRACK_MAX):
+        self._decay = math.log(2) / (half_life_hours * 3600)
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # github_id -> (热度, 上次更新时间)
+        self._scores = {}
+
+    def _current(self, github_id, now):
+        """计算用户当前的热度"""
+        score, updated = self._scores.get(github_id, (0.0, now))
+        return score * math.exp(-self._decay * (now - updated))
+
+    def record(self, github_id, weight=1.0):
+        """
+        记录一次访问
+        :param github_id: GitHub用户ID
+        :param weight: 访问权重
+        """
+        github_id = github_id.lower()
+        now = time.time()
+        with self._lock:
+            self._scores[github_id] = (self._current(github_id, now) + weight, now)
+            if len(self._scores) > self._max_size:
+                self._prune(now)
+
+    def _prune(self, now):
+        """淘汰热度最低的用户, 保留 max_size 的 90%"""
+        ranked = sorted(self._scores, key=lambda key: self._current(key, now), reverse=True)
+        for github_id in ranked[int(self._max_size * 0.9):]:
+            del self._scores[github_id]
+
+    def hottest(self, limit):
+        """
+        获取热度最高的用户
+        :param limit: 数量
+        :return: [(github_id, 热度)] 按热度降序
+        """
+        now = time.time()
+        with self._lock:
+            scores = [(github_id, self._current(github_id, now)) for github_id in self._scores]
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:limit]
+
+    def size(self):
+        with self._lock:
+            return len(self._scores)
+
+
+class WarmupScheduler:
+    """
+    热门用户预热调度器
+    在缓存过期前刷新访问频繁的用户, 预热任务分散执行, 并为交互请求保留 GitHub API 额度
+    """
+
+    def __init__(self, tracker, interactive):
+        self.tracker = tracker
+        self.interactive = interactive
+        self._refresh = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._seeds_loaded_at = 0
+        self._lock = threading.Lock()
+        self._stats = {'cycles': 0, 'warmed': 0, 'failed': 0, 'skipped_budget': 0, 'deferred_interactive': 0}
+
+    def start(self, refresh):
+        """
+        启动后台调度线程
+        :param refresh: 刷新函数, 以用户名为参数, 返回 (数据, 状态码)
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._refresh = refresh
+        self._thread = threading.Thread(target=self._loop, name='warmup', daemon=True)
+        self._thread.start()
+        logger.info("热门用户预热调度已启动")
+
+    def stop(self):
+        """停止后台调度线程"""
+        self._stop.set()
+
+    def _incr(self, name, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _loop(self):
+        while not self._stop.wait(WARMUP_INTERVAL_SECONDS):
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"预热调度执行失败: {e}", exc_info=True)
+
+    def _load_seeds(self):
+        """定期将排行榜前100与推荐列表中的用户加入热度统计"""
+        if time.time() - self._seeds_loaded_at < WARMUP_SEED_INTERVAL_SECONDS:
+            return
+        self._seeds_loaded_at = time.time()
+
+        seeds = get_recommended_github_ids()
+        rank_data = get_rank_data()
+        if rank_data:
+            seeds.extend(user['github_id'] for user in rank_data['top_users'])
+        for github_id in seeds:
+            self.tracker.record(github_id, WARMUP_SEED_WEIGHT)
+        logger.info(f"预热调度加载了{len(seeds)}个排行榜与推荐用户")
+
+    def _due_users(self):
+        """
+        选出即将过期的热门用户
+        每列单独记录获取时间, 行的 updated_at 会被任意一列的写入刷新, 因此按 WARMUP_COLUMNS 中最早的获取时间判断
+        :return: 按热度降序的 GitHub用户ID列表
+        """
+        hottest = self.tracker.hottest(WARMUP_HOT_SIZE)
+        fetched_at = {github_id.lower(): columns for github_id, columns in
+                      get_github_fetched_at([github_id for github_id, _ in hottest], WARMUP_COLUMNS).items()}
+
+        now = datetime.now()
+        due_after = timedelta(days=CACHE_TTL_DAYS) - timedelta(hours=WARMUP_LEAD_HOURS)
+        due = []
+        for github_id, _ in hottest:
+            columns = fetched_at.get(github_id)
+            # 从未缓存过的用户不预热, 超过最大容忍时长的用户会在访问时同步刷新
+            if columns and due_after <= now - min(columns.values()) <= timedelta(days=MAX_STALENESS_DAYS):
+                due.append(github_id)
+        return due
+
+    def run_cycle(self):
+        """执行一个预热周期"""
+        self._incr('cycles')
+        self._load_seeds()
+
+        # 未配置 Token 时不受额度限制, 仅按每轮上限预热
+        limit = WARMUP_MAX_PER_CYCLE
+        if token_pool.get_stats()['size']:
+            budget = (token_pool.total_remaining() - WARMUP_RATE_LIMIT_RESERVE) // WARMUP_COST_PER_USER
+            if budget <= 0:
+                logger.info("GitHub API剩余额度不足, 跳过本轮预热")
+                self._incr('skipped_budget')
+                return
+            limit = min(limit, budget)
+
+        due = self._due_users()[:limit]
+        if due:
+            logger.info(f"本轮预热{len(due)}个即将过期的热门用户")
+
+        for github_id in due:
+            if self._stop.is_set():
+                return
+            # 交互请求较多时推迟预热, 把额度和线程留给交互请求
+            while self.interactive.value > WARMUP_MAX_INTERACTIVE_IN_FLIGHT:
+                self._incr('deferred_interactive')
+                if self._stop.wait(WARMUP_SPACING_SECONDS):
+                    return
+            if token_pool.get_stats()['size'] and token_pool.total_remaining() < WARMUP_RATE_LIMIT_RESERVE:
+                logger.info("GitHub API剩余额度低于保留值, 停止本轮预热")
+                self._incr('skipped_budget')
+                return
+
+            try:
+                _, status = self._refresh(github_id)[:2]
+                self._incr('warmed' if status < 400 else 'failed')
+            except Exception as e:
+                logger.error(f"预热用户{github_id}失败: {e}", exc_info=True)
+                self._incr('failed')
+            self._stop.wait(WARMUP_SPACING_SECONDS)
+
+    def get_stats(self):
+        """
+        获取预热统计
+        :return: 统计字典
+        """
+        with self._lock:
+            return dict(self._stats, tracked_users=self.tracker.size(), interactive_in_flight=self.interactive.value)
+
+
+# 进程级共享实例
+access_tracker = AccessTracker()
+interactive_requests = InFlightCounter()
+warmup_scheduler = WarmupScheduler(access_tracker, interactive_requests)
@@ -0,0 +1,290 @@
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from info_service.config.cache_config import (
+    WRITE_FLUSH_INTERVAL_MS, WRITE_BATCH_MAX_USERS, WRITE_QUEUE_MAX_USERS, WRITE_ENQUEUE_TIMEOUT_SECONDS,
+    WRITE_MAX_RETRIES, WRITE_RETRY_MAX_BACKOFF_SECONDS, WRITE_SPILL_FILE
+)
+from info_service.services.info_service import get_github_columns, save_github_profiles
+from info_service.utils.logger_utils import logger
+
+
+class WriteBuffer:
+    """
+    Github 表写缓冲
+    按用户合并待写入的列, 定时或达到批量上限时将所有用户的更新以尽量少的 upsert 写入
+    启动后台线程后为异步写入 (write-behind): 写入失败的数据退避重试, 队列满时对请求线程施加背压,
+    关闭时未写入的数据转存到本地文件, 下次启动时恢复; 未启动时在调用线程中同步写入
+    读取时叠加尚未写入的数据, 保证进程内读到自己的写入
+    """
+
+    def __init__(self, interval_ms=WRITE_FLUSH_INTERVAL_MS, max_users=WRITE_BATCH_MAX_USERS,
+                 queue_max_users=WRITE_QUEUE_MAX_USERS, spill_file=WRITE_SPILL_FILE):
+        self._interval = interval_ms / 1000
+        self._max_users = max_users
+        self._queue_max_users = queue_max_users
+        self._spill_file = spill_file
+        self._lock = threading.Lock()
+        # 队列有空位时唤醒等待的请求线程
+        self._not_full = threading.Condition(self._lock)
+        # 保证同一时刻只有一个线程在写入, 避免同一用户的新旧数据乱序落库
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # github_id -> {列名: (数据, 加入时间)}
+        self._pending = {}
+        # 正在写入的数据, 写入完成前读取时仍需叠加
+        self._flushing = {}
+        # github_id -> 连续写入失败次数
+        self._attempts = {}
+        self._consecutive_failures = 0
+        self._backoff_until = 0
+        self._thread = None
+        self._stats = {
+            'updates': 0, 'coalesced': 0, 'flushes': 0, 'rows': 0, 'failed_rows': 0, 'retried_rows': 0,
+            'spilled_rows': 0, 'restored_rows': 0, 'backpressure_waits': 0, 'sync_flushes': 0,
+            'max_depth': 0, 'flush_ms': 0.0, 'max_flush_ms': 0.0, 'last_flush_ms': 0.0,
+        }
+
+    def start(self):
+        """启动后台写入线程, 并恢复上次关闭时转存的数据"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._restore()
+        self._thread = threading.Thread(target=self._loop, name='write-buffer', daemon=True)
+        self._thread.start()
+        logger.info("Github表异步写入已启动")
+
+    def _running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopped.is_set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"写缓冲定时写入失败: {e}", exc_info=True)
+
+    def add(self, github_id, columns):
+        """
+        加入待写入的列, 同一用户尚未写入的同名列会被新数据覆盖
+        队列已满时等待后台线程腾出空位, 超时后在调用线程中只同步写入该用户的数据, 其余数据仍由后台线程写入
+        :param github_id: GitHub用户ID
+        :param columns: 列名到数据的映射, 列名必须在 PROFILE_COLUMNS 中
+        """
+        # 与进程内缓存、共享缓存、负缓存和请求合并一致, 按小写的用户ID合并
+        github_id = github_id.lower()
+        running = self._running()
+        sync = not running
+        backpressured = False
+        now = datetime.now()
+        deadline = time.monotonic() + WRITE_ENQUEUE_TIMEOUT_SECONDS
+        with self._not_full:
+            if running and github_id not in self._pending and len(self._pending) >= self._queue_max_users:
+                self._stats['backpressure_waits'] += 1
+                while github_id not in self._pending and len(self._pending) >= self._queue_max_users:
+                    self._wakeup.set()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning("写入队列已满, 在请求线程中同步写入")
+                        sync = backpressured = True
+                        break
+                    self._not_full.wait(remaining)
+
+            pending = self._pending.setdefault(github_id, {})
+            for name, value in columns.items():
+                if name in pending:
+                    self._stats['coalesced'] += 1
+                pending[name] = (value, now)
+            self._stats['updates'] += len(columns)
+            self._stats['max_depth'] = max(self._stats['max_depth'], len(self._pending))
+            full = len(self._pending) >= self._max_users
+            if sync:
+                self._stats['sync_flushes'] += 1
+
+        if backpressured:
+            self.flush(force=True, github_ids=[github_id])
+        elif sync:
+            self.flush(force=True)
+        elif full:
+            self._wakeup.set()
+
+    def flush(self, force=False, github_ids=None):
+        """
+        写入待写入的数据, 失败的用户重新加入队列, 超过重试次数后转存到本地文件
+        :param force: 是否忽略失败后的退避时间
+        :param github_ids: 只写入这些用户的数据, 为空时写入所有用户
+        :return: 写入失败的用户数
+        """
+        with self._flush_lock:
+            with self._not_full:
+                if not self._pending or (not force and time.time() < self._backoff_until):
+                    return 0
+                if github_ids is None:
+                    self._flushing, self._pending = self._pending, {}
+                else:
+                    self._flushing = {github_id: self._pending.pop(github_id)
+                                      for github_id in github_ids if github_id in self._pending}
+                batch = self._flushing
+                self._not_full.notify_all()
+
+            start = time.perf_counter()
+            failed_ids = []
+            ids = list(batch)
+            for offset in range(0, len(ids), self._max_users):
+                chunk_ids = ids[offset:offset + self._max_users]
+                chunk = {github_id: {name: value for name, (value, _) in batch[github_id].items()}
+                         for github_id in chunk_ids}
+                if not save_github_profiles(chunk):
+                    logger.error(f"写缓冲写入{len(chunk)}个用户失败")
+                    failed_ids.extend(chunk_ids)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            dropped = {}
+            with self._lock:
+                for github_id in set(ids) - set(failed_ids):
+                    self._attempts.pop(github_id, None)
+                for github_id in failed_ids:
+                    attempts = self._attempts.get(github_id, 0) + 1
+                    if attempts > WRITE_MAX_RETRIES:
+                        self._attempts.pop(github_id, None)
+                        dropped[github_id] = batch[github_id]
+                        continue
+                    self._attempts[github_id] = attempts
+                    # 重试期间加入的新数据优先
+                    pending = self._pending.setdefault(github_id, {})
+                    for name, item in batch[github_id].items():
+                        pending.setdefault(name, item)
+                    self._stats['retried_rows'] += 1
+
+                if failed_ids:
+                    self._consecutive_failures += 1
+                    backoff = min(self._interval * 2 ** self._consecutive_failures, WRITE_RETRY_MAX_BACKOFF_SECONDS)
+                    self._backoff_until = time.time() + backoff
+                else:
+                    self._consecutive_failures = 0
+                    self._backoff_until = 0
+
+                self._flushing = {}
+                self._stats['flushes'] += 1
+                self._stats['rows'] += len(ids)
+                self._stats['failed_rows'] += len(failed_ids)
+                self._stats['flush_ms'] += elapsed_ms
+                self._stats['last_flush_ms'] = elapsed_ms
+                self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+
+            if dropped:
+                logger.error(f"{len(dropped)}个用户超过最大重试次数, 转存到本地文件")
+                self._spill(dropped)
+            return len(failed_ids)
+
+    def shutdown(self):
+        """停止后台线程, 写入剩余数据, 仍未写入的数据转存到本地文件"""
+        self._stopped.set()
+        self._wakeup.set()
+        try:
+            self.flush(force=True)
+        except Exception as e:
+            logger.error(f"关闭时写入缓冲数据失败: {e}", exc_info=True)
+
+        with self._lock:
+            remaining, self._pending = self._pending, {}
+        if remaining:
+            logger.warning(f"关闭时仍有{len(remaining)}个用户未写入, 转存到本地文件")
+            self._spill(remaining)
+
+    def _spill(self, entries):
+        """
+        将未写入的数据追加到本地文件
+        :param entries: github_id 到 {列名: (数据, 加入时间)} 的映射
+        """
+        try:
+            os.makedirs(os.path.dirname(self._spill_file) or '.', exist_ok=True)
+            with open(self._spill_file, 'a', encoding='utf-8') as f:
+                for github_id, columns in entries.items():
+                    record = {
+                        'github_id': github_id,
+                        'columns': {name: value for name, (value, _) in columns.items()},
+                        'added_at': max(added_at for _, added_at in columns.values()).isoformat(),
+                    }
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                self._stats['spilled_rows'] += len(entries)
+        except Exception as e:
+            logger.error(f"转存未写入数据失败, 丢失{len(entries)}个用户的更新: {e}", exc_info=True)
+
+    def _restore(self):
+        """将上次转存的数据重新加入队列, 队列中已有的新数据优先"""
+        if not os.path.exists(self._spill_file):
+            return
+        restoring = self._spill_file + '.restoring'
+        try:
+            os.replace(self._spill_file, restoring)
+            restored = 0
+            with open(restoring, encoding='utf-8') as f, self._lock:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    added_at = datetime.fromisoformat(record['added_at'])
+                    pending = self._pending.setdefault(record['github_id'].lower(), {})
+                    for name, value in record['columns'].items():
+                        pending.setdefault(name, (value, added_at))
+                    restored += 1
+                self._stats['restored_rows'] += restored
+            os.remove(restoring)
+            logger.info(f"从本地文件恢复了{restored}个用户的待写入数据")
+        except Exception as e:
+            logger.error(f"恢复转存数据失败, 文件保留在{restoring}: {e}", exc_info=True)
+
+    def read(self, github_id, columns):
+        """
+        按列读取用户信息, 并叠加尚未写入的数据
+        :param github_id: GitHub用户ID
+        :param columns: 需要读取的列
+        :return: 同 get_github_columns
+        """
+        result = get_github_columns(github_id, columns)
+        key = github_id.lower()
+        with self._lock:
+            overlay = dict(self._flushing.get(key, {}))
+            overlay.update(self._pending.get(key, {}))
+        overlay = {name: item for name, item in overlay.items() if name in columns}
+        if not overlay or result is False:
+            return result
+
+        if result is None:
+            result = {name: None for name in columns}
+            result['updated_at'] = None
+            result['fetched_at'] = {name: None for name in columns}
+        for name, (value, added_at) in overlay.items():
+            result[name] = value
+            result['fetched_at'][name] = added_at
+        return result
+
+    def get_stats(self):
+        """
+        获取写缓冲统计
+        :return: 队列深度、更新与合并的列数、写入/重试/转存/恢复的行数、背压次数与写入耗时
+        """
+        with self._lock:
+            stats = dict(self._stats, depth=len(self._pending), in_flight=len(self._flushing),
+                         mode='write_behind' if self._running() else 'sync')
+        flush_ms = stats.pop('flush_ms')
+        stats['avg_flush_ms'] = round(flush_ms / stats['flushes'], 2) if stats['flushes'] else 0.0
+        stats['max_flush_ms'] = round(stats['max_flush_ms'], 2)
+        stats['last_flush_ms'] = round(stats['last_flush_ms'], 2)
+        return stats
+
+
+# 进程级共享实例
+write_buffer = WriteBuffer()
+atexit.register(write_buffer.shutdown)
@@ -0,0 +1,24 @@
+# 跨进程共享缓存配置: 缓存推荐列表, 与 info_service 使用同一个共享存储
+# 共享存储类型: redis (多进程/多主机部署), local (进程内替代实现, 用于单进程与测试), none (不启用)
+SHARED_CACHE_BACKEND = "local"
+
+# 共享缓存的键前缀
+SHARED_CACHE_PREFIX = "github_rank"
+
+# 共享缓存数据的有效期 (秒)
+SHARED_CACHE_TTL_SECONDS = 600
+
+# 进程内缓存 (含版本号) 的有效期 (秒), 其他进程的失效最多在该时长后可见
+SHARED_CACHE_LOCAL_TTL_SECONDS = 5
+
+# 进程内缓存最多保存的键数
+SHARED_CACHE_LOCAL_MAX_ENTRIES = 1000
+
+# 版本号键的有效期 (秒), 不短于数据的有效期, 写入数据时续期
+SHARED_CACHE_VERSION_TTL_SECONDS = 86400
+
+# local 共享存储最多保存的键数, 超过时淘汰最久未使用的键
+SHARED_CACHE_LOCAL_BACKEND_MAX_ENTRIES = 10000
+
+# local 共享存储清理过期键的间隔 (秒)
+SHARED_CACHE_LOCAL_BACKEND_SWEEP_SECONDS = 60
@@ -12,4 +12,5 @@ class Config:
 
     if config:
         token = config.get("token")
-        print("配置内容:", config)
+        # 不打印 Token 本身
+        print("GitHub Token 配置已加载")
@@ -0,0 +1,14 @@
+import json
+
+from recommend_service.utils.nacos_utils import get_config_from_nacos
+
+
+class RedisConfig:
+    """
+        配置类，用于从Nacos中读取Redis配置项
+    """
+    # 从Nacos中获取配置字符串, 未配置Redis时使用本机默认地址
+    config_str = get_config_from_nacos("redisConfig.json")
+    config = json.loads(config_str) if config_str else {}
+
+    REDIS_URL = config.get("REDIS_URL", "redis://127.0.0.1:6379/0")
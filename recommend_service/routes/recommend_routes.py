@@ -5,6 +5,10 @@ from flask import jsonify, request, Blueprint
 from recommend_service.utils.logger_utils import logger
 
 from recommend_service.controllers.recommend_controller import get_since_recommend
+from recommend_service.utils.shared_cache import shared_cache
+from recommend_service.services.recommend_service import pool
+from recommend_service.utils.query_stats import query_stats
+from recommend_service.utils.jwt_utils import admin_required
 
 # 定义蓝图
 recommend_bp = Blueprint('recommend', __name__)
@@ -14,6 +18,7 @@ recommend_bp = Blueprint('recommend', __name__)
 def register_recommend_blueprint(app):
     app.register_blueprint(recommend_bp, url_prefix='/recommend')
     Swagger(app)
+    pool.start_health_check()
 
 
 @recommend_bp.route('/', methods=['GET'])
@@ -67,3 +72,50 @@ def recommend():
     except Exception as e:
         logger.error(f"处理推荐请求时出错: {e}")
         return jsonify({"detail": "服务器内部错误"}), 500
+
+
+@recommend_bp.route('/admin/stats', methods=['GET'])
+@swag_from({
+    'tags': ['推荐服务'],
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'type': 'string',
+            'required': True,
+            'description': '管理员登录后获得的 JWT'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '服务内部运行统计信息',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'shared_cache': {
+                        'type': 'object',
+                        'description': '共享缓存后端类型、各数据类型在进程内与共享存储的命中次数和命中率'
+                    },
+                    'db_pool': {
+                        'type': 'object',
+                        'description': '数据库连接池的连接数、空闲数、等待数、借出/等待/超时/重试/检查次数与借出等待时间直方图'
+                    },
+                    'db_queries': {
+                        'type': 'object',
+                        'description': '按语句指纹统计的调用次数、行数与耗时直方图, 参数已脱敏的慢查询日志与慢查询的 EXPLAIN 结果'
+                    }
+                }
+            }
+        },
+        403: {
+            'description': '缺少或无效的 Authorization token, 或不是管理员'
+        }
+    }
+})
+@admin_required
+def admin_stats():
+    return jsonify({
+        "shared_cache": shared_cache.get_stats(),
+        "db_pool": pool.get_stats(),
+        "db_queries": query_stats.get_stats(),
+    }), 200
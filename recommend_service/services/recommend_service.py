@@ -3,47 +3,38 @@ import json
 
 from recommend_service.config.db_config import Config
 from recommend_service.utils.logger_utils import logger
-from recommend_service.utils.mysql_utils import MySQLPool
+from recommend_service.utils.mysql_utils import ConnectionPool
+from recommend_service.utils.query_stats import InstrumentedCursor, query_stats
+from recommend_service.utils.shared_cache import shared_cache
 
-# 使用配置文件中的数据库连接信息
-connection = MySQLPool(
+# 使用配置文件中的数据库连接信息, 空闲连接由后台线程检查
+pool = ConnectionPool(
     host_name=Config.DB_HOST,
     user_name=Config.DB_USER,
     user_password=Config.DB_PASSWORD,
-    db_name=Config.DB_NAME
-).get_connection()
-
-
-def ensure_connection():
-    """
-    确保数据库连接是有效的，如果无效则重新连接。
-    """
-    global connection
-    try:
-        connection.ping(reconnect=True)
-    except Exception as e:
-        logger.error(f"数据库连接失败，尝试重新连接: {e}")
-        connection = MySQLPool(
-            host_name=Config.DB_HOST,
-            user_name=Config.DB_USER,
-            user_password=Config.DB_PASSWORD,
-            db_name=Config.DB_NAME
-        ).get_connection()
+    db_name=Config.DB_NAME,
+    pool_size=Config.DB_POOL_SIZE,
+    checkout_timeout=Config.DB_POOL_TIMEOUT,
+    validate_idle_seconds=Config.DB_POOL_VALIDATE_INTERVAL
+)
 
 
 @contextmanager
 def get_cursor(dictionary=False):
     """
-    获取数据库游标的上下文管理器
+    获取数据库游标的上下文管理器, 正常结束时提交, 出错时回滚
+    连接断开或回滚失败时丢弃连接, 不再归还连接池
     :param dictionary: 是否返回字典格式的结果
     :return: 数据库游标
     """
-    ensure_connection()  # 确保连接有效
-    cursor = connection.cursor(dictionary=dictionary)
-    try:
-        yield cursor
-    finally:
-        cursor.close()
+    with pool.cursor(dictionary=dictionary) as cursor:
+        instrumented = InstrumentedCursor(cursor, query_stats)
+        try:
+            yield instrumented
+        except Exception:
+            instrumented.finish(explain=False)
+            raise
+        instrumented.finish()
 
 
 def get_weekly_recommendations(weekly):
@@ -52,12 +43,19 @@ def get_weekly_recommendations(weekly):
     :param weekly: 周期标识
     :return: 推荐数据的 JSON 对象或 None
     """
+    cached = shared_cache.get('weekly_recommend', weekly)
+    if cached is not None:
+        return cached
+
     try:
+        version = shared_cache.version('weekly_recommend', weekly)
         with get_cursor(dictionary=True) as cursor:
             cursor.execute("SELECT * FROM weekly_recommend WHERE weekly = %s", (weekly,))
             result = cursor.fetchone()
             if result:
-                return json.loads(result['recommendations'])
+                recommendations = json.loads(result['recommendations'])
+                shared_cache.set('weekly_recommend', weekly, recommendations, version=version)
+                return recommendations
             return None
     except Exception as e:
         logger.error(f"获取周推荐数据失败: {e}")
@@ -70,12 +68,19 @@ def get_daily_recommendations(daily):
     :param daily: 周期标识
     :return: 推荐数据的 JSON 对象或 None
     """
+    cached = shared_cache.get('daily_recommend', daily)
+    if cached is not None:
+        return cached
+
     try:
+        version = shared_cache.version('daily_recommend', daily)
         with get_cursor(dictionary=True) as cursor:
             cursor.execute("SELECT * FROM daily_recommend WHERE daily = %s", (daily,))
             result = cursor.fetchone()
             if result:
-                return json.loads(result['recommendations'])
+                recommendations = json.loads(result['recommendations'])
+                shared_cache.set('daily_recommend', daily, recommendations, version=version)
+                return recommendations
             return None
     except Exception as e:
         logger.error(f"获取日推荐数据失败: {e}")
@@ -88,12 +93,19 @@ def get_monthly_recommendations(monthly):
     :param monthly: 周期标识
     :return: 推荐数据的 JSON 对象或 None
     """
+    cached = shared_cache.get('monthly_recommend', monthly)
+    if cached is not None:
+        return cached
+
     try:
+        version = shared_cache.version('monthly_recommend', monthly)
         with get_cursor(dictionary=True) as cursor:
             cursor.execute("SELECT * FROM monthly_recommend WHERE monthly = %s", (monthly,))
             result = cursor.fetchone()
             if result:
-                return json.loads(result['recommendations'])
+                recommendations = json.loads(result['recommendations'])
+                shared_cache.set('monthly_recommend', monthly, recommendations, version=version)
+                return recommendations
             return None
     except Exception as e:
         logger.error(f"获取月推荐数据失败: {e}")
@@ -117,7 +129,7 @@ def save_weekly_recommendations(weekly, recommendations):
                 """,
                 (weekly, json.dumps(recommendations))
             )
-            connection.commit()
+        shared_cache.invalidate('weekly_recommend', weekly)
         return True
     except Exception as e:
         logger.error(f"保存周推荐数据失败: {e}")
@@ -141,7 +153,7 @@ def save_monthly_recommendations(monthly, recommendations):
                 """,
                 (monthly, json.dumps(recommendations))
             )
-            connection.commit()
+        shared_cache.invalidate('monthly_recommend', monthly)
         return True
     except Exception as e:
         logger.error(f"保存月推荐数据失败: {e}")
@@ -165,7 +177,7 @@ def save_daily_recommendations(daily, recommendations):
                 """,
                 (daily, json.dumps(recommendations))
             )
-            connection.commit()
+        shared_cache.invalidate('daily_recommend', daily)
         return True
     except Exception as e:
         logger.error(f"保存日推荐数据失败: {e}")
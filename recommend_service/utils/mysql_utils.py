@@ -1,5 +1,20 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql
-from mysql.connector import Error
+import mysql.connector
+from mysql.connector import Error, InterfaceError
+
+from recommend_service.utils.logger_utils import logger
+
+# 借出连接等待时间直方图的桶上限 (毫秒), 超过最后一个桶的计入 inf
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# 表示连接已断开的错误码: 2006 server has gone away, 2013 查询中连接断开, 2055 读写时连接断开
+CONNECTION_LOST_ERRNOS = (2006, 2013, 2055)
 
 
 class MySQLPool:
@@ -33,6 +48,300 @@ class MySQLPool:
             print("连接已释放回连接池")
 
 
+def is_connection_lost(error):
+    """
+    判断异常是否由连接断开引起
+    :param error: 异常
+    :return: 是否为连接断开
+    """
+    return isinstance(error, InterfaceError) or getattr(error, 'errno', None) in CONNECTION_LOST_ERRNOS
+
+
+class PoolTimeoutError(Exception):
+    """等待连接池中的空闲连接超时"""
+
+
+class _Waiter:
+    """等待连接的线程, 由归还连接的线程直接移交连接"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.connection = None
+        # 连接被丢弃后, 等待者获得新建连接的名额
+        self.may_create = False
+
+
+class RetryingCursor:
+    """
+    游标包装
+    借出的连接在执行第一条语句时发现已断开, 丢弃该连接并换一个连接重新执行一次;
+    已有语句执行成功后不再重试, 避免事务只重放了一半
+    """
+
+    def __init__(self, pool, connection, dictionary):
+        self._pool = pool
+        self._dictionary = dictionary
+        self.connection = connection
+        self._cursor = connection.cursor(dictionary=dictionary)
+        self._used = False
+
+    def _run(self, method, *args):
+        try:
+            result = getattr(self._cursor, method)(*args)
+        except Error as e:
+            if self._used or not is_connection_lost(e):
+                raise
+            logger.warning(f"数据库连接已断开, 更换连接后重试: {e}")
+            self._reconnect()
+            result = getattr(self._cursor, method)(*args)
+        self._used = True
+        return result
+
+    def _reconnect(self):
+        self.close()
+        self._pool.discard_connection(self.connection, retried=True)
+        self.connection = None
+        self.connection = self._pool.get_connection()
+        self._cursor = self.connection.cursor(dictionary=self._dictionary)
+
+    def execute(self, operation, params=None):
+        return self._run('execute', operation, params)
+
+    def executemany(self, operation, seq_params):
+        return self._run('executemany', operation, seq_params)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionPool:
+    """
+    线程安全的连接池
+    每次使用时借出一个连接, 用完归还; 连接数达到上限后, 借用方按先来后到排队等待, 超时抛出 PoolTimeoutError
+    空闲连接由后台线程定期检查, 借出时不再 ping; 检查间隔内断开的连接由 RetryingCursor 重试一次
+    """
+
+    def __init__(self, host_name, user_name, user_password, db_name, pool_size=10, checkout_timeout=5,
+                 validate_idle_seconds=30):
+        self.dbconfig = {
+            "host": host_name,
+            "user": user_name,
+            "password": user_password,
+            "database": db_name
+        }
+        self._pool_size = pool_size
+        self._checkout_timeout = checkout_timeout
+        self._validate_idle_seconds = validate_idle_seconds
+        self._lock = threading.Lock()
+        # (连接, 归还或检查时间), 后进先出, 优先复用最近使用过的连接
+        self._idle = []
+        self._waiters = deque()
+        self._size = 0
+        self._thread = None
+        self._stopped = threading.Event()
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'created': 0, 'discarded': 0, 'retries': 0,
+                       'validations': 0, 'validation_failures': 0}
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.dbconfig)
+        with self._lock:
+            self._stats['created'] += 1
+        return connection
+
+    def get_connection(self, timeout=None):
+        """
+        借出一个连接
+        :param timeout: 最长等待时间 (秒), 默认使用 checkout_timeout
+        :return: 数据库连接
+        :raises PoolTimeoutError: 等待超时
+        """
+        timeout = self._checkout_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        waiter = None
+        connection, create = None, False
+        with self._lock:
+            self._stats['checkouts'] += 1
+            if self._idle:
+                connection, _ = self._idle.pop()
+            elif self._size < self._pool_size:
+                self._size += 1
+                create = True
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self._stats['waits'] += 1
+
+        if waiter:
+            if not waiter.event.wait(timeout):
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(f"等待数据库连接超时 ({timeout}秒)")
+            # 超时与移交同时发生时以移交为准
+            connection, create = waiter.connection, waiter.may_create
+        self._record_wait((time.perf_counter() - start) * 1000)
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+        return connection
+
+    def _record_wait(self, elapsed_ms):
+        with self._lock:
+            self._wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+            self._wait_ms += elapsed_ms
+            self._max_wait_ms = max(self._max_wait_ms, elapsed_ms)
+
+    def release_connection(self, connection):
+        """
+        归还连接, 有等待者时直接移交给最早的等待者
+        :param connection: 数据库连接
+        """
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.connection = connection
+                waiter.event.set()
+                return
+            self._idle.append((connection, time.monotonic()))
+
+    def discard_connection(self, connection, retried=False):
+        """
+        关闭并丢弃不可用的连接, 释放其名额
+        :param connection: 数据库连接
+        :param retried: 是否因重试而丢弃
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats['discarded'] += 1
+            if retried:
+                self._stats['retries'] += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        """释放一个连接名额, 有等待者时由其新建连接"""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.may_create = True
+                waiter.event.set()
+                return
+            self._size -= 1
+
+    @contextmanager
+    def cursor(self, dictionary=False):
+        """
+        借出连接并创建游标, 正常结束时提交, 出错时回滚; 连接断开时丢弃连接, 否则归还
+        :param dictionary: 是否返回字典格式的结果
+        :return: RetryingCursor
+        """
+        cursor = RetryingCursor(self, self.get_connection(), dictionary)
+        broken = False
+        try:
+            yield cursor
+            cursor.connection.commit()
+        except Exception as e:
+            broken = is_connection_lost(e)
+            if not broken:
+                try:
+                    cursor.connection.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            if cursor.connection is not None:
+                cursor.close()
+                if broken:
+                    self.discard_connection(cursor.connection)
+                else:
+                    self.release_connection(cursor.connection)
+
+    def start_health_check(self):
+        """启动后台线程, 定期检查空闲超过 validate_idle_seconds 的连接"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._health_check_loop, name='db-pool-health', daemon=True)
+        self._thread.start()
+        logger.info("数据库连接池后台检查已启动")
+
+    def _health_check_loop(self):
+        while not self._stopped.wait(self._validate_idle_seconds):
+            try:
+                self.validate_idle()
+            except Exception as e:
+                logger.error(f"检查空闲数据库连接失败: {e}", exc_info=True)
+
+    def validate_idle(self):
+        """
+        检查空闲过久的连接, 可用的放回连接池, 不可用的丢弃
+        检查期间连接不在空闲列表中, 不会被借出
+        :return: 丢弃的连接数
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = [connection for connection, since in self._idle if now - since > self._validate_idle_seconds]
+            self._idle = [(connection, since) for connection, since in self._idle
+                          if now - since <= self._validate_idle_seconds]
+
+        failures = 0
+        for connection in stale:
+            try:
+                connection.ping(reconnect=False)
+            except Exception as e:
+                failures += 1
+                logger.warning(f"空闲数据库连接已断开, 丢弃: {e}")
+                self.discard_connection(connection)
+                continue
+            self.release_connection(connection)
+
+        with self._lock:
+            self._stats['validations'] += len(stale)
+            self._stats['validation_failures'] += failures
+        return failures
+
+    def stop_health_check(self):
+        """停止后台检查线程"""
+        self._stopped.set()
+
+    def get_stats(self):
+        """
+        获取连接池状态
+        :return: 连接数、空闲数、等待数、借出/等待/超时/重试/检查次数与等待时间直方图
+        """
+        with self._lock:
+            stats = dict(self._stats, size=self._size, max_size=self._pool_size, idle=len(self._idle),
+                         waiters=len(self._waiters))
+            histogram = list(self._wait_histogram)
+            wait_ms, max_wait_ms = self._wait_ms, self._max_wait_ms
+
+        labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ['inf']
+        stats['checkout_wait_ms'] = {
+            'histogram': dict(zip(labels, histogram)),
+            'avg': round(wait_ms / sum(histogram), 2) if sum(histogram) else 0.0,
+            'max': round(max_wait_ms, 2),
+        }
+        return stats
+
+
 def execute_query(pool, query):
     """
     执行数据库查询
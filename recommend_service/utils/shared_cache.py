@@ -0,0 +1,366 @@
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from recommend_service.config.cache_config import (
+    SHARED_CACHE_BACKEND, SHARED_CACHE_PREFIX, SHARED_CACHE_TTL_SECONDS, SHARED_CACHE_LOCAL_TTL_SECONDS,
+    SHARED_CACHE_LOCAL_MAX_ENTRIES, SHARED_CACHE_VERSION_TTL_SECONDS, SHARED_CACHE_LOCAL_BACKEND_MAX_ENTRIES,
+    SHARED_CACHE_LOCAL_BACKEND_SWEEP_SECONDS
+)
+from recommend_service.config.redis_config import RedisConfig
+from recommend_service.utils.logger_utils import logger
+
+
+class LocalBackend:
+    """
+    进程内的 Redis 替代实现, 只支持共享缓存用到的命令
+    用于单进程部署与测试, 不能在多个进程之间共享数据
+    超过最大键数时淘汰最久未使用的键, 并定期清理已过期但未再读取的键
+    """
+
+    def __init__(self, max_entries=SHARED_CACHE_LOCAL_BACKEND_MAX_ENTRIES,
+                 sweep_seconds=SHARED_CACHE_LOCAL_BACKEND_SWEEP_SECONDS):
+        self._lock = threading.Lock()
+        # 键 -> (数据, 过期时间), 按最近使用排序
+        self._data = OrderedDict()
+        self._max_entries = max_entries
+        self._sweep_seconds = sweep_seconds
+        self._next_sweep = time.time() + sweep_seconds
+
+    def _alive(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def _store(self, key, value, expires_at, now):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if now >= self._next_sweep:
+            for k in [k for k, (_, expires) in self._data.items() if expires is not None and expires <= now]:
+                del self._data[k]
+            self._next_sweep = now + self._sweep_seconds
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            item = self._alive(key, time.time())
+            return item[0] if item else None
+
+    def mget(self, keys):
+        with self._lock:
+            now = time.time()
+            return [item[0] if item else None for item in (self._alive(key, now) for key in keys)]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            now = time.time()
+            self._store(key, value, now + ex if ex else None, now)
+        return True
+
+    def mset_ex(self, mapping, ex, index_key=None, touch=None):
+        with self._lock:
+            now = time.time()
+            for key, value in mapping.items():
+                self._store(key, value, now + ex, now)
+            if index_key:
+                item = self._alive(index_key, now)
+                self._store(index_key, (item[0] if item else set()) | set(mapping), now + ex, now)
+            for key, key_ex in (touch or {}).items():
+                item = self._alive(key, now)
+                if item:
+                    self._store(key, item[0], now + key_ex, now)
+
+    def incr_ex(self, key, ex):
+        with self._lock:
+            now = time.time()
+            item = self._alive(key, now)
+            value = int(item[0]) + 1 if item else 1
+            self._store(key, str(value), now + ex, now)
+            return value
+
+    def smembers(self, key):
+        with self._lock:
+            item = self._alive(key, time.time())
+            return set(item[0]) if item else set()
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisBackend:
+    """基于 Redis 协议的共享存储"""
+
+    def __init__(self, url):
+        # redis 为可选依赖, 只在启用 Redis 后端时需要
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5,
+                                            decode_responses=True)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def mget(self, keys):
+        return self._client.mget(keys)
+
+    def set(self, key, value, ex=None):
+        return self._client.set(key, value, ex=ex)
+
+    def mset_ex(self, mapping, ex, index_key=None, touch=None):
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(key, value, ex=ex)
+        if index_key:
+            pipeline.sadd(index_key, *mapping)
+            pipeline.expire(index_key, ex)
+        for key, key_ex in (touch or {}).items():
+            pipeline.expire(key, key_ex)
+        pipeline.execute()
+
+    def incr_ex(self, key, ex):
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.incr(key)
+        pipeline.expire(key, ex)
+        return pipeline.execute()[0]
+
+    def smembers(self, key):
+        return self._client.smembers(key)
+
+    def delete(self, keys):
+        if keys:
+            self._client.delete(*keys)
+
+
+def create_backend(name):
+    """
+    根据配置创建共享存储
+    :param name: redis, local 或 none
+    :return: 存储实例, 未启用或创建失败时返回 None
+    """
+    if name == 'redis':
+        try:
+            return RedisBackend(RedisConfig.REDIS_URL)
+        except Exception as e:
+            logger.error(f"创建Redis共享缓存失败, 不启用共享缓存: {e}")
+            return None
+    if name == 'local':
+        return LocalBackend()
+    return None
+
+
+class SharedCache:
+    """
+    两级缓存: 进程内的短 TTL 缓存在前, Redis 协议的共享存储在后
+    数据键中带有版本号, 写入数据库后调用 invalidate 递增版本号, 所有进程随即读到新版本的键,
+    同时删除上一版本的数据, 更早版本的数据由 TTL 自然过期; 其他进程的进程内缓存最多在短 TTL 后失效
+    版本号键的 TTL 长于数据键, 每次写入数据时续期, 保证版本号过期重置时不会读到仍未过期的旧数据
+    共享存储出错时视为未命中, 不影响主流程
+    """
+
+    def __init__(self, backend, prefix=SHARED_CACHE_PREFIX, ttl=SHARED_CACHE_TTL_SECONDS,
+                 local_ttl=SHARED_CACHE_LOCAL_TTL_SECONDS, local_max_entries=SHARED_CACHE_LOCAL_MAX_ENTRIES,
+                 version_ttl=SHARED_CACHE_VERSION_TTL_SECONDS):
+        self._backend = backend
+        self._prefix = prefix
+        self._ttl = ttl
+        self._version_ttl = max(version_ttl, ttl)
+        self._local_ttl = local_ttl
+        self._local_max_entries = local_max_entries
+        self._lock = threading.Lock()
+        # 完整键 -> (数据, 过期时间), 同时缓存版本号
+        self._local = OrderedDict()
+        self._stats = defaultdict(lambda: {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0})
+        self._errors = 0
+
+    @property
+    def enabled(self):
+        return self._backend is not None
+
+    def _local_get(self, key):
+        with self._lock:
+            item = self._local.get(key)
+            if not item:
+                return None
+            if item[1] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return item[0]
+
+    def _local_set(self, key, value):
+        with self._lock:
+            self._local[key] = (value, time.monotonic() + self._local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _count(self, namespace, name, value=1):
+        with self._lock:
+            self._stats[namespace][name] += value
+
+    def _error(self, action, e):
+        with self._lock:
+            self._errors += 1
+        logger.warning(f"共享缓存{action}失败: {e}")
+
+    def version(self, namespace, key):
+        """
+        获取数据的当前版本号, 进程内缓存短 TTL
+        从数据库读取前获取版本号并传给 set_many, 避免读库期间发生的失效被旧数据覆盖
+        :param namespace: 数据类型
+        :param key: 数据键
+        :return: 版本号, 未启用或出错时返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            return self._version(namespace, key)
+        except Exception as e:
+            self._error('读取版本号', e)
+            return None
+
+    def _version_key(self, namespace, key):
+        return f"{self._prefix}:{namespace}:{key}:ver"
+
+    def _index_key(self, namespace, key, version):
+        """记录某一版本写入过的数据键, 递增版本号时据此删除旧版本的数据"""
+        return f"{self._prefix}:{namespace}:{key}:keys:v{version}"
+
+    def _version(self, namespace, key):
+        version_key = self._version_key(namespace, key)
+        version = self._local_get(version_key)
+        if version is None:
+            version = int(self._backend.get(version_key) or 0)
+            self._local_set(version_key, version)
+        return version
+
+    def _data_key(self, namespace, key, version, field):
+        return f"{self._prefix}:{namespace}:{key}:v{version}:{field}"
+
+    def get_many(self, namespace, key, fields, local=True):
+        """
+        读取多个字段
+        :param namespace: 数据类型, 如 github、recommend、response
+        :param key: 数据键
+        :param fields: 字段列表
+        :param local: 是否使用进程内缓存, 调用方已有进程内缓存时传 False
+        :return: 字段到数据的映射, 任一字段未命中时返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            version = self._version(namespace, key)
+            keys = [self._data_key(namespace, key, version, field) for field in fields]
+
+            values = [self._local_get(k) for k in keys] if local else [None] * len(keys)
+            if all(value is not None for value in values):
+                self._count(namespace, 'local_hits')
+                return dict(zip(fields, values))
+
+            raw = self._backend.mget(keys)
+            if any(item is None for item in raw):
+                self._count(namespace, 'misses')
+                return None
+            values = [json.loads(item) for item in raw]
+            if local:
+                for k, value in zip(keys, values):
+                    self._local_set(k, value)
+            self._count(namespace, 'shared_hits')
+            return dict(zip(fields, values))
+        except Exception as e:
+            self._error('读取', e)
+            self._count(namespace, 'misses')
+            return None
+
+    def set_many(self, namespace, key, values, version=None, local=True):
+        """
+        写入多个字段
+        :param namespace: 数据类型
+        :param key: 数据键
+        :param values: 字段到数据的映射, 数据必须能序列化为 JSON
+        :param version: 读库前获取的版本号, 为空时写入当前版本
+        :param local: 是否同时写入进程内缓存
+        """
+        if not self.enabled:
+            return
+        try:
+            if version is None:
+                version = self._version(namespace, key)
+            mapping = {self._data_key(namespace, key, version, field): value for field, value in values.items()}
+            self._backend.mset_ex({k: json.dumps(value, ensure_ascii=False) for k, value in mapping.items()},
+                                  self._ttl, index_key=self._index_key(namespace, key, version),
+                                  touch={self._version_key(namespace, key): self._version_ttl})
+            if local:
+                for k, value in mapping.items():
+                    self._local_set(k, value)
+        except Exception as e:
+            self._error('写入', e)
+
+    def get(self, namespace, key, local=True):
+        """
+        读取单个数据
+        :return: 数据, 未命中时返回 None
+        """
+        values = self.get_many(namespace, key, ('value',), local=local)
+        return values['value'] if values else None
+
+    def set(self, namespace, key, value, version=None, local=True):
+        """写入单个数据"""
+        self.set_many(namespace, key, {'value': value}, version=version, local=local)
+
+    def invalidate(self, namespace, key):
+        """
+        递增版本号使数据失效, 所有进程在本地版本号缓存过期后读到新版本, 并删除上一版本的数据
+        :param namespace: 数据类型
+        :param key: 数据键
+        """
+        if not self.enabled:
+            return
+        version_key = self._version_key(namespace, key)
+        try:
+            version = int(self._backend.incr_ex(version_key, self._version_ttl))
+            self._local_set(version_key, version)
+            index_key = self._index_key(namespace, key, version - 1)
+            self._backend.delete(list(self._backend.smembers(index_key)) + [index_key])
+            self._count(namespace, 'invalidations')
+        except Exception as e:
+            self._error('失效', e)
+            # 无法递增版本号时至少清除本进程的缓存
+            with self._lock:
+                self._local.pop(version_key, None)
+                for k in [k for k in self._local if k.startswith(f"{self._prefix}:{namespace}:{key}:v")]:
+                    del self._local[k]
+
+    def get_stats(self):
+        """
+        获取各级缓存的命中统计
+        :return: 后端类型、各数据类型在进程内与共享存储的命中次数和命中率、错误次数
+        """
+        with self._lock:
+            by_namespace = {namespace: dict(stats) for namespace, stats in self._stats.items()}
+            errors = self._errors
+            local_entries = len(self._local)
+
+        for stats in by_namespace.values():
+            lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+            shared_lookups = stats['shared_hits'] + stats['misses']
+            stats['local_hit_ratio'] = round(stats['local_hits'] / lookups, 4) if lookups else 0.0
+            stats['shared_hit_ratio'] = round(stats['shared_hits'] / shared_lookups, 4) if shared_lookups else 0.0
+        return {
+            'backend': type(self._backend).__name__ if self._backend else None,
+            'local_entries': local_entries,
+            'errors': errors,
+            'by_namespace': by_namespace,
+        }
+
+
+# 进程级共享实例
+shared_cache = SharedCache(create_backend(SHARED_CACHE_BACKEND))
@@ -15,6 +15,15 @@ class Config:
         DB_NAME = config.get("DB_NAME")
         DB_PORT = config.get("DB_PORT")
         DB_CHARSET = config.get("DB_CHARSET")
+        # 连接池大小、借用连接的最长等待时间 (秒) 与空闲连接的后台检查间隔 (秒)
+        DB_POOL_SIZE = config.get("DB_POOL_SIZE", 10)
+        DB_POOL_TIMEOUT = config.get("DB_POOL_TIMEOUT", 5)
+        DB_POOL_VALIDATE_INTERVAL = config.get("DB_POOL_VALIDATE_INTERVAL", 30)
+        # 慢查询日志与自动 EXPLAIN 的耗时阈值 (毫秒)
+        DB_SLOW_QUERY_MS = config.get("DB_SLOW_QUERY_MS", 200)
+        DB_EXPLAIN_QUERY_MS = config.get("DB_EXPLAIN_QUERY_MS", 500)
+        # 可以调用管理接口 (/admin/*) 的用户名, 为空时管理接口拒绝所有请求
+        ADMIN_USERNAMES = set(config.get("ADMIN_USERNAMES", []))
         print("配置内容:", config)
     else:
         print("无法从 Nacos 获取配置")
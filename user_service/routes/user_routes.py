@@ -12,7 +12,9 @@ from user_service.controllers.user_controller import (
     save_appraisal, get_appraisals
 )
 
-from user_service.utils.jwt_utils import token_required, jwt_manager
+from user_service.services.user_service import pool
+from user_service.utils.jwt_utils import admin_required, jwt_manager
+from user_service.utils.query_stats import query_stats
 
 # 定义蓝图
 user_bp = Blueprint('user', __name__)
@@ -22,6 +24,7 @@ user_bp = Blueprint('user', __name__)
 def register_user_blueprint(app):
     app.register_blueprint(user_bp, url_prefix='/user')
     Swagger(app)
+    pool.start_health_check()
 
 
 @user_bp.route('/login', methods=['POST'])
@@ -675,3 +678,48 @@ def get_appraise():
     except Exception as e:
         logger.error(f"获取用户评价时发生错误，user: {github_id}，错误信息: {str(e)}")
         return jsonify({"error": "服务器内部错误"}), 500
+
+
+@user_bp.route('/admin/stats', methods=['GET'])
+@swag_from({
+    'tags': ['用户管理'],
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'type': 'string',
+            'required': True,
+            'description': '管理员登录后获得的 JWT'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': '服务内部运行统计信息',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'db_pool': {
+                        'type': 'object',
+                        'description': '数据库连接池的连接数、空闲数、等待数、借出/等待/超时/重试/检查次数与借出等待时间直方图'
+                    },
+                    'db_queries': {
+                        'type': 'object',
+                        'description': '按语句指纹统计的调用次数、行数与耗时直方图, 参数已脱敏的慢查询日志与慢查询的 EXPLAIN 结果'
+                    }
+                }
+            }
+        },
+        401: {
+            'description': '缺少 Authorization token'
+        },
+        403: {
+            'description': '无效的 Authorization token, 或不是管理员'
+        }
+    }
+})
+@admin_required
+def admin_stats():
+    return jsonify({
+        "db_pool": pool.get_stats(),
+        "db_queries": query_stats.get_stats(),
+    }), 200
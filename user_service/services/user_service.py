@@ -4,47 +4,37 @@ from contextlib import contextmanager
 from user_service.config.db_config import Config
 from user_service.utils.cryp_utils import decrypt_password
 from user_service.utils.logger_utils import logger
-from user_service.utils.mysql_utils import MySQLPool
+from user_service.utils.mysql_utils import ConnectionPool
+from user_service.utils.query_stats import InstrumentedCursor, query_stats
 
-# 使用配置文件中的数据库连接信息
-connection = MySQLPool(
+# 使用配置文件中的数据库连接信息, 空闲连接由后台线程检查
+pool = ConnectionPool(
     host_name=Config.DB_HOST,
     user_name=Config.DB_USER,
     user_password=Config.DB_PASSWORD,
-    db_name=Config.DB_NAME
-).get_connection()
-
-
-def ensure_connection():
-    """
-    确保数据库连接是有效的，如果无效则重新连接。
-    """
-    global connection
-    try:
-        connection.ping(reconnect=True)
-    except Exception as e:
-        logger.error(f"数据库连接失败，尝试重新连接: {e}")
-        connection = MySQLPool(
-            host_name=Config.DB_HOST,
-            user_name=Config.DB_USER,
-            user_password=Config.DB_PASSWORD,
-            db_name=Config.DB_NAME
-        ).get_connection()
+    db_name=Config.DB_NAME,
+    pool_size=Config.DB_POOL_SIZE,
+    checkout_timeout=Config.DB_POOL_TIMEOUT,
+    validate_idle_seconds=Config.DB_POOL_VALIDATE_INTERVAL
+)
 
 
 @contextmanager
 def get_cursor(dictionary=False):
     """
-    获取数据库游标的上下文管理器
+    获取数据库游标的上下文管理器, 正常结束时提交, 出错时回滚
+    连接断开或回滚失败时丢弃连接, 不再归还连接池
     :param dictionary: 是否返回字典格式的结果
     :return: 数据库游标
     """
-    ensure_connection()  # 确保连接有效
-    cursor = connection.cursor(dictionary=dictionary)
-    try:
-        yield cursor
-    finally:
-        cursor.close()
+    with pool.cursor(dictionary=dictionary) as cursor:
+        instrumented = InstrumentedCursor(cursor, query_stats)
+        try:
+            yield instrumented
+        except Exception:
+            instrumented.finish(explain=False)
+            raise
+        instrumented.finish()
 
 
 def check_user_credentials(username, password):
@@ -83,10 +73,8 @@ def create_user(username, password_hash):
 
             # 添加用户
             cursor.execute("INSERT INTO users (username, password) VALUES (%s, %s)", (username, password_hash))
-            connection.commit()
             logger.info(f"用户 {username} 创建成功")
         except mysql.connector.Error as err:
-            connection.rollback()
             logger.error(f"创建用户 {username} 失败: {err}")
             raise ValueError("用户已存在或其他错误: {}".format(err))
 
@@ -103,11 +91,9 @@ def delete_user_by_id(user_id):
             if cursor.rowcount == 0:
                 logger.warning(f"尝试删除不存在的用户 ID {user_id}")
                 raise ValueError("用户未找到")
-            connection.commit()
             logger.info(f"用户 ID {user_id} 删除成功")
             return True
         except mysql.connector.Error as err:
-            connection.rollback()
             logger.error(f"删除用户 ID {user_id} 失败: {err}")
             return False
 
@@ -148,10 +134,8 @@ def service_update_user_by_id(user_id, data):
             update_fields = ", ".join(f"{key} = %s" for key in data.keys())
             update_values = list(data.values()) + [user_id]
             cursor.execute(f"UPDATE users SET {update_fields} WHERE id = %s", update_values)
-            connection.commit()
             logger.info(f"用户 ID {user_id} 信息更新成功")
         except mysql.connector.Error as err:
-            connection.rollback()
             logger.error(f"更新用户 ID {user_id} 信息失败: {err}")
             raise ValueError("更新用户信息失败: {}".format(err))
 
@@ -206,7 +190,6 @@ def save_user_appraisal(username, github_id, message, number, avatar_url):
                 )
                 logger.info(f"添加用户 {username} 对 {github_id} 的新评价")
 
-            connection.commit()
         return True
     except Exception as e:
         logger.error(f"保存用户评价数据失败: {e}")
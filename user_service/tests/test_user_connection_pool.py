@@ -0,0 +1,70 @@
+import mysql.connector
+import pytest
+
+from user_service.services import user_service
+from user_service.utils import mysql_utils
+from user_service.utils.mysql_utils import ConnectionPool
+
+# 连接池本身的测试见 info_service/tests/test_connection_pool.py, 这里只检查本服务的 get_cursor
+
+
+class FakeConnection:
+    rowcount = 0
+
+    def __init__(self):
+        self.closed = False
+        self.fail_rollback = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, operation, params=None):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise mysql.connector.errors.InterfaceError("连接已断开")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    connection = FakeConnection()
+    monkeypatch.setattr(mysql_utils.mysql.connector, 'connect', lambda **config: connection)
+    monkeypatch.setattr(user_service, 'pool', ConnectionPool('127.0.0.1', 'test', 'test', 'test', pool_size=1))
+    return connection
+
+
+def test_get_cursor_commits_and_returns_connection(connection):
+    with user_service.get_cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+    assert connection.commits == 1
+    assert user_service.pool.get_stats()['idle'] == 1
+
+
+def test_get_cursor_discards_connection_lost_mid_query(connection):
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        with user_service.get_cursor():
+            raise mysql.connector.errors.OperationalError("连接已断开", errno=2013)
+
+    assert connection.closed
+    assert user_service.pool.get_stats()['discarded'] == 1
+
+
+def test_get_cursor_discards_connection_when_rollback_fails(connection):
+    connection.fail_rollback = True
+    with pytest.raises(ValueError):
+        with user_service.get_cursor():
+            raise ValueError("业务错误")
+
+    assert connection.closed
+    assert user_service.pool.get_stats()['discarded'] == 1
@@ -3,6 +3,8 @@ import jwt
 from functools import wraps
 from flask import request
 
+from user_service.config.db_config import Config
+
 
 class JWTManager:
     def __init__(self, secret_key, algorithm='HS256'):
@@ -69,3 +71,28 @@ def token_required(f):
         return f(*args, **kwargs)
 
     return decorated
+
+
+def admin_required(f):
+    """
+    装饰器函数，用于保护管理接口，令牌中的用户名需在 ADMIN_USERNAMES 中
+    :param f: 被装饰的函数
+    :return: 装饰后的函数
+    """
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return {"error": "缺少Authorization token"}, 401
+
+        payload, err = jwt_manager.verify_token(token)
+        if err:
+            return {"error": "无效的Authorization token"}, 403
+
+        # 普通用户的令牌同样有效, 需要额外检查管理员身份
+        if payload.get('username') not in Config.ADMIN_USERNAMES:
+            return {"error": "需要管理员权限"}, 403
+        return f(*args, **kwargs)
+
+    return decorated